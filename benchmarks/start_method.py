@@ -0,0 +1,102 @@
+# Copyright 2019 Comcast Cable Communications Management, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Compares Worker launch latency and memory footprint across the 'fork',
+'forkserver' and 'spawn' start methods.
+
+A ballast of --heap-mb MB is allocated in the parent first, to stand in for
+the heap of a large driver program (parsed NodeRegister, Manager proxies, ...).
+Each Worker reports, in its log file, the time at which its run() method was
+entered, along with its RSS and PSS (proportional set size) in MB.
+
+Usage:
+  python benchmarks/start_method.py [--tasks 20] [--heap-mb 256]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+
+from pyrunner import Worker
+
+def _read_kb(path, field):
+  try:
+    with open(path) as f:
+      for line in f:
+        if line.startswith(field + ':'):
+          return int(line.split()[1])
+  except OSError:
+    pass
+  return 0
+
+class Probe(Worker):
+  def run(self):
+    started = time.time()
+    rss = _read_kb('/proc/self/status', 'VmRSS')
+    pss = _read_kb('/proc/self/smaps_rollup', 'Pss')
+    print('PROBE {} {} {}'.format(started, rss, pss))
+
+def run_mode(start_method, tasks, log_dir):
+  from pyrunner.core.node import ExecutionNode
+  from pyrunner.executor import ProcessExecutor
+  
+  executor = ProcessExecutor(start_method, ['start_method']).start()
+  latency, rss, pss = [], [], []
+  
+  for i in range(tasks):
+    node = ExecutionNode(i + 1)
+    node.name = 'Probe {}'.format(i)
+    node.module = 'start_method'
+    node.worker = 'Probe'
+    node.logfile = os.path.join(log_dir, '{}_{}.log'.format(start_method, i))
+    submitted = time.time()
+    node.execute(executor)
+    node.poll(True)
+    with open(node.logfile) as f:
+      probe = [ l for l in f if 'PROBE' in l ][0].split('PROBE')[1].split()
+    latency.append((float(probe[0]) - submitted) * 1000)
+    rss.append(int(probe[1]) / 1024)
+    pss.append(int(probe[2]) / 1024)
+  
+  return latency, rss, pss
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+  parser.add_argument('--tasks', type=int, default=20)
+  parser.add_argument('--heap-mb', type=int, default=256)
+  args = parser.parse_args()
+  
+  ballast = [ bytearray(os.urandom(1024)) * 1024 for _ in range(args.heap_mb) ]
+  
+  print('{:<11} {:>12} {:>12} {:>12} {:>12}'.format('method', 'first (ms)', 'median (ms)', 'RSS (MB)', 'PSS (MB)'))
+  with tempfile.TemporaryDirectory() as log_dir:
+    for start_method in ['fork', 'forkserver', 'spawn']:
+      latency, rss, pss = run_mode(start_method, args.tasks, log_dir)
+      print('{:<11} {:>12.1f} {:>12.1f} {:>12.1f} {:>12.1f}'.format(
+        start_method, latency[0], statistics.median(latency[1:] or latency),
+        statistics.median(rss), statistics.median(pss)))
+  
+  del ballast
+
+if __name__ == '__main__':
+  main()
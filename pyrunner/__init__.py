@@ -1,3 +1,4 @@
 from .core.pyrunner import PyRunner
 from .worker.abstract import Worker
+from .worker.asyncworker import AsyncWorker
 from .worker.shellworker import ShellWorker
\ No newline at end of file
@@ -0,0 +1,51 @@
+# Copyright 2019 Comcast Cable Communications Management, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+from abc import ABCMeta, abstractmethod
+
+class ContextBackend:
+  """
+  Implementations of this abstract class hold the key/value store behind a
+  Context. The store is a dict-like object, which is pickled along with the
+  Context into Worker processes, where it must reach the same data.
+  """
+  
+  __metaclass__ = ABCMeta
+  
+  # Whether the data outlives the engine, in which case it is not saved to the
+  # .ctx file and a restart picks it up as is
+  persistent = False
+  
+  def start(self):
+    """
+    Acquires any resources the backend needs before the store is used.
+    """
+    return self
+  
+  @property
+  @abstractmethod
+  def store(self):
+    """
+    Dict-like object holding the data of the Context.
+    """
+    pass
+  
+  def close(self):
+    """
+    Releases all resources held by the backend. Called once execution of the
+    NodeRegister has ended.
+    """
+    pass
@@ -0,0 +1,56 @@
+# Copyright 2019 Comcast Cable Communications Management, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+from multiprocessing.managers import DictProxy, SyncManager
+from pyrunner.backend.abstract import ContextBackend
+
+class ContextDict(dict):
+  """
+  Dict kept in the Manager process, which can look up several keys in a
+  single round trip.
+  """
+  
+  def get_many(self, keys, default=None):
+    return { k:self.get(k, default) for k in keys }
+
+class ContextDictProxy(DictProxy):
+  _exposed_ = DictProxy._exposed_ + ('get_many',)
+  
+  def get_many(self, keys, default=None):
+    return self._callmethod('get_many', (list(keys), default))
+
+class ContextManager(SyncManager):
+  """
+  SyncManager which also serves ContextDict.
+  """
+
+ContextManager.register('ContextDict', ContextDict, ContextDictProxy)
+
+class ManagerBackend(ContextBackend):
+  """
+  Keeps the Context in a dict of a Manager process, which every access is a
+  round trip to.
+  
+  Args:
+    shared_dict: Manager dict proxy.
+  """
+  
+  def __init__(self, shared_dict):
+    self._store = shared_dict
+  
+  @property
+  def store(self):
+    return self._store
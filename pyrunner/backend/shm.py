@@ -0,0 +1,45 @@
+# Copyright 2019 Comcast Cable Communications Management, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+from pyrunner.backend.abstract import ContextBackend
+from pyrunner.core.shmdict import SharedMemoryDict
+
+class SharedMemoryBackend(ContextBackend):
+  """
+  Keeps the Context in a hash table of shared memory, which Workers on the same
+  host read without IPC. The table is removed once closed.
+  
+  Args:
+    slots (int, optional): Number of keys the table holds.
+    slot_size (int, optional): Bytes per key and value.
+  """
+  
+  def __init__(self, slots=4096, slot_size=256):
+    self.slots = slots
+    self.slot_size = slot_size
+    self._store = None
+  
+  def start(self):
+    self._store = SharedMemoryDict(self.slots, self.slot_size)
+    return self
+  
+  @property
+  def store(self):
+    return self._store
+  
+  def close(self):
+    if self._store is not None:
+      self._store.close()
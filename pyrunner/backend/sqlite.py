@@ -0,0 +1,171 @@
+# Copyright 2019 Comcast Cable Communications Management, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import pickle
+import sqlite3
+import threading
+
+from pyrunner.backend.abstract import ContextBackend
+
+class SqliteDict:
+  """
+  Dict-like store in a SQLite database in write-ahead log mode, which every
+  process and thread opens its own connection to. Keys are strings, values
+  are pickled.
+  
+  Args:
+    path (str): Path of the database file.
+    timeout (float, optional): Seconds to wait for a lock held by another
+      writer before failing.
+  """
+  
+  def __init__(self, path, timeout=30.0):
+    self.path = path
+    self.timeout = timeout
+    self._local = threading.local()
+  
+  def __getstate__(self):
+    return { 'path': self.path, 'timeout': self.timeout }
+  
+  def __setstate__(self, state):
+    self.__init__(**state)
+  
+  def _conn(self):
+    conn = getattr(self._local, 'conn', None)
+    if conn is not None and self._local.pid == os.getpid():
+      return conn
+    # A connection inherited from the parent is only dropped once this process
+    # has its own, so that it is not the last connection here, whose closing
+    # would checkpoint and remove the write-ahead log the parent still uses
+    conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('CREATE TABLE IF NOT EXISTS context (key TEXT PRIMARY KEY, value BLOB NOT NULL)')
+    self._local.conn = conn
+    self._local.pid = os.getpid()
+    return conn
+  
+  def close(self):
+    """
+    Closes the connection of the calling thread, if any.
+    """
+    conn = getattr(self._local, 'conn', None)
+    if conn is not None and self._local.pid == os.getpid():
+      conn.close()
+    self._local.conn = None
+  
+  def _key(self, key):
+    if not isinstance(key, str):
+      raise TypeError('SQLite Context keys must be strings, not {}'.format(type(key).__name__))
+    return key
+  
+  # Dictionary emulation methods
+  def __getitem__(self, key):
+    row = self._conn().execute('SELECT value FROM context WHERE key = ?', (self._key(key),)).fetchone()
+    if row is None:
+      raise KeyError(key)
+    return pickle.loads(row[0])
+  
+  def __setitem__(self, key, value):
+    self._conn().execute('INSERT OR REPLACE INTO context (key, value) VALUES (?, ?)',
+      (self._key(key), pickle.dumps(value, pickle.HIGHEST_PROTOCOL)))
+  
+  def __delitem__(self, key):
+    if self._conn().execute('DELETE FROM context WHERE key = ?', (self._key(key),)).rowcount == 0:
+      raise KeyError(key)
+  
+  def __contains__(self, key):
+    return self._conn().execute('SELECT 1 FROM context WHERE key = ?', (self._key(key),)).fetchone() is not None
+  
+  def __len__(self):
+    return self._conn().execute('SELECT COUNT(*) FROM context').fetchone()[0]
+  
+  def get(self, key, default=None):
+    try:
+      return self[key]
+    except KeyError:
+      return default
+  
+  def get_many(self, keys, default=None):
+    keys = [ self._key(k) for k in keys ]
+    values = dict.fromkeys(keys, default)
+    conn = self._conn()
+    # Stays under SQLITE_MAX_VARIABLE_NUMBER of older SQLite builds
+    for i in range(0, len(keys), 900):
+      chunk = keys[i:i + 900]
+      query = 'SELECT key, value FROM context WHERE key IN ({})'.format(','.join('?' * len(chunk)))
+      for k,v in conn.execute(query, chunk):
+        values[k] = pickle.loads(v)
+    return values
+  
+  def items(self):
+    return [ (k, pickle.loads(v)) for k,v in self._conn().execute('SELECT key, value FROM context') ]
+  
+  def keys(self):
+    return [ k for k, in self._conn().execute('SELECT key FROM context') ]
+  
+  def values(self):
+    return [ v for _,v in self.items() ]
+  
+  def copy(self):
+    return dict(self.items())
+  
+  def update(self, other):
+    rows = [ (self._key(k), pickle.dumps(v, pickle.HIGHEST_PROTOCOL)) for k,v in dict(other).items() ]
+    conn = self._conn()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+      conn.executemany('INSERT OR REPLACE INTO context (key, value) VALUES (?, ?)', rows)
+      conn.execute('COMMIT')
+    except Exception:
+      conn.execute('ROLLBACK')
+      raise
+  
+  def clear(self):
+    self._conn().execute('DELETE FROM context')
+
+class SqliteBackend(ContextBackend):
+  """
+  Keeps the Context in a SQLite database on disk, which Workers on the same
+  host open directly. The data is not limited by memory and outlives the
+  engine, so that a restart resumes from it.
+  
+  Args:
+    path (str): Path of the database file.
+    reset (bool, optional): Removes all data left by a prior run on start.
+  """
+  
+  persistent = True
+  
+  def __init__(self, path, reset=False):
+    self.path = path
+    self.reset = reset
+    self._store = None
+  
+  def start(self):
+    self._store = SqliteDict(self.path)
+    if self.reset:
+      self._store.clear()
+    return self
+  
+  @property
+  def store(self):
+    return self._store
+  
+  def close(self):
+    if self._store is not None:
+      self._store.close()
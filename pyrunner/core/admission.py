@@ -0,0 +1,372 @@
+# Copyright 2019 Comcast Cable Communications Management, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import time
+
+def parse_limits(limit_str):
+  """
+  Returns a dict of names mapped to integer limits from a comma-separated list
+  of name:limit pairs, e.g. 'db:4,api:8'.
+  """
+  limits = dict()
+  for pair in [ x.strip() for x in (limit_str or '').split(',') if x.strip() ]:
+    name, sep, limit = pair.partition(':')
+    if not sep:
+      raise ValueError('Invalid limit (expected name:limit): {}'.format(pair))
+    limits[name.strip()] = int(limit)
+  return limits
+
+def detect_cpus():
+  """
+  Returns the number of CPUs available to this process.
+  """
+  try:
+    return len(os.sched_getaffinity(0))
+  except AttributeError:
+    return os.cpu_count() or 1
+
+def detect_mem_mb():
+  """
+  Returns the total physical memory of the host in MB.
+  """
+  try:
+    with open('/proc/meminfo') as f:
+      for line in f:
+        if line.startswith('MemTotal:'):
+          return int(line.split()[1]) // 1024
+  except OSError:
+    pass
+  return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // (1024 * 1024)
+
+class ResourceBudget:
+  """
+  Tracks the CPUs and memory requested by running nodes against the capacity
+  of the host, so that nodes are only admitted while their requests fit.
+  
+  A node requesting more than the entire capacity is admitted once no other
+  requesting node is running, rather than never.
+  
+  Args:
+    max_cpus (float, optional): CPU capacity. Detected from the host if not > 0.
+    max_mem_mb (int, optional): Memory capacity in MB. Detected from the host if not > 0.
+  """
+  
+  def __init__(self, max_cpus=None, max_mem_mb=None):
+    self.max_cpus = max_cpus if max_cpus and max_cpus > 0 else detect_cpus()
+    self.max_mem_mb = max_mem_mb if max_mem_mb and max_mem_mb > 0 else detect_mem_mb()
+    self.used_cpus = 0
+    self.used_mem_mb = 0
+  
+  def fits(self, node):
+    if not node.cpus and not node.mem_mb:
+      return True
+    if not self.used_cpus and not self.used_mem_mb:
+      return True
+    return (self.used_cpus + node.cpus <= self.max_cpus) and (self.used_mem_mb + node.mem_mb <= self.max_mem_mb)
+  
+  def acquire(self, node):
+    self.used_cpus += node.cpus
+    self.used_mem_mb += node.mem_mb
+  
+  def release(self, node):
+    self.used_cpus = max(0, self.used_cpus - node.cpus)
+    self.used_mem_mb = max(0, self.used_mem_mb - node.mem_mb)
+
+
+class ConcurrencyPools:
+  """
+  Limits the number of running nodes tagged with each named pool, and keeps
+  statistics on the nodes kept waiting for a pool slot. Nodes without a pool,
+  or tagged with a pool that has no limit, are not limited.
+  
+  Args:
+    limits (dict, optional): Pool names mapped to their maximum number of
+      concurrently running nodes.
+  """
+  
+  def __init__(self, limits=None):
+    self.limits = dict(limits or {})
+    self.running = { name:0 for name in self.limits }
+    self.total_wait = { name:0.0 for name in self.limits }
+    self.max_wait = { name:0.0 for name in self.limits }
+    self.waited = { name:0 for name in self.limits }
+    self._blocked_since = dict()
+  
+  def fits(self, node):
+    if node.pool not in self.limits:
+      return True
+    if self.running[node.pool] < self.limits[node.pool]:
+      return True
+    self._blocked_since.setdefault(node, time.time())
+    return False
+  
+  def acquire(self, node):
+    if node.pool not in self.limits:
+      return
+    self.running[node.pool] += 1
+    if node in self._blocked_since:
+      wait = time.time() - self._blocked_since.pop(node)
+      self.total_wait[node.pool] += wait
+      self.max_wait[node.pool] = max(self.max_wait[node.pool], wait)
+      self.waited[node.pool] += 1
+  
+  def release(self, node):
+    if node.pool in self.limits:
+      self.running[node.pool] = max(0, self.running[node.pool] - 1)
+  
+  def discard_settled(self, pending):
+    """
+    Stops tracking the wait of blocked nodes which are no longer in the given
+    set of pending nodes, e.g. as they were defaulted, halted or aborted before
+    getting a slot.
+    """
+    for node in [ n for n in self._blocked_since if n not in pending ]:
+      del self._blocked_since[node]
+  
+  def queued(self, name):
+    """
+    Returns the number of ready nodes currently waiting for a slot in the given pool.
+    """
+    return len([ n for n in self._blocked_since if n.pool == name ])
+  
+  def avg_wait(self, name):
+    return self.total_wait[name] / self.waited[name] if self.waited[name] else 0.0
+
+
+def parse_rates(rate_str):
+  """
+  Returns a dict of names mapped to (rate, burst) tuples from a comma-separated
+  list of name:rate[:burst] triples, e.g. 'api:2:5,db:0.5'. Burst defaults to 1.
+  """
+  rates = dict()
+  for item in [ x.strip() for x in (rate_str or '').split(',') if x.strip() ]:
+    parts = [ x.strip() for x in item.split(':') ]
+    if len(parts) not in (2, 3):
+      raise ValueError('Invalid rate (expected name:rate[:burst]): {}'.format(item))
+    rates[parts[0]] = (float(parts[1]), int(parts[2]) if len(parts) == 3 else 1)
+  return rates
+
+class TokenBucket:
+  """
+  Token bucket holding at most `burst` tokens, refilled at `rate` tokens per
+  second. Each launch takes one token.
+  
+  Args:
+    rate (float): Tokens added per second.
+    burst (int, optional): Capacity of the bucket. The bucket starts full.
+  """
+  
+  def __init__(self, rate, burst=1):
+    if rate <= 0:
+      raise ValueError('Rate must be greater than 0')
+    self.rate = float(rate)
+    self.burst = max(1, int(burst))
+    self.tokens = float(self.burst)
+    self._last = time.time()
+  
+  def _refill(self, now=None):
+    now = time.time() if now is None else now
+    self.tokens = min(self.burst, self.tokens + (now - self._last) * self.rate)
+    self._last = now
+  
+  def available(self):
+    self._refill()
+    return self.tokens >= 1
+  
+  def take(self):
+    self._refill()
+    self.tokens -= 1
+  
+  def next_time(self):
+    """
+    Returns the time at which the next token will be available.
+    """
+    self._refill()
+    return self._last + max(0.0, 1 - self.tokens) / self.rate
+
+
+class LaunchRates:
+  """
+  Limits the rate at which nodes are launched, both overall and per named pool,
+  with a token bucket for each. Tokens are only taken from the buckets when a
+  node is actually launched, so a node which turns out not to be runnable does
+  not delay the others.
+  
+  Args:
+    rate (float, optional): Launches per second across all nodes. No limit if not > 0.
+    burst (int, optional): Number of launches allowed at once across all nodes.
+    pool_rates (dict, optional): Pool names mapped to (rate, burst) tuples.
+  """
+  
+  def __init__(self, rate=None, burst=1, pool_rates=None):
+    self.bucket = TokenBucket(rate, burst) if rate and rate > 0 else None
+    self.pools = { name:TokenBucket(r, b) for name,(r,b) in (pool_rates or {}).items() }
+  
+  def __bool__(self):
+    return bool(self.bucket or self.pools)
+  
+  def has_capacity(self):
+    """
+    Returns False if no node at all may be launched right now.
+    """
+    return self.bucket is None or self.bucket.available()
+  
+  def fits(self, node):
+    return node.pool not in self.pools or self.pools[node.pool].available()
+  
+  def acquire(self, node):
+    if self.bucket:
+      self.bucket.take()
+    if node.pool in self.pools:
+      self.pools[node.pool].take()
+  
+  def next_time(self):
+    """
+    Returns the earliest time at which a currently empty bucket gains a token,
+    or None if no bucket is empty.
+    """
+    times = [ b.next_time() for b in ([self.bucket] + list(self.pools.values())) if b and not b.available() ]
+    return min(times) if times else None
+
+
+def read_loadavg():
+  """
+  Returns the 1-minute load average of the host, or None if unavailable.
+  """
+  try:
+    return os.getloadavg()[0]
+  except OSError:
+    return None
+
+def read_mem_available_pct():
+  """
+  Returns MemAvailable as a percentage of MemTotal, or None if unavailable.
+  """
+  info = dict()
+  try:
+    with open('/proc/meminfo') as f:
+      for line in f:
+        key, _, value = line.partition(':')
+        info[key] = int(value.split()[0])
+  except (OSError, ValueError, IndexError):
+    return None
+  if not info.get('MemTotal') or 'MemAvailable' not in info:
+    return None
+  return 100.0 * info['MemAvailable'] / info['MemTotal']
+
+def read_pressure(resource):
+  """
+  Returns the 'some avg10' pressure stall percentage of the given resource
+  ('cpu', 'memory' or 'io'), or None if PSI is unavailable.
+  """
+  try:
+    with open('/proc/pressure/{}'.format(resource)) as f:
+      for line in f:
+        if line.startswith('some'):
+          return float(dict(x.split('=') for x in line.split()[1:])['avg10'])
+  except (OSError, ValueError, KeyError):
+    pass
+  return None
+
+def sample_host():
+  return {
+    'load': read_loadavg(),
+    'mem_pct': read_mem_available_pct(),
+    'cpu_psi': read_pressure('cpu'),
+    'mem_psi': read_pressure('memory')
+  }
+
+
+class AdaptiveConcurrency:
+  """
+  Adjusts the number of Workers allowed to run at once, between min_procs and
+  max_procs, from the load, available memory and pressure stall information of
+  the host. The limit grows by one while the host has headroom, and is halved
+  as soon as it is overloaded. Between the two thresholds it is left alone, so
+  that it does not flap.
+  
+  Args:
+    min_procs (int): Lower bound of the limit.
+    max_procs (int): Upper bound of the limit.
+    target_load (float, optional): 1-minute load average per CPU above which
+      the host is overloaded.
+    min_mem_pct (float, optional): Percentage of available memory below which
+      the host is overloaded.
+    interval (float, optional): Minimum number of seconds between adjustments.
+    sampler (callable, optional): Returns the host measurements. Reads /proc
+      by default.
+  """
+  
+  HEADROOM = 0.75   # Fraction of the overload thresholds the host must stay under to grow
+  MAX_PSI = 20.0    # 'some avg10' stall percentage above which the host is overloaded
+  
+  def __init__(self, min_procs, max_procs, target_load=1.0, min_mem_pct=10.0, interval=5.0, sampler=None):
+    self.min_procs = max(1, min_procs)
+    self.max_procs = max(self.min_procs, max_procs)
+    self.target_load = target_load
+    self.min_mem_pct = min_mem_pct
+    self.interval = interval
+    self.sampler = sampler or sample_host
+    self.cpus = detect_cpus()
+    self.limit = max(self.min_procs, min(self.max_procs, self.cpus))
+    self.adjustments = []
+    self._last = 0
+  
+  def next_time(self):
+    return self._last + self.interval
+  
+  def _state(self, s):
+    overloaded, headroom = [], True
+    load = s.get('load') / self.cpus if s.get('load') is not None else None
+    for name, value, limit in [('load/cpu', load, self.target_load), ('cpu psi', s.get('cpu_psi'), self.MAX_PSI), ('mem psi', s.get('mem_psi'), self.MAX_PSI)]:
+      if value is None:
+        continue
+      if value > limit:
+        overloaded.append('{} {:0.2f} > {:0.2f}'.format(name, value, limit))
+      elif value > limit * self.HEADROOM:
+        headroom = False
+    mem = s.get('mem_pct')
+    if mem is not None:
+      if mem < self.min_mem_pct:
+        overloaded.append('mem available {:0.1f}% < {:0.1f}%'.format(mem, self.min_mem_pct))
+      elif mem < self.min_mem_pct / self.HEADROOM:
+        headroom = False
+    return overloaded, headroom
+  
+  def update(self, running, now=None):
+    """
+    Samples the host if the interval has passed, and adjusts the limit. The
+    limit is only raised while the running Workers are using all of it.
+    Returns a description of the adjustment, or None if the limit is unchanged.
+    """
+    now = time.time() if now is None else now
+    if now < self.next_time():
+      return None
+    self._last = now
+    overloaded, headroom = self._state(self.sampler())
+    old = self.limit
+    if overloaded:
+      self.limit = max(self.min_procs, self.limit // 2)
+      reason = ', '.join(overloaded)
+    elif headroom and running >= self.limit:
+      self.limit = min(self.max_procs, self.limit + 1)
+      reason = 'host has headroom'
+    if self.limit == old:
+      return None
+    message = 'Concurrency {} -> {} ({})'.format(old, self.limit, reason)
+    self.adjustments.append((now, old, self.limit, reason))
+    return message
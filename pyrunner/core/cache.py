@@ -0,0 +1,121 @@
+# Copyright 2019 Comcast Cable Communications Management, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import glob
+import pickle
+import hashlib
+import importlib.util
+
+class ResultCache:
+  """
+  Content-addressed store of successful task results, used to skip tasks
+  whose code and inputs have not changed since they last succeeded.
+  
+  A task's key is a hash of its Worker module's source, Worker class name and
+  arguments, along with the values of the Context keys it declares in
+  cache_keys and the contents of the files matching its inputs. Each entry
+  holds the Context keys the task set, so they can be restored on a hit.
+  
+  Entries are files in cache_dir. Least recently used entries are evicted once
+  the directory exceeds max_mb.
+  
+  Args:
+    cache_dir (str): Directory to keep entries in. Created if missing.
+    max_mb (int, optional): Size limit of cache_dir in MB. Default: 1024
+  """
+  
+  def __init__(self, cache_dir, max_mb=1024):
+    self.cache_dir = cache_dir
+    self.max_mb = max_mb
+    self.hits = 0
+    self.misses = 0
+    os.makedirs(cache_dir, exist_ok=True)
+  
+  def key(self, node, context=None):
+    """
+    Returns the cache key of the given node, given the current Context.
+    """
+    h = hashlib.sha256()
+    
+    spec = importlib.util.find_spec(node.module)
+    with open(spec.origin, 'rb') as f:
+      h.update(f.read())
+    h.update(repr((node.module, node.worker, list(node.argv or []))).encode())
+    
+    for k in sorted(node.cache_keys or []):
+      value = context.get(k) if context is not None else None
+      h.update(repr(k).encode())
+      h.update(pickle.dumps(value))
+    
+    for pattern in sorted(node.inputs or []):
+      for path in sorted(glob.glob(pattern)) or [ pattern ]:
+        h.update(path.encode())
+        if os.path.isfile(path):
+          with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+              h.update(chunk)
+    
+    return h.hexdigest()
+  
+  def _path(self, key):
+    return os.path.join(self.cache_dir, '{}.result'.format(key))
+  
+  def lookup(self, key):
+    """
+    Returns the dict of Context keys set by the task which produced the given
+    key, or None on a miss.
+    """
+    path = self._path(key)
+    try:
+      with open(path, 'rb') as f:
+        updates = pickle.load(f)
+      os.utime(path)
+    except (OSError, EOFError, pickle.UnpicklingError):
+      self.misses += 1
+      return None
+    self.hits += 1
+    return updates
+  
+  def store(self, key, updates):
+    """
+    Records a successful result, along with the Context keys the task set.
+    """
+    tmp = self._path(key) + '.tmp'
+    with open(tmp, 'wb') as f:
+      pickle.dump(dict(updates), f)
+    os.replace(tmp, self._path(key))
+    self.evict()
+  
+  def evict(self):
+    """
+    Removes the least recently used entries until the cache fits in max_mb.
+    """
+    if self.max_mb < 0:
+      return
+    
+    entries = []
+    for e in os.scandir(self.cache_dir):
+      if e.name.endswith('.result'):
+        st = e.stat()
+        entries.append((st.st_mtime, st.st_size, e.path))
+    
+    total = sum([ e[1] for e in entries ])
+    for mtime, size, path in sorted(entries):
+      if total <= self.max_mb * 1024 * 1024:
+        break
+      os.remove(path)
+      total -= size
@@ -55,10 +55,81 @@ class Config:
     debug            : Execution option to turn on more verbose output during execution.
     tickrate         : Execution option to specify the number of times per second the
                        engine should poll Workers. 1 by default.
+    event_driven     : Execution option to have the engine sleep until a Worker exits
+                       or a timed event is due, rather than polling at the tickrate.
     save_interval    : Execution option to specify the number of seconds between saving
                        job status and state to disk during execution. 10 by default
+    wal_sync_interval: Minimum number of seconds between fsyncs of the log of task status
+                       changes kept next to the .ctllog file. 0 by default, to sync
+                       on every save. -1 leaves flushing to the OS.
+    wal_max_records  : Number of status changes logged beyond which they are compacted
+                       into a new .ctllog file. 10000 by default.
     max_procs        : Execution option to specify the maximum number of Workers
                        (processes) that may execute in parallel. No limit by default.
+    adaptive         : Execution option to adjust the number of Workers executing in
+                       parallel between min_procs and max_procs (twice the number of
+                       CPUs if not set) from the load and memory pressure of the host.
+    min_procs        : Lower bound of the adaptive concurrency. 1 by default.
+    target_load      : 1-minute load average per CPU above which adaptive concurrency
+                       backs off. 1.0 by default.
+    min_mem_pct      : Percentage of available memory below which adaptive concurrency
+                       backs off. 10 by default.
+    speculative_multiplier : Multiple of their median runtime after which Workers of
+                       speculative tasks get a second attempt, if slots are idle.
+                       2.0 by default.
+    fail_fast        : Execution option to stop the run as soon as any task fails for
+                       good, rather than only when a task marked 'critical' fails.
+    fail_fast_grace  : Number of seconds running Workers are given to finish once the
+                       run is stopped by a failed task, before they are terminated.
+    max_cpus         : Number of CPUs that Workers may request in total. Detected
+                       from the host by default.
+    max_mem_mb       : Memory in MB that Workers may request in total. Detected
+                       from the host by default.
+    executor         : Execution option to specify where Workers run: 'process' forks a
+                       new process per Worker (default), 'pool' reuses a set of
+                       pre-forked processes, 'thread' runs them in threads of the
+                       engine process, 'async' runs AsyncWorkers as coroutines of
+                       one event loop in the engine process, 'remote' sends them
+                       to pyrunner-agent processes. May be overridden per task.
+    start_method     : Execution option to specify how Worker processes are started:
+                       'fork' (default), 'forkserver' or 'spawn'. With 'forkserver',
+                       all Worker modules of the job are imported once, up front.
+    incremental      : Execution option to skip tasks whose declared outputs are up to
+                       date with their declared inputs.
+    incremental_check: How incremental mode decides that outputs are up to date:
+                       'mtime' (default) or 'checksum'.
+    cache_dir        : Directory of the result cache used by tasks with the 'cache'
+                       attribute. {temp_dir}/{app_name}.cache by default.
+    cache_max_mb     : Size in MB beyond which least recently used cache entries are
+                       evicted. -1 for no limit. 1024 by default.
+    agents           : Comma-separated list of host:port:slots triples naming the
+                       pyrunner-agent processes used by the 'remote' executor.
+    agent_authkey    : Shared secret the agents were started with.
+    pool_size        : Number of processes pre-forked by the 'pool' executor, or of
+                       threads used by the 'thread' executor. Defaults to max_procs,
+                       or the number of CPUs if max_procs is not set, for 'pool' and
+                       to the number of CPUs + 4 for 'thread'.
+    pool_max_tasks   : Number of Workers each pooled process runs before it is
+                       replaced. 0 for no limit. 100 by default.
+    pools            : Comma-separated list of name:limit pairs which cap the number
+                       of running Workers tagged with each named pool.
+    context_backend  : Where the Context is stored: 'manager' in a Manager process
+                       (default), 'shm' in a shared-memory hash table which
+                       Workers read without IPC, for small values, or 'sqlite' in
+                       a database file under temp_dir which Workers open directly,
+                       and which is kept for a restart.
+    context_slots    : Number of keys the 'shm' Context holds. 4096 by default.
+    context_slot_size: Bytes per key and value of the 'shm' Context. 256 by default.
+    context_cache    : Execution option to have Workers read the Context from a copy
+                       which is only fetched again after the Context has changed.
+    journal_max_mb   : Size in MB of the journal of Context writes beyond which it is
+                       compacted into the saved Context. 64 by default.
+    launch_rate      : Maximum number of Workers launched per second, sustained. No
+                       limit if not > 0.
+    launch_burst     : Number of Workers that may be launched at once before
+                       launch_rate applies. 1 by default.
+    pool_rates       : Comma-separated list of name:rate[:burst] triples which limit
+                       the launch rate of Workers tagged with each named pool.
     log_retention    : Number of days to retain log files.
     dryrun           : Execution option to turn on 'dryrun', which prints out details
                        about the job to be executed.
@@ -96,9 +167,40 @@ class Config:
       'silent'               : { 'type': bool, 'preserve': False, 'env': 'APP_SILENT'               , 'value': None, 'default': False },
       'debug'                : { 'type': bool, 'preserve': False, 'env': 'APP_DEBUG'                , 'value': None, 'default': False },
       'tickrate'             : { 'type': int , 'preserve': False, 'env': 'APP_TICKRATE'             , 'value': None, 'default': 1 },
+      'event_driven'         : { 'type': bool, 'preserve': False, 'env': 'APP_EVENT_DRIVEN'         , 'value': None, 'default': False },
       'time_between_tasks'   : { 'type': int , 'preserve': True,  'env': 'APP_TIME_BETWEEN_TASKS'   , 'value': None, 'default': 0 },
       'save_interval'        : { 'type': int , 'preserve': False, 'env': 'APP_SAVE_INTERVAL'        , 'value': None, 'default': 10 },
+      'wal_sync_interval'    : { 'type': float,'preserve': False, 'env': 'APP_WAL_SYNC_INTERVAL'    , 'value': None, 'default': 0.0 },
+      'wal_max_records'      : { 'type': int , 'preserve': False, 'env': 'APP_WAL_MAX_RECORDS'      , 'value': None, 'default': 10000 },
       'max_procs'            : { 'type': int , 'preserve': False, 'env': 'APP_MAX_PROCS'            , 'value': None, 'default': -1 },
+      'adaptive'             : { 'type': bool, 'preserve': False, 'env': 'APP_ADAPTIVE'             , 'value': None, 'default': False },
+      'min_procs'            : { 'type': int , 'preserve': False, 'env': 'APP_MIN_PROCS'            , 'value': None, 'default': 1 },
+      'target_load'          : { 'type': float,'preserve': False, 'env': 'APP_TARGET_LOAD'          , 'value': None, 'default': 1.0 },
+      'min_mem_pct'          : { 'type': float,'preserve': False, 'env': 'APP_MIN_MEM_PCT'          , 'value': None, 'default': 10.0 },
+      'speculative_multiplier': { 'type': float,'preserve': False, 'env': 'APP_SPECULATIVE_MULTIPLIER', 'value': None, 'default': 2.0 },
+      'fail_fast'            : { 'type': bool, 'preserve': False, 'env': 'APP_FAIL_FAST'            , 'value': None, 'default': False },
+      'fail_fast_grace'      : { 'type': int , 'preserve': False, 'env': 'APP_FAIL_FAST_GRACE'      , 'value': None, 'default': 0 },
+      'max_cpus'             : { 'type': float,'preserve': False, 'env': 'APP_MAX_CPUS'             , 'value': None, 'default': -1 },
+      'max_mem_mb'           : { 'type': int , 'preserve': False, 'env': 'APP_MAX_MEM_MB'           , 'value': None, 'default': -1 },
+      'executor'             : { 'type': str , 'preserve': False, 'env': 'APP_EXECUTOR'             , 'value': None, 'default': 'process' },
+      'start_method'         : { 'type': str , 'preserve': False, 'env': 'APP_START_METHOD'         , 'value': None, 'default': 'fork' },
+      'incremental'          : { 'type': bool, 'preserve': False, 'env': 'APP_INCREMENTAL'          , 'value': None, 'default': False },
+      'incremental_check'    : { 'type': str , 'preserve': False, 'env': 'APP_INCREMENTAL_CHECK'    , 'value': None, 'default': 'mtime' },
+      'cache_dir'            : { 'type': str , 'preserve': False, 'env': 'APP_CACHE_DIR'            , 'value': None, 'default': None },
+      'cache_max_mb'         : { 'type': int , 'preserve': False, 'env': 'APP_CACHE_MAX_MB'         , 'value': None, 'default': 1024 },
+      'agents'               : { 'type': str , 'preserve': False, 'env': 'APP_AGENTS'               , 'value': None, 'default': None },
+      'agent_authkey'        : { 'type': str , 'preserve': False, 'env': 'APP_AGENT_AUTHKEY'        , 'value': None, 'default': None },
+      'pool_size'            : { 'type': int , 'preserve': False, 'env': 'APP_POOL_SIZE'            , 'value': None, 'default': -1 },
+      'pool_max_tasks'       : { 'type': int , 'preserve': False, 'env': 'APP_POOL_MAX_TASKS'       , 'value': None, 'default': 100 },
+      'pools'                : { 'type': str , 'preserve': False, 'env': 'APP_POOLS'                , 'value': None, 'default': None },
+      'context_backend'      : { 'type': str , 'preserve': False, 'env': 'APP_CONTEXT_BACKEND'      , 'value': None, 'default': 'manager' },
+      'context_slots'        : { 'type': int , 'preserve': False, 'env': 'APP_CONTEXT_SLOTS'        , 'value': None, 'default': 4096 },
+      'context_slot_size'    : { 'type': int , 'preserve': False, 'env': 'APP_CONTEXT_SLOT_SIZE'    , 'value': None, 'default': 256 },
+      'context_cache'        : { 'type': bool, 'preserve': False, 'env': 'APP_CONTEXT_CACHE'        , 'value': None, 'default': False },
+      'journal_max_mb'       : { 'type': int , 'preserve': False, 'env': 'APP_JOURNAL_MAX_MB'       , 'value': None, 'default': 64 },
+      'launch_rate'          : { 'type': float,'preserve': False, 'env': 'APP_LAUNCH_RATE'          , 'value': None, 'default': -1 },
+      'launch_burst'         : { 'type': int , 'preserve': False, 'env': 'APP_LAUNCH_BURST'         , 'value': None, 'default': 1 },
+      'pool_rates'           : { 'type': str , 'preserve': False, 'env': 'APP_POOL_RATES'           , 'value': None, 'default': None },
       'log_retention'        : { 'type': int , 'preserve': True,  'env': 'APP_LOG_RETENTION'        , 'value': None, 'default': 30 },
       'dryrun'               : { 'type': bool, 'preserve': False, 'env': 'APP_DRYRUN'               , 'value': None, 'default': False },
       'email_on_fail'        : { 'type': bool, 'preserve': False, 'env': 'APP_EMAIL_ON_FAIL'        , 'value': None, 'default': True },
@@ -276,6 +378,68 @@ class Config:
     else:
       return '{}/{}.ctx'.format(self['temp_dir'], self['app_name'])
   
+  @property
+  def ctx_db_file(self):
+    """
+    Path/filename of job's Context database, for the 'sqlite' Context backend.
+    """
+    if not self['temp_dir'] or not self['app_name']:
+      return None
+    else:
+      return '{}/{}.ctxdb'.format(self['temp_dir'], self['app_name'])
+  
+  @property
+  def ctx_journal_file(self):
+    """
+    Path/filename of job's Context journal, replayed on top of the .ctx file.
+    """
+    if not self['temp_dir'] or not self['app_name']:
+      return None
+    else:
+      return '{}/{}.journal'.format(self['temp_dir'], self['app_name'])
+  
+  @property
+  def history_file(self):
+    """
+    Path/filename of job's runtime history file.
+    """
+    if not self['temp_dir'] or not self['app_name']:
+      return None
+    else:
+      return '{}/{}.history'.format(self['temp_dir'], self['app_name'])
+  
+  @property
+  def build_state_file(self):
+    """
+    Path/filename of job's incremental build state file.
+    """
+    if not self['temp_dir'] or not self['app_name']:
+      return None
+    else:
+      return '{}/{}.build'.format(self['temp_dir'], self['app_name'])
+  
+  @property
+  def buffer_dir(self):
+    """
+    Path of job's directory of Context buffers.
+    """
+    if not self['temp_dir'] or not self['app_name']:
+      return None
+    else:
+      return '{}/{}.buffers'.format(self['temp_dir'], self['app_name'])
+  
+  @property
+  def result_cache_dir(self):
+    """
+    Path of job's result cache directory.
+    """
+    if self['cache_dir']:
+      return self['cache_dir']
+    elif not self['temp_dir'] or not self['app_name']:
+      return None
+    else:
+      return '{}/{}.cache'.format(self['temp_dir'], self['app_name'])
+  
   def source_config_file(self, config_file):
     """
     Sources config file to export environment variables.
@@ -29,10 +29,14 @@ STATUS_ABORTED   = 'A'
 EXECUTION_TIMESTAMP = datetime.now().strftime("%Y%m%d_%H%M%S")
 
 MODE_PYTHON = 'PYTHON'
-HEADER_PYTHON = '#{}\n#ID|PARENT_IDS|MAX_ATTEMPTS|RETRY_WAIT_TIME|PROCESS_NAME|MODULE_NAME|WORKER_NAME|ARGUMENTS|LOGFILE'.format(MODE_PYTHON)
+HEADER_PYTHON = '#{}\n#ID|PARENT_IDS|MAX_ATTEMPTS|RETRY_WAIT_TIME|PROCESS_NAME|MODULE_NAME|WORKER_NAME|ARGUMENTS|LOGFILE|ATTRIBUTES'.format(MODE_PYTHON)
 
 ROOT_NODE_NAME = 'PyRunnerRootNode'
 
+# Maximum number of seconds the event-driven engine sleeps between checks for
+# signal files and interactive input requests.
+SIGNAL_CHECK_INTERVAL = 1.0
+
 DRIVER_TEMPLATE = """#!/usr/bin/env python3
 
 import os, sys
@@ -16,8 +16,108 @@
 
 import os
 import time
+import mmap
+import pickle
+import struct
+import uuid
+import asyncio
+import tempfile
 from subprocess import Popen, PIPE
 from collections import deque
+from contextlib import nullcontext
+
+BUFFER_MARKER = '__pyrunner_buffer__'
+
+# Longest sleep between two reads of the version by wait_for() and watch()
+MAX_POLL_INTERVAL = 0.05
+
+def is_buffer(value):
+  """
+  Returns True if the given Context value describes a buffer stored with
+  Context.put_buffer().
+  """
+  return isinstance(value, dict) and BUFFER_MARKER in value
+
+class ContextJournal:
+  """
+  Append-only file of the writes made to a Context, replayed on top of the
+  last Context snapshot to restore its state on restart.
+  
+  Each record is a length-prefixed pickle of a (seq, op, key, value) tuple, and
+  is appended with a single write, so that processes can share the file. The
+  sequence number is the Context version of the write, by which records are
+  ordered, as they are not appended under any lock.
+  
+  Args:
+    path (str): Path of the journal file.
+  """
+  
+  HEADER = struct.Struct('<I')
+  
+  def __init__(self, path):
+    self.path = path
+    self.last_seq = 0
+    self._fd = None
+    self._pid = None
+  
+  def __getstate__(self):
+    return { 'path': self.path }
+  
+  def __setstate__(self, state):
+    self.__init__(state['path'])
+  
+  def _open(self):
+    # File descriptors are not shared with forked processes
+    if self._fd is None or self._pid != os.getpid():
+      self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+      self._pid = os.getpid()
+    return self._fd
+  
+  def append(self, seq, op, key, value=None):
+    data = pickle.dumps((seq, op, key, value), pickle.HIGHEST_PROTOCOL)
+    os.write(self._open(), self.HEADER.pack(len(data)) + data)
+  
+  def size(self):
+    return os.path.getsize(self.path) if os.path.isfile(self.path) else 0
+  
+  def truncate(self):
+    os.truncate(self._open(), 0)
+  
+  def replay(self, target, after=None):
+    """
+    Applies the journaled writes, or those with a sequence number above the
+    given one, to the given dict-like object in sequence order, and returns the
+    number of writes applied. A record cut short by a crash is ignored. The highest
+    sequence number read is kept as last_seq.
+    """
+    records = []
+    if os.path.isfile(self.path):
+      with open(self.path, 'rb') as f:
+        while True:
+          header = f.read(self.HEADER.size)
+          if len(header) < self.HEADER.size:
+            break
+          data = f.read(self.HEADER.unpack(header)[0])
+          try:
+            records.append(pickle.loads(data))
+          except Exception:
+            break
+    self.last_seq = max([after or 0] + [ r[0] for r in records ])
+    records = sorted([ r for r in records if after is None or r[0] > after ], key=lambda r: r[0])
+    for seq, op, key, value in records:
+      if op == 'set':
+        target[key] = value
+      elif op == 'update':
+        target.update(value)
+      elif op == 'delete' and key in target:
+        del target[key]
+    return len(records)
+  
+  def close(self):
+    if self._fd is not None and self._pid == os.getpid():
+      os.close(self._fd)
+    self._fd = None
+
 
 class Context:
   """
@@ -32,6 +132,14 @@ class Context:
   
   Attributes:
     interactive: Boolean flag to specify if app is executed in 'interactive' mode.
+    version: Shared multiprocessing RawValue incremented on every write, if any.
+      Polled by wait_for() and watch().
+    lock: FileLock under which the version is incremented, if any.
+    journal: ContextJournal recording every write, if any.
+    read_cache: Boolean flag to serve reads from a snapshot of the shared dict
+      taken once per version, in place of one round trip per read. Requires
+      'version'.
+    buffer_dir: Directory of the memory-mapped files of put_buffer().
   """
   
   def __init__(self, shared_dict, shared_queue):
@@ -39,9 +147,74 @@ class Context:
     self._shared_dict = shared_dict
     self._shared_queue = shared_queue
     self._iter_keys = None
+    self.written = None
+    self.version = None
+    self.lock = None
+    self.journal = None
+    self.read_cache = False
+    self.buffer_dir = os.path.join(tempfile.gettempdir(), 'pyrunner_{}.buffers'.format(os.getpid()))
+    self._cache = None
+    self._cache_version = None
     
     return
   
+  def __getstate__(self):
+    # The read cache is per process
+    state = dict(self.__dict__)
+    state['_cache'] = state['_cache_version'] = None
+    return state
+  
+  def tracked(self):
+    """
+    Returns a Context over the same shared dict and queue which records the
+    keys set through it in its 'written' attribute.
+    """
+    context = Context(self._shared_dict, self._shared_queue)
+    context.interactive = self.interactive
+    context.version = self.version
+    context.lock = self.lock
+    context.journal = self.journal
+    context.read_cache = self.read_cache
+    context.buffer_dir = self.buffer_dir
+    context.written = set()
+    return context
+  
+  def write_lock(self):
+    """
+    Returns the lock under which writes through any Context bump the version,
+    or a no-op context manager if there is no such lock. Holding it holds back
+    the version.
+    """
+    return self.lock if self.lock is not None else nullcontext()
+  
+  def _commit(self, write, op, key, value=None):
+    # The version is bumped after writing, so that a snapshot is never cached
+    # under a version older than its contents. Only the bump is made under the
+    # lock, which the OS releases if a Worker is terminated while holding it
+    write()
+    seq = 0
+    if self.version is not None:
+      with self.write_lock():
+        self.version.value += 1
+        seq = self.version.value
+    if self.journal is not None:
+      self.journal.append(seq, op, key, value)
+  
+  def _cached(self, refresh=True):
+    """
+    Returns the read cache, refreshed if the version has moved on, or None if
+    reads are not cached. Without refresh, a stale cache is also None.
+    """
+    if not self.read_cache or self.version is None:
+      return None
+    version = self.version.value
+    if self._cache is None or version != self._cache_version:
+      if not refresh:
+        return None
+      self._cache = dict(self._shared_dict.copy())
+      self._cache_version = version
+    return self._cache
+  
   # Dictionary emulation methods
   def __iter__(self):
     self._iter_keys = deque(self._shared_dict.keys())
@@ -54,23 +227,29 @@ class Context:
       return self._iter_keys.popleft()
   
   def __getitem__(self, key):
-    return self._shared_dict[key]
+    cache = self._cached()
+    return cache[key] if cache is not None else self._shared_dict[key]
   
   def __setitem__(self, key, value):
-    self._shared_dict[key] = value
+    self.set(key, value)
   
   def __delitem__(self, key):
-    del self._shared_dict[key]
+    self._commit(lambda: self._shared_dict.__delitem__(key), 'delete', key)
   
   def __contains__(self, key):
-    return key in self._shared_dict
+    cache = self._cached()
+    return key in (cache if cache is not None else self._shared_dict)
   
   def items(self):
-    return self._shared_dict.items()
+    cache = self._cached()
+    return list(cache.items()) if cache is not None else self._shared_dict.items()
   
   @property
   def shared_dict(self):
     return self._shared_dict
+  @shared_dict.setter
+  def shared_dict(self, value):
+    self._shared_dict = value
   @property
   def shared_queue(self):
     return self._shared_queue
@@ -80,12 +259,42 @@ class Context:
     return self._shared_dict.keys()
   
   def has_key(self, key):
-    return key in self._shared_dict
+    return key in self
   
   def set(self, key, value):
-    self._shared_dict[key] = value
+    if self.written is not None: self.written.add(key)
+    self._commit(lambda: self._shared_dict.__setitem__(key, value), 'set', key, value)
     return
   
+  def set_many(self, values):
+    """
+    Stores all of the given key/value pairs in a single round trip.
+    """
+    values = dict(values)
+    if self.written is not None: self.written.update(values)
+    self._commit(lambda: self._shared_dict.update(values), 'update', None, values)
+  
+  def get_many(self, keys, default=None):
+    """
+    Returns a dict of the values of the given keys, fetched in a single round
+    trip. Keys which are not set are mapped to the default.
+    """
+    keys = list(keys)
+    cache = self._cached(refresh=False)
+    if cache is not None:
+      return { k:cache.get(k, default) for k in keys }
+    get_many = getattr(self._shared_dict, 'get_many', None)
+    if get_many is not None:
+      return get_many(keys, default)
+    return { k:self._shared_dict.get(k, default) for k in keys }
+  
+  def snapshot(self):
+    """
+    Returns a copy of all keys and values, fetched in a single round trip.
+    """
+    cache = self._cached()
+    return dict(cache) if cache is not None else dict(self._shared_dict.copy())
+  
   def get(self, key, default=None):
     """
     Retrieves value for provided attribute, if any.
@@ -101,7 +310,174 @@ class Context:
     """
     if self.interactive and not default and key not in self._shared_dict:
       self._shared_queue.put(key)
-      while key not in self._shared_dict:
-        time.sleep(0.5)
+      return self.wait_for(key)
+    
+    cache = self._cached()
+    return cache.get(key, default) if cache is not None else self._shared_dict.get(key, default)
+  
+  def _wait_for_change(self, version, timeout=None):
+    """
+    Polls the version until it moves on from the given one, or for at most
+    timeout seconds, backing off from 1 ms to 50 ms between reads. Without a
+    version, there is nothing to poll, and it waits one 50 ms step.
+    """
+    # Polled rather than notified, as multiprocessing Conditions hang once a
+    # Worker is terminated while waiting on them or holding them
+    deadline = None if timeout is None else time.time() + timeout
+    delay = 0.001 if self.version is not None else MAX_POLL_INTERVAL
+    while self.version is None or self.version.value == version:
+      remaining = None if deadline is None else deadline - time.time()
+      if remaining is not None and remaining <= 0:
+        return
+      time.sleep(delay if remaining is None else min(delay, remaining))
+      if self.version is None:
+        return
+      delay = min(delay * 2, MAX_POLL_INTERVAL)
+  
+  def wait_for(self, key, timeout=None):
+    """
+    Returns the value of the given key, waiting until another task or the
+    engine sets it if it is not set yet. The wait polls the Context version,
+    so it returns up to 50 ms after the key is set.
+    
+    Raises:
+      TimeoutError: If the key is still not set after timeout seconds.
+    """
+    deadline = None if timeout is None else time.time() + timeout
+    while True:
+      version = self.version.value if self.version is not None else None
+      if key in self._shared_dict:
+        return self._shared_dict[key]
+      remaining = None if deadline is None else deadline - time.time()
+      if remaining is not None and remaining <= 0:
+        raise TimeoutError('Context key "{}" was not set within {} seconds'.format(key, timeout))
+      self._wait_for_change(version, remaining)
+  
+  def watch(self, prefix='', timeout=None):
+    """
+    Generator of the (key, value) pairs of the keys starting with the given
+    prefix: those already set, then each one as it is set or changed. Changes
+    are found by polling the Context version, up to 50 ms after they are made.
+    
+    Args:
+      prefix (str, optional): Prefix of the keys to watch. All keys by default.
+      timeout (float, optional): Number of seconds without any change after
+        which the generator ends. Never ends by default.
+    """
+    seen = dict()
+    last_change = time.time()
+    while True:
+      version = self.version.value if self.version is not None else None
+      for k,v in sorted(self.snapshot().items()):
+        if k.startswith(prefix) and (k not in seen or seen[k] != v):
+          seen[k] = v
+          last_change = time.time()
+          yield k, v
+      remaining = None if timeout is None else last_change + timeout - time.time()
+      if remaining is not None and remaining <= 0:
+        return
+      self._wait_for_change(version, remaining)
+  
+  def put_buffer(self, key, obj):
+    """
+    Copies a C-contiguous bytes-like object, such as bytes or a NumPy array,
+    into a memory-mapped file under buffer_dir and stores its description under
+    the given key. Tasks on the same host read it back with get_buffer()
+    without any further copy.
+    
+    The engine removes the file once all tasks depending on the task which put
+    it have completed.
+    """
+    view = memoryview(obj)
+    if not view.c_contiguous:
+      raise ValueError('Buffer for "{}" must be C-contiguous'.format(key))
+    os.makedirs(self.buffer_dir, exist_ok=True)
+    path = os.path.join(self.buffer_dir, '{}.buf'.format(uuid.uuid4().hex))
+    with open(path, 'wb') as f:
+      f.write(view)
+    is_array = hasattr(obj, '__array_interface__') and hasattr(obj, 'dtype')
+    self.set(key, {
+      BUFFER_MARKER : path,
+      'nbytes'      : view.nbytes,
+      'format'      : view.format,
+      'shape'       : list(view.shape),
+      'dtype'       : obj.dtype.str if is_array else None
+    })
+  
+  def get_buffer(self, key):
+    """
+    Returns a read-only view of the buffer stored under the given key: a NumPy
+    array if a NumPy array was stored, otherwise a memoryview.
+    
+    Raises:
+      KeyError: If no buffer is stored under the key.
+    """
+    desc = self.get(key)
+    if not is_buffer(desc):
+      raise KeyError(key)
     
-    return self._shared_dict.get(key, default)
\ No newline at end of file
+    if desc['nbytes']:
+      with open(desc[BUFFER_MARKER], 'rb') as f:
+        data = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    else:
+      data = memoryview(b'')
+    
+    if desc['dtype']:
+      import numpy
+      return numpy.frombuffer(data, dtype=desc['dtype']).reshape(desc['shape'])
+    try:
+      return data.cast(desc['format'], desc['shape'])
+    except (TypeError, ValueError):
+      return data
+
+class AsyncContext:
+  """
+  Coroutine facade over a Context, for use within AsyncWorkers.
+  
+  Each access to a Context is a blocking round trip to the Manager process,
+  which would stall every coroutine sharing the event loop. AsyncContext runs
+  those accesses in the loop's default thread pool instead.
+  """
+  
+  def __init__(self, context):
+    self._context = context
+  
+  @property
+  def context(self):
+    return self._context
+  
+  async def _call(self, func, *args):
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+  
+  async def get(self, key, default=None):
+    return await self._call(self._context.get, key, default)
+  
+  async def set(self, key, value):
+    return await self._call(self._context.set, key, value)
+  
+  async def has_key(self, key):
+    return await self._call(self._context.has_key, key)
+  
+  async def delete(self, key):
+    return await self._call(self._context.__delitem__, key)
+  
+  async def get_many(self, keys, default=None):
+    return await self._call(self._context.get_many, keys, default)
+  
+  async def set_many(self, values):
+    return await self._call(self._context.set_many, values)
+  
+  async def snapshot(self):
+    return await self._call(self._context.snapshot)
+  
+  async def get_buffer(self, key):
+    return await self._call(self._context.get_buffer, key)
+  
+  async def put_buffer(self, key, obj):
+    return await self._call(self._context.put_buffer, key, obj)
+  
+  async def wait_for(self, key, timeout=None):
+    return await self._call(self._context.wait_for, key, timeout)
+  
+  async def items(self):
+    return await self._call(lambda: list(self._context.items()))
\ No newline at end of file
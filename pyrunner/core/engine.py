@@ -15,12 +15,23 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import pyrunner.core.constants as constants
+import pyrunner.logger.file as lg
+import pyrunner.scheduling as scheduling
+import pyrunner.executor as executor
+import pyrunner.backend as backend
 from pyrunner.core.config import Config
-from pyrunner.core.context import Context
+from pyrunner.core.context import Context, ContextJournal, is_buffer, BUFFER_MARKER
+from pyrunner.core.history import RuntimeHistory
+from pyrunner.core.filelock import FileLock
+from pyrunner.core.cache import ResultCache
+from pyrunner.core.incremental import BuildState
+from pyrunner.core.admission import ResourceBudget, ConcurrencyPools, LaunchRates, AdaptiveConcurrency, parse_limits, parse_rates, detect_cpus
+from pyrunner.serde import ListSerDe, JsonSerDe
 from pyrunner.core.signal import SignalHandler, SIG_ABORT, SIG_PULSE, SIG_REVIVE
-from multiprocessing import Manager
+from multiprocessing import get_all_start_methods, get_context
+from multiprocessing.connection import wait
 
-import sys, time
+import os, sys, time, shutil, tempfile
 
 class ExecutionEngine:
   """
@@ -34,11 +45,28 @@ class ExecutionEngine:
     self.register = None
     self.start_time = None
     self.save_state_func = lambda *args: None
-    self._wait_until = 0
+    self.policy = scheduling.FifoPolicy()
+    self.history = RuntimeHistory()
+    self.resources = None
+    self.pools = None
+    self.executors = dict()
+    self.context_backend = None
+    self.cache = None
+    self.build_state = None
+    self.rates = None
+    self.adaptive = None
+    self._cache_keys = dict()
+    self._written = dict()
+    self._backups = dict()
+    self._held = dict()
+    self._fail_fast_at = None
+    # Version the Context starts from, above that of any restored writes
+    self._initial_version = 0
     
     # Initialization of Manager proxy objects and Context
-    self._manager = Manager()
-    self._shared_dict = self._manager.dict()
+    self._manager = backend.ContextManager()
+    self._manager.start()
+    self._shared_dict = self._manager.ContextDict()
     self._shared_queue = self._manager.Queue()
     self.context = Context(self._shared_dict, self._shared_queue)
     
@@ -63,6 +91,10 @@ class ExecutionEngine:
   def on_destroy(self, func):
     self._on_destroy_func = func
   
+  def plugin_scheduling_policy(self, obj):
+    if not isinstance(obj, scheduling.SchedulingPolicy): raise Exception('Scheduling policy plugin must implement the SchedulingPolicy interface')
+    self.policy = obj
+  
   def initiate(self, **kwargs):
     """Begins the execution loop."""
     
@@ -70,9 +102,26 @@ class ExecutionEngine:
     sys.path.append(self.config['worker_dir'])
     self.start_time = time.time()
     wait_interval = 1.0/self.config['tickrate'] if self.config['tickrate'] >= 1 else 0
+    event_driven = self.config['event_driven']
     last_save = 0
     
     if not self.register: raise RuntimeError('NodeRegister has not been initialized!')
+    if self.config['incremental']:
+      self._skip_up_to_date(kwargs.get('silent') or self.config['silent'])
+    self.policy.prepare(self.register, self.history)
+    self.register.build_ready_queue(self.policy)
+    self.resources = ResourceBudget(self.config['max_cpus'], self.config['max_mem_mb'])
+    self.pools = ConcurrencyPools(dict(self.register.pools, **parse_limits(self.config['pools'])))
+    for pool in set([ n.pool for n in self.register.all_nodes if n.pool and n.pool not in self.pools.limits ]):
+      print('Warning: No limit has been set for pool "{}"'.format(pool))
+    self.rates = self._create_launch_rates()
+    if self.config['adaptive']:
+      self.adaptive = AdaptiveConcurrency(self.config['min_procs'],
+        self.config['max_procs'] if self.config['max_procs'] > 0 else 2 * detect_cpus(),
+        self.config['target_load'], self.config['min_mem_pct'])
+    self._open_context_store()
+    self._start_executors()
+    self._open_cache()
     
     # App lifecycle - RESTART
     if self.config['restart']:
@@ -98,69 +147,128 @@ class ExecutionEngine:
         
         # Check for revive signals; revive failed nodes, if any
         if signal_handler.consume(SIG_REVIVE):
-          for node in self.register.failed_nodes.copy():
-            node.revive()
-            self.register.failed_nodes.remove(node)
-            self.register.pending_nodes.add(node)
-          for node in self.register.defaulted_nodes.copy():
-            self.register.defaulted_nodes.remove(node)
-            self.register.pending_nodes.add(node)
+          self.register.revive_failed()
+        
+        # Add tasks spawned by running Workers and answer input requests from
+        # interactive mode. Done before polling, so that tasks spawned by a
+        # Worker are in place before it is seen to have completed.
+        self._process_queue()
         
-        # Poll running nodes for completion/failure
-        for node in self.register.running_nodes.copy():
-          retcode = node.poll()
+        # Poll running nodes for completion/failure. Sub-DAG nodes are polled
+        # last, innermost first, so that they see their nodes' final status.
+        for node in sorted(self.register.running_nodes, key=lambda n: (bool(n.subdag), -n.id)):
+          if node.subdag:
+            retcode = self._poll_subdag(node)
+          elif node in self._backups:
+            retcode = self._poll_speculative(node)
+          else:
+            retcode = node.poll()
           if retcode is not None:
-            self.register.running_nodes.remove(node)
+            # Executors such as 'remote' relay the messages of a Worker while
+            # being polled, which must be applied before it is marked done
+            self._process_queue()
+            if not node.subdag:
+              self.resources.release(node)
+              self.pools.release(node)
             if retcode > 0:
-              self.register.failed_nodes.add(node)
-              self.register.set_children_defaulted(node)
+              self.register.set_failed(node)
+              if node.critical or self.config['fail_fast']:
+                self._start_fail_fast(node)
             elif retcode < 0:
-              self.register.pending_nodes.add(node)
+              self.register.set_retry(node)
             else:
-              self.register.completed_nodes.add(node)
+              self.register.set_completed(node)
+              self.history.record(node.name, node.get_elapsed_seconds())
+              written = self._written.pop(node.id, [])
+              self._cache_result(node, written)
+              self.register.track_buffers(node, [ (k, self.context[k][BUFFER_MARKER]) for k in written if is_buffer(self.context.get(k)) ])
+              if self.config['incremental']:
+                self.build_state.record(node)
+        
+        # Forget the pool waits of nodes which left the pending state unlaunched
+        self.pools.discard_settled(self.register.pending_nodes)
+        
+        # Free the Context buffers which all of their consumers are done with
+        if self.register.buffers:
+          self._free_buffers(self.register.release_buffers())
+        
+        # Once the run can no longer succeed, stop the remaining nodes
+        if self._fail_fast_at is not None and (not self._running_workers() or time.time() >= self._fail_fast_at):
+          self._fail_fast()
+          break
         
-        # Check pending nodes for eligibility to execute
-        for node in self.register.pending_nodes.copy():
-          if self.config['max_procs'] > 0 and len(self.register.running_nodes) >= self.config['max_procs']:
+        # Adjust the number of concurrent Workers to the load of the host
+        if self.adaptive:
+          adjustment = self.adaptive.update(self._running_workers())
+          if adjustment and not kwargs.get('silent') and not self.config['silent']:
+            print(adjustment, flush=True)
+        max_procs = self.adaptive.limit if self.adaptive else self.config['max_procs']
+        
+        # Execute nodes whose dependencies have all been met, skipping over
+        # those whose pool is full or whose resource requests do not fit
+        skipped = []
+        while self._fail_fast_at is None and (max_procs <= 0 or self._running_workers() < max_procs):
+          if not self.rates.has_capacity():
             break
           
-          if not time.time() >= self._wait_until:
+          node = self.register.pop_ready()
+          if not node:
             break
           
-          self._wait_until = time.time() + self.config['time_between_tasks']
-          runnable = True
-          for p in node.parent_nodes:
-            if p.id >= 0 and p not in self.register.completed_nodes.union(self.register.norun_nodes):
-              runnable = False
-              break
-          if runnable and node.is_runnable():
-            self.register.pending_nodes.remove(node)
-            node.context = self.context
-            node.execute()
-            self.register.running_nodes.add(node)
+          if node.cache and self._restore_cached(node):
+            continue
+          
+          if node.subdag:
+            self._expand_subdag(node)
+            continue
+          
+          node_executor = self.executors[node.executor or self.config['executor']]
+          if not self.pools.fits(node) or not self.resources.fits(node) or not self.rates.fits(node) or not node_executor.fits(node):
+            skipped.append(node)
+            continue
+          
+          node.context = self.context
+          node.execute(node_executor)
+          self.register.set_running(node)
+          self.resources.acquire(node)
+          self.pools.acquire(node)
+          self.rates.acquire(node)
+        
+        for node in reversed(skipped):
+          self.register.requeue_ready(node)
+        
+        # Launch second attempts of straggling speculative nodes on idle slots
+        if self._fail_fast_at is None and not skipped and not self.register.has_ready():
+          self._speculate(max_procs)
         
         if not kwargs.get('silent') and not self.config['silent']:
           self._print_current_state()
         
-        # Check for input requests from interactive mode
-        while self.context and self.context.shared_queue and not self.context.shared_queue.empty():
-          key = self.context.shared_queue.get()
-          value = input("Please provide value for '{}': ".format(key))
-          self.context.set(key, value)
-        
         # Persist state to disk at set intervals
         if not self.config['test_mode'] and self.save_state_func and (time.time() - last_save) >= self.config['save_interval']:
           self.save_state_func(True)
           last_save = time.time()
         
         # Wait
-        if wait_interval > 0:
+        if event_driven:
+          self._wait_for_event(last_save)
+        elif wait_interval > 0:
           time.sleep(wait_interval - ((time.time() - self.start_time) % wait_interval))
     except KeyboardInterrupt:
       print('\nKeyboard Interrupt Received')
       print('\nCancelling Execution')
       self._abort_all_workers()
       return -1
+    finally:
+      self._shutdown_executors()
+      self._close_context_store()
+    
+    # Buffers are kept after a failure, for a restart
+    if not self.register.failed_nodes and not self.register.aborted_nodes:
+      for buffers in self.register.buffers.values():
+        self._free_buffers(buffers)
+      self.register.buffers = dict()
+      shutil.rmtree(self.context.buffer_dir, ignore_errors=True)
     
     # App lifecycle - SUCCESS
     if len(self.register.failed_nodes) == 0:
@@ -183,12 +291,377 @@ class ExecutionEngine:
     
     return len(self.register.failed_nodes)
   
+  def _process_queue(self):
+    while self.context and self.context.shared_queue and not self.context.shared_queue.empty():
+      item = self.context.shared_queue.get()
+      if isinstance(item, tuple) and item[0] == 'spawn':
+        self._spawn_nodes(*item[1:])
+      elif isinstance(item, tuple) and item[0] == 'written':
+        self._written[item[1]] = item[2]
+      else:
+        value = input("Please provide value for '{}': ".format(item))
+        self.context.set(item, value)
+  
+  def _spawn_nodes(self, parent_id, tasks, join):
+    parent = self.register.find_node(id=parent_id)
+    if not parent:
+      print('Warning: Ignoring tasks spawned by unknown task ID {}'.format(parent_id))
+      return
+    
+    try:
+      added = self.register.spawn_nodes(parent, tasks, join)
+    except ValueError as e:
+      print('Warning: Ignoring tasks spawned by {}: {}'.format(parent.name, str(e)))
+      return
+    
+    # Persist the new nodes right away, so that a restart picks them up
+    if added and not self.config['test_mode'] and self.save_state_func:
+      self.save_state_func(True, True)
+  
+  def _start_fail_fast(self, node):
+    if self._fail_fast_at is not None:
+      return
+    self._fail_fast_at = time.time() + max(0, self.config['fail_fast_grace'])
+    print('Critical task {} failed. No further tasks will be launched{}.'.format(node.name,
+      ', running tasks are terminated in {} sec.'.format(self.config['fail_fast_grace']) if self.config['fail_fast_grace'] > 0 and self._running_workers() else ''), flush=True)
+  
+  def _fail_fast(self):
+    """
+    Terminates running Workers, marks the pending nodes NORUN and saves the
+    state of the run right away, ready for a restart.
+    """
+    for backup in self._backups.values():
+      backup.terminate('Fail-fast: another critical task has failed. Terminating Worker.')
+    self._backups = dict()
+    self._held = dict()
+    self.register.halt_pending()
+    for node in self.register.running_nodes.copy():
+      node.terminate('Fail-fast: another critical task has failed. Terminating Worker.')
+      self.resources.release(node)
+      self.pools.release(node)
+      self.register.set_aborted(node)
+    if not self.config['test_mode'] and self.save_state_func:
+      self.save_state_func(True)
+  
+  def _running_workers(self):
+    # Expanded sub-DAG nodes do not run a Worker of their own, while nodes with
+    # a speculative attempt run two
+    return self.register.running_workers + len(self._backups)
+  
+  def _speculation_time(self, node):
+    """
+    Returns the epoch time at which a speculative node becomes a straggler, or
+    None if it is not eligible for a second attempt.
+    """
+    if not node.speculative or node.subdag or node in self._backups or node.winning_attempt or not node._start_time:
+      return None
+    median = self.history.median(node.name)
+    return node._start_time + median * self.config['speculative_multiplier'] if median else None
+  
+  def _speculate(self, max_procs):
+    for node in sorted(self.register.running_nodes):
+      if max_procs > 0 and self._running_workers() >= max_procs:
+        return
+      straggling_since = self._speculation_time(node)
+      if not straggling_since or time.time() < straggling_since or not node._proc:
+        continue
+      node_executor = self.executors[node.executor or self.config['executor']]
+      if not self.pools.fits(node) or not self.resources.fits(node) or not node_executor.fits(node):
+        continue
+      
+      backup = node.create_backup()
+      backup.context = self.context
+      backup.execute(node_executor)
+      if not backup._proc:
+        continue
+      self._backups[node] = backup
+      self.resources.acquire(node)
+      self.pools.acquire(node)
+      print('Task {} has run for {:0.2f} sec. Launched speculative attempt 2.'.format(node.name, node.get_elapsed_seconds()), flush=True)
+  
+  def _poll_speculative(self, node):
+    """
+    Polls both attempts of a node with a speculative attempt. The first attempt
+    to succeed wins and the other is terminated. If one attempt fails, the node
+    carries on with the other, and only fails if both do.
+    """
+    backup = self._backups[node]
+    if node not in self._held:
+      retcode = node.poll()
+      if retcode == 0:
+        backup.terminate('Attempt 1 succeeded first. Terminating speculative attempt 2.')
+        return self._end_speculation(node, 1)
+      elif retcode is not None:
+        self._held[node] = retcode
+    
+    retcode = backup.poll()
+    if retcode == 0:
+      if self._held.pop(node, None) is None:
+        node.terminate('Speculative attempt 2 succeeded first. Terminating attempt 1.')
+      node._end_time = time.time()
+      return self._end_speculation(node, 2)
+    elif retcode is not None:
+      self._end_speculation(node)
+      return self._held.pop(node, None)
+    return None
+  
+  def _end_speculation(self, node, winner=None):
+    backup = self._backups.pop(node)
+    self.resources.release(node)
+    self.pools.release(node)
+    if winner:
+      node.winning_attempt = winner
+    if backup.logfile and os.path.isfile(backup.logfile):
+      logger = lg.FileLogger(node.logfile)
+      logger.open(False)
+      logger.append_log(backup.logfile, 'SPECULATIVE ATTEMPT 2{}'.format(' (WINNER)' if winner == 2 else ''))
+      logger.close(False)
+      os.remove(backup.logfile)
+    return 0
+  
+  def _expand_subdag(self, node):
+    """
+    Reads the process file of a sub-DAG node which has become ready, adds its
+    nodes to the register and marks the sub-DAG node as running.
+    """
+    path = node.subdag
+    if not os.path.isabs(path) and self.config['proc_file']:
+      path = os.path.join(os.path.dirname(os.path.abspath(self.config['proc_file'])), path)
+    
+    try:
+      serde = JsonSerDe() if path.lower().endswith('.json') else ListSerDe()
+      sub_register = serde.deserialize(path)
+      if not sub_register:
+        raise ValueError('Invalid process file {}'.format(path))
+      # Nested sub-DAG files are relative to the file that references them
+      for n in sub_register.all_nodes:
+        if n.subdag and not os.path.isabs(n.subdag):
+          n.subdag = os.path.join(os.path.dirname(os.path.abspath(path)), n.subdag)
+      added = self.register.expand_subdag(node, sub_register)
+    except (OSError, ValueError, RuntimeError) as e:
+      print('Failed to expand sub-DAG {}: {}'.format(node.name, str(e)))
+      self.register.set_running(node)
+      self.register.set_failed(node)
+      return
+    
+    node._start_time = node._start_time or time.time()
+    self.register.set_running(node)
+    
+    # Persist the new nodes right away, so that a restart picks them up
+    if added and not self.config['test_mode'] and self.save_state_func:
+      self.save_state_func(True, True)
+  
+  def _poll_subdag(self, node):
+    retcode = self.register.poll_subdag(node)
+    if retcode is not None:
+      node._end_time = time.time()
+    return retcode
+  
+  def _skip_up_to_date(self, silent=False):
+    if not self.build_state:
+      self.build_state = BuildState(None, self.config['incremental_check'])
+    reasons = self.build_state.mark_up_to_date(self.register)
+    skipped = sorted([ n for n,r in reasons.items() if r is None ])
+    if skipped and not silent:
+      print('Skipping {} up-to-date tasks: {}'.format(len(skipped), ', '.join([ n.name for n in skipped ])))
+  
+  def _open_cache(self):
+    self.cache = None
+    self._cache_keys = dict()
+    self._written = dict()
+    if not any([ n.cache for n in self.register.all_nodes ]):
+      return
+    if not self.config.result_cache_dir:
+      print('Warning: Result cache is disabled, as no cache directory has been configured')
+      return
+    self.cache = ResultCache(self.config.result_cache_dir, self.config['cache_max_mb'])
+  
+  def _restore_cached(self, node):
+    """
+    Marks the given node completed without executing it, if the result cache
+    holds a result for its current key, and restores the Context keys it set.
+    Otherwise, remembers the key so the result can be stored on success.
+    """
+    if not self.cache:
+      return False
+    
+    try:
+      key = self.cache.key(node, self.context)
+    except Exception as e:
+      print('Warning: Unable to compute cache key of {}: {}'.format(node.name, str(e)))
+      return False
+    
+    updates = self.cache.lookup(key)
+    if updates is None:
+      self._cache_keys[node] = key
+      return False
+    
+    for k,v in updates.items():
+      self.context.set(k, v)
+    logger = lg.FileLogger(node.logfile)
+    logger.open(False)
+    logger._system_('Skipped execution - restored result {} from cache'.format(key[:12]))
+    logger.close(False)
+    self.register.set_completed(node)
+    return True
+  
+  def _cache_result(self, node, written):
+    key = self._cache_keys.pop(node, None)
+    if self.cache and key:
+      self.cache.store(key, { k:self.context[k] for k in written if k in self.context })
+  
+  def _create_launch_rates(self):
+    """
+    Returns the LaunchRates for this run. A time_between_tasks without a
+    launch_rate is treated as a rate of one launch per that many seconds.
+    """
+    rate, burst = self.config['launch_rate'], self.config['launch_burst']
+    if (not rate or rate <= 0) and self.config['time_between_tasks'] > 0:
+      rate, burst = 1.0 / self.config['time_between_tasks'], 1
+    return LaunchRates(rate, burst, parse_rates(self.config['pool_rates']))
+  
+  def _open_context_store(self):
+    """
+    Sets up the version counter of the Context and moves the Context into the
+    configured backend, so that Workers reach it without a round trip to the
+    Manager process, for other backends than 'manager'.
+    """
+    mp = get_context(self.config['start_method'])
+    self.context.version = mp.RawValue('Q', self._initial_version)
+    self.context.lock = FileLock(os.path.join(tempfile.gettempdir(), 'pyrunner_{}.ctxlock'.format(os.getpid())))
+    self.context.buffer_dir = self.config.buffer_dir or os.path.join(tempfile.gettempdir(), 'pyrunner_{}.buffers'.format(os.getpid()))
+    self.context.read_cache = self.config['context_cache']
+    self.context_backend = self._create_context_backend(self.config['context_backend']).start()
+    journal_file = self.config.ctx_journal_file
+    if not self.context_backend.persistent and journal_file and os.path.isdir(os.path.dirname(journal_file)) and not self.config['test_mode']:
+      self.context.journal = ContextJournal(journal_file)
+      # The journal of a prior run has been replayed by a restart, or is stale
+      if not self.config['restart']:
+        self.context.journal.truncate()
+    store = self.context_backend.store
+    if store is not self._shared_dict:
+      # Carries over values set before the run, such as Context var overrides
+      store.update(self._shared_dict.copy())
+      self.context.shared_dict = store
+  
+  def _create_context_backend(self, name):
+    if name == 'manager':
+      return backend.ManagerBackend(self._shared_dict)
+    elif name == 'shm':
+      return backend.SharedMemoryBackend(self.config['context_slots'], self.config['context_slot_size'])
+    elif name == 'sqlite':
+      path = self.config.ctx_db_file or os.path.join(tempfile.gettempdir(), 'pyrunner_{}.ctxdb'.format(os.getpid()))
+      return backend.SqliteBackend(path, reset=not self.config['restart'])
+    raise ValueError('Unknown context backend: {}'.format(name))
+  
+  def _close_context_store(self):
+    if self.context_backend is None:
+      return
+    # Hands the final values of backends which do not outlive the engine back
+    # to the Manager dict, which state is saved from
+    if not self.context_backend.persistent and self.context.shared_dict is not self._shared_dict:
+      self._shared_dict.update(self.context.shared_dict.copy())
+      self.context.shared_dict = self._shared_dict
+    self.context_backend.close()
+    if self.context.journal is not None:
+      self.context.journal.close()
+    # No Worker writes to the Context anymore
+    self.context.lock.close(remove=True)
+    self.context.lock = None
+  
+  def _free_buffers(self, buffers):
+    for key, path in buffers:
+      if is_buffer(self.context.get(key)) and self.context[key][BUFFER_MARKER] == path:
+        del self.context[key]
+      if os.path.isfile(path):
+        os.remove(path)
+  
+  def _start_executors(self):
+    names = set([self.config['executor']] + [ n.executor for n in self.register.all_nodes if n.executor ])
+    for name in names:
+      if name not in ['process', 'pool', 'thread', 'async', 'remote']:
+        raise ValueError('Unknown executor: {}'.format(name))
+    if self.config['start_method'] not in get_all_start_methods():
+      raise ValueError('Unsupported start method: {}'.format(self.config['start_method']))
+    
+    self.executors = dict()
+    for name in names:
+      self.executors[name] = self._create_executor(name).start()
+  
+  def _create_executor(self, name):
+    if name == 'pool':
+      size = self.config['pool_size'] if self.config['pool_size'] > 0 else self.config['max_procs'] if self.config['max_procs'] > 0 else detect_cpus()
+      return executor.PoolExecutor(self.context, size, self.config['pool_max_tasks'], self.config['start_method'], self._worker_modules())
+    elif name == 'thread':
+      return executor.ThreadExecutor(self.config['pool_size'] if self.config['pool_size'] > 0 else None)
+    elif name == 'async':
+      return executor.AsyncExecutor()
+    elif name == 'remote':
+      authkey = self.config['agent_authkey'].encode() if self.config['agent_authkey'] else None
+      return executor.RemoteExecutor(self.context, executor.parse_agents(self.config['agents']), authkey)
+    else:
+      return executor.ProcessExecutor(self.config['start_method'], self._worker_modules())
+  
+  def _worker_modules(self):
+    return [ n.module for n in self.register.all_nodes if n.module ]
+  
+  def _shutdown_executors(self):
+    for e in self.executors.values():
+      e.shutdown()
+    self.executors = dict()
+  
+  def _wait_for_event(self, last_save):
+    """
+    Blocks until a running Worker exits or the next timed event becomes due.
+    
+    Timed events are retry wait times, Worker timeouts, the next launch token,
+    the state save interval, and checks for signals and interactive input. If
+    none of these apply, the wait only ends once a Worker process exits.
+    """
+    if not self.register.running_nodes and not self.register.pending_nodes:
+      return
+    
+    now = time.time()
+    deadlines = []
+    sentinels = []
+    
+    for node in self.register.running_nodes:
+      if node.subdag:
+        continue
+      attempts = ([] if node in self._held else [ node ]) + ([ self._backups[node] ] if node in self._backups else [])
+      for attempt in attempts:
+        if attempt.sentinel is None:
+          return
+        sentinels.append(attempt.sentinel)
+        deadlines.append(attempt.deadline)
+      if self._speculation_time(node):
+        deadlines.append(self._speculation_time(node))
+    
+    if self.register.next_ready_time():
+      deadlines.append(self.register.next_ready_time())
+    if self._fail_fast_at is not None:
+      deadlines.append(self._fail_fast_at)
+    if self.register.has_ready() and self.rates.next_time():
+      deadlines.append(self.rates.next_time())
+    if self.adaptive:
+      deadlines.append(self.adaptive.next_time())
+    if not self.config['test_mode'] and self.save_state_func:
+      deadlines.append(last_save + self.config['save_interval'])
+    if self.config['temp_dir'] or (self.context and self.context.interactive):
+      deadlines.append(now + constants.SIGNAL_CHECK_INTERVAL)
+    
+    timeout = max(0, min(deadlines) - now) if deadlines else None
+    if not sentinels and timeout is None:
+      timeout = constants.SIGNAL_CHECK_INTERVAL
+    
+    wait(sentinels, timeout)
+  
   def _abort_all_workers(self):
+    for backup in self._backups.values():
+      backup.terminate('Keyboard Interrupt (SIGINT) received. Terminating Worker and exiting.')
     for node in self.register.running_nodes.copy():
       node.terminate('Keyboard Interrupt (SIGINT) received. Terminating Worker and exiting.')
-      self.register.running_nodes.remove(node)
-      self.register.aborted_nodes.add(node)
-      self.register.set_children_defaulted(node)
+      self.register.set_aborted(node)
     self.save_state_func(False, True)
     self._print_final_state(True)
   
@@ -204,6 +677,10 @@ class ExecutionEngine:
         len(self.register.defaulted_nodes),
         elapsed
       ), flush=True)
+      if self.pools.limits:
+        print('Pools: {}'.format(' | '.join([ '{}: {}/{} running, {} queued, avg wait {:0.2f} sec.'.format(
+          name, self.pools.running[name], limit, self.pools.queued(name), self.pools.avg_wait(name)
+        ) for name,limit in sorted(self.pools.limits.items()) ])), flush=True)
     else:
       print(chr(27) + "[2J")
       print('Elapsed Time: {:0.2f}'.format(elapsed))
@@ -215,7 +692,13 @@ class ExecutionEngine:
         print('  {} - {}'.format(p.id, p.name))
       if self.register.running_nodes: print('\nRUNNING TASKS')
       for p in self.register.running_nodes:
-        print('  {} - {}'.format(p.id, p.name))
+        if p.subdag:
+          print('  {} - {} (sub-DAG: {})'.format(p.id, p.name, ', '.join([ '{} {}'.format(c, k) for k,c in sorted(self.register.subdag_counts(p).items()) ])))
+        else:
+          print('  {} - {}'.format(p.id, p.name))
+      if self.pools.limits: print('\nPOOLS')
+      for name,limit in sorted(self.pools.limits.items()):
+        print('  {} - {}/{} running, {} queued, avg wait {:0.2f} sec.'.format(name, self.pools.running[name], limit, self.pools.queued(name), self.pools.avg_wait(name)))
     
     return
   
@@ -239,6 +722,22 @@ class ExecutionEngine:
     else:
       print('Final Status: SUCCESS\n')
     
+    if self.pools and self.pools.limits:
+      print('Pool Usage:\n')
+      for name,limit in sorted(self.pools.limits.items()):
+        print('  {} (limit {}): {} tasks waited for a slot, avg wait {:0.2f} sec., max wait {:0.2f} sec., {} still queued'.format(
+          name, limit, self.pools.waited[name], self.pools.avg_wait(name), self.pools.max_wait[name], self.pools.queued(name)))
+      print('')
+    
+    if self.register.halted_nodes:
+      print('Fail-fast: {} tasks were not executed, and will be on restart\n'.format(len(self.register.halted_nodes)))
+    
+    if self.adaptive:
+      print('Adaptive Concurrency: {} adjustments, final limit {}\n'.format(len(self.adaptive.adjustments), self.adaptive.limit))
+    
+    if self.cache:
+      print('Result Cache: {} hits, {} misses\n'.format(self.cache.hits, self.cache.misses))
+    
     return
   
   def _print_node_info(self, n, dump_logs=False):
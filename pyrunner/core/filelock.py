@@ -0,0 +1,76 @@
+# Copyright 2019 Comcast Cable Communications Management, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import fcntl
+import threading
+
+class FileLock:
+  """
+  Lock shared by processes through a record lock on a file, which the OS
+  releases if the process holding it dies, unlike multiprocessing locks. Threads
+  of a process are serialized by a thread lock in addition.
+  
+  Args:
+    path (str): Path of the lock file, created if missing.
+  """
+  
+  def __init__(self, path):
+    self.path = path
+    self._fd = None
+    self._pid = None
+    self._thread_lock = None
+  
+  def __getstate__(self):
+    return { 'path': self.path }
+  
+  def __setstate__(self, state):
+    self.__init__(state['path'])
+  
+  def acquire(self):
+    # Neither lock is inherited by forked processes
+    if self._pid != os.getpid():
+      self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+      self._thread_lock = threading.Lock()
+      self._pid = os.getpid()
+    self._thread_lock.acquire()
+    try:
+      fcntl.lockf(self._fd, fcntl.LOCK_EX)
+    except BaseException:
+      self._thread_lock.release()
+      raise
+    return True
+  
+  def release(self):
+    fcntl.lockf(self._fd, fcntl.LOCK_UN)
+    self._thread_lock.release()
+  
+  def __enter__(self):
+    return self.acquire()
+  
+  def __exit__(self, *args):
+    self.release()
+  
+  def close(self, remove=False):
+    """
+    Closes the lock file, and removes it if asked to.
+    """
+    if self._fd is not None and self._pid == os.getpid():
+      os.close(self._fd)
+    self._fd = None
+    self._pid = None
+    if remove and os.path.isfile(self.path):
+      os.remove(self.path)
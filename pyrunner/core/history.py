@@ -0,0 +1,75 @@
+# Copyright 2019 Comcast Cable Communications Management, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import json
+import statistics
+
+class RuntimeHistory:
+  """
+  Durations of prior successful executions of each task, keyed on task name.
+  
+  Used to estimate how long a task will take to execute when it does not
+  declare an expected_duration. Only the most recent durations of each task
+  are kept.
+  
+  Args:
+    history_file (str, optional): Path of the JSON file to load from and
+      save to. If None, history is kept in memory only.
+    max_samples (int, optional): Number of durations kept per task. Default: 10
+  """
+  
+  def __init__(self, history_file=None, max_samples=10):
+    self.history_file = history_file
+    self.max_samples = max_samples
+    self._samples = dict()
+    
+    if history_file and os.path.isfile(history_file):
+      try:
+        with open(history_file) as f:
+          self._samples = json.load(f)
+      except ValueError:
+        print('Ignoring unreadable runtime history file: {}'.format(history_file))
+    
+    return
+  
+  def record(self, name, duration):
+    samples = self._samples.setdefault(name, [])
+    samples.append(round(float(duration), 3))
+    del samples[:-self.max_samples]
+  
+  def median(self, name):
+    """
+    Returns the median duration in seconds of the given task, or None if the
+    task has no recorded history.
+    """
+    samples = self._samples.get(name)
+    return statistics.median(samples) if samples else None
+  
+  def save(self):
+    if not self.history_file:
+      return
+    
+    tmp  = self.history_file+'.tmp'
+    perm = self.history_file
+    
+    try:
+      with open(tmp, 'w') as f:
+        json.dump(self._samples, f)
+      os.replace(tmp, perm)
+    except Exception:
+      print('Failure in RuntimeHistory.save()')
+      raise
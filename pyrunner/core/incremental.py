@@ -0,0 +1,154 @@
+# Copyright 2019 Comcast Cable Communications Management, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import glob
+import json
+import hashlib
+
+class BuildState:
+  """
+  Decides which tasks are up to date in incremental mode, from the 'inputs'
+  and 'outputs' globs they declare, in the manner of make.
+  
+  A task is up to date if all of its outputs exist and, depending on method:
+    - 'mtime': none of its inputs is newer than its oldest output.
+    - 'checksum': its inputs have the same checksums as when it last
+      succeeded. These are recorded in state_file.
+  
+  Tasks downstream of a task which is not up to date are never up to date
+  either. Tasks without outputs always execute, but do not cause downstream
+  tasks to execute.
+  
+  Args:
+    state_file (str, optional): Path of the JSON file holding the input
+      checksums recorded by prior runs. If None, they are kept in memory only.
+    method (str, optional): 'mtime' or 'checksum'. Default: 'mtime'
+  """
+  
+  def __init__(self, state_file=None, method='mtime'):
+    if method not in ['mtime', 'checksum']:
+      raise ValueError('Unknown incremental check: {}'.format(method))
+    self.state_file = state_file
+    self.method = method
+    self._checksums = dict()
+    
+    if state_file and os.path.isfile(state_file):
+      try:
+        with open(state_file) as f:
+          self._checksums = json.load(f)
+      except ValueError:
+        print('Ignoring unreadable build state file: {}'.format(state_file))
+    
+    return
+  
+  def evaluate(self, register):
+    """
+    Returns a dict mapping each pending node of the given NodeRegister to the
+    reason it must execute, or to None if it is up to date.
+    """
+    reasons = dict()
+    stale = set()
+    
+    for node in register.sorted_nodes():
+      if node not in register.pending_nodes:
+        continue
+      if not node.outputs:
+        reasons[node] = 'no outputs declared'
+        continue
+      
+      upstream = sorted([ p for p in node.parent_nodes if p in stale ])
+      reasons[node] = 'upstream task "{}" executes'.format(upstream[0].name) if upstream else self._check(node)
+      if reasons[node]:
+        stale.add(node)
+    
+    return reasons
+  
+  def mark_up_to_date(self, register):
+    """
+    Moves every up to date pending node of the given NodeRegister to
+    COMPLETED, and returns the reasons of evaluate().
+    """
+    reasons = self.evaluate(register)
+    for node, reason in reasons.items():
+      if reason is None:
+        register.set_completed(node)
+    return reasons
+  
+  def _check(self, node):
+    outputs = []
+    for pattern in node.outputs:
+      matches = glob.glob(pattern)
+      if not matches:
+        return 'output {} does not exist'.format(pattern)
+      outputs.extend(matches)
+    
+    inputs = []
+    for pattern in node.inputs or []:
+      matches = glob.glob(pattern)
+      if not matches:
+        return 'input {} does not exist'.format(pattern)
+      inputs.extend(matches)
+    
+    if self.method == 'checksum':
+      recorded = self._checksums.get(node.name)
+      if recorded is None:
+        return 'no checksums recorded by a prior run'
+      current = self._checksum_files(inputs)
+      changed = sorted([ p for p in set(current).union(recorded) if current.get(p) != recorded.get(p) ])
+      if changed:
+        return 'input {} has changed'.format(changed[0])
+    else:
+      oldest = min([ os.path.getmtime(p) for p in outputs ])
+      newer = sorted([ p for p in inputs if os.path.getmtime(p) > oldest ])
+      if newer:
+        return 'input {} is newer than the outputs'.format(newer[0])
+    
+    return None
+  
+  def _checksum_files(self, paths):
+    checksums = dict()
+    for path in paths:
+      h = hashlib.sha256()
+      with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+          h.update(chunk)
+      checksums[path] = h.hexdigest()
+    return checksums
+  
+  def record(self, node):
+    """
+    Records the checksums of the inputs of a node which has just succeeded.
+    """
+    if self.method != 'checksum' or not node.outputs:
+      return
+    paths = [ p for pattern in node.inputs or [] for p in glob.glob(pattern) ]
+    self._checksums[node.name] = self._checksum_files(paths)
+  
+  def save(self):
+    if not self.state_file:
+      return
+    
+    tmp  = self.state_file+'.tmp'
+    perm = self.state_file
+    
+    try:
+      with open(tmp, 'w') as f:
+        json.dump(self._checksums, f)
+      os.replace(tmp, perm)
+    except Exception:
+      print('Failure in BuildState.save()')
+      raise
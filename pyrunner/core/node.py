@@ -16,8 +16,9 @@
 
 import pyrunner.logger.file as lg
 from pyrunner.worker.abstract import Worker
+from pyrunner.executor.process import ProcessExecutor
 
-import time, multiprocessing, importlib
+import time, copy, importlib
 
 class ExecutionNode:
   """
@@ -28,6 +29,25 @@ class ExecutionNode:
   to a variety of runtime statistics/state information.
   """
   
+  # Optional attributes accepted by NodeRegister.add_node(), mapped to their
+  # default values. SerDe implementations persist those not left at default.
+  OPTIONAL_ATTRIBUTES = {
+    'priority'          : 0,
+    'expected_duration' : None,
+    'cpus'              : 0,
+    'mem_mb'            : 0,
+    'pool'              : None,
+    'executor'          : None,
+    'cache'             : False,
+    'cache_keys'        : None,
+    'inputs'            : None,
+    'outputs'           : None,
+    'subdag'            : None,
+    'speculative'       : False,
+    'winning_attempt'   : None,
+    'critical'          : False
+  }
+  
   def __init__(self, id=-1, name=None):
     if int(id) < -1:
       raise ValueError('id must be -1 or greater')
@@ -54,7 +74,28 @@ class ExecutionNode:
     
     self._module = None
     self._worker = None
-    self._worker_instance = None
+    
+    # Scheduling hints
+    self._priority = 0
+    self._expected_duration = None
+    
+    # Resource requests
+    self._cpus = 0
+    self._mem_mb = 0
+    self._pool = None
+    self._executor = None
+    
+    # Result caching and incremental builds
+    self._cache = False
+    self._cache_keys = None
+    self._inputs = None
+    self._outputs = None
+    
+    # Sub-DAG, speculative execution and fail-fast
+    self._subdag = None
+    self._speculative = False
+    self._winning_attempt = None
+    self._critical = False
     
     self._parent_nodes = set()
     self._child_nodes = set()
@@ -73,19 +114,42 @@ class ExecutionNode:
   def is_runnable(self):
     return time.time() >= self._wait_until
   
+  @property
+  def wait_until(self):
+    return self._wait_until
+  
+  @property
+  def deadline(self):
+    """
+    Epoch time at which the running Worker will have exceeded its timeout.
+    """
+    return self._start_time + self._timeout if self._start_time else float('inf')
+  
+  @property
+  def sentinel(self):
+    """
+    Handle which becomes ready once the running Worker process exits, suitable
+    for multiprocessing.connection.wait(). None if no process is running.
+    """
+    return self._proc.sentinel if self._proc else None
+  
   def revive(self):
     self._attempts = 0
     self._wait_until = time.time() + self._exec_interval
   
-  def execute(self):
+  def execute(self, executor=None):
     """
     Spawns a new process via the `run` method of defined Worker class.
     
-    Utilizes multiprocessing's Process to fork a new process to execute the `run` method implemented
-    in the provided Worker class.
+    By default, utilizes multiprocessing's Process to fork a new process to execute the
+    `run` method implemented in the provided Worker class. Another Executor may be given
+    to run the Worker elsewhere, such as in a pre-forked process pool.
     
     Workers are given references to the shared Context, main-proc <-> child-proc return code value,
     logfile handle, and task-level arguments.
+    
+    Args:
+      executor (Executor, optional): The Executor to submit the Worker to. Default: ProcessExecutor
     """
     # Return early if retry triggered and wait time has not yet fully elapsed
     if not self.is_runnable():
@@ -101,10 +165,8 @@ class ExecutionNode:
       if not issubclass(self.worker_class, Worker):
         raise TypeError('{}.{} is not an extension of pyrunner.Worker'.format(self.module, self.worker))
       
-      # Launch the "run" method of the provided Worker under a new process.
-      self._worker_instance = self.worker_class(self.context, self.logfile, self.argv, self.as_service)
-      self._proc = multiprocessing.Process(target=self._worker_instance.protected_run, daemon=False)
-      self._proc.start()
+      # Launch the "run" method of the provided Worker via the executor.
+      self._proc = (executor or ProcessExecutor()).submit(self)
     except Exception as e:
       logger = lg.FileLogger(self.logfile)
       logger.open()
@@ -113,6 +175,44 @@ class ExecutionNode:
     
     return
   
+  def create_backup(self):
+    """
+    Returns a copy of this node for a speculative second attempt at running its
+    Worker, which logs to a separate <logfile>.attempt2 file.
+    """
+    backup = copy.copy(self)
+    backup._proc = None
+    backup._attempts = 0
+    backup._max_attempts = 1
+    backup._wait_until = 0
+    backup._start_time = 0
+    backup._end_time = 0
+    if self.logfile:
+      backup._logfile = '{}.attempt2'.format(self.logfile)
+    return backup
+  
+  def create_worker(self):
+    """
+    Returns a new instance of this node's Worker class, for an Executor to run.
+    """
+    worker = self.worker_class(self.context, self.logfile, self.argv, self.as_service)
+    worker.node_id = self.id
+    return worker
+  
+  def get_descriptor(self):
+    """
+    Returns a picklable description of the Worker to execute for this node.
+    """
+    return {
+      'id'         : self.id,
+      'name'       : self.name,
+      'module'     : self.module,
+      'worker'     : self.worker,
+      'argv'       : self.argv,
+      'logfile'    : self.logfile,
+      'as_service' : self.as_service
+    }
+  
   def poll(self, wait=False):
     """
     Polls the running process for completion and returns the worker's return code. None if still running.
@@ -136,7 +236,7 @@ class ExecutionNode:
       # causing the thread to block until it's job is complete.
       self._proc.join()
       self._end_time = time.time()
-      retcode = self._worker_instance.retcode
+      retcode = self._proc.retcode
       if retcode > 0 and (self._attempts < self.max_attempts):
         logger = lg.FileLogger(self.logfile)
         logger.open(False)
@@ -155,7 +255,7 @@ class ExecutionNode:
     """
     Immediately terminates the Worker, if running.
     """
-    if self._proc.is_alive():
+    if self._proc and self._proc.is_alive():
       self._proc.terminate()
       logger = lg.FileLogger(self.logfile)
       logger.open(False)
@@ -167,7 +267,6 @@ class ExecutionNode:
   def cleanup(self):
     self._proc = None
     self._context = None
-    self._worker_instance = None
   
   
   # ########################## MISC ########################## #
@@ -214,14 +313,22 @@ class ExecutionNode:
       c.pretty_print('{}  '.format(indent))
     return
   
-  def get_elapsed_time(self):
+  def get_elapsed_seconds(self):
     end_time = self._end_time if self._end_time else time.time()
     
     if self._start_time and end_time and end_time > self._start_time:
-      elapsed_time = end_time - self._start_time
-      return time.strftime("%H:%M:%S", time.gmtime(elapsed_time))
+      return end_time - self._start_time
     else:
-      return '00:00:00'
+      return 0
+  
+  def get_elapsed_time(self):
+    return time.strftime("%H:%M:%S", time.gmtime(self.get_elapsed_seconds()))
+  
+  def get_optional_attributes(self):
+    """
+    Returns a dict of the optional attributes which are not set to their default values.
+    """
+    return { k:getattr(self, k) for k,v in self.OPTIONAL_ATTRIBUTES.items() if getattr(self, k) != v }
   
   
   # ########################## SETTERS + GETTERS ########################## #
@@ -365,4 +472,131 @@ class ExecutionNode:
     if int(value) < 0:
       raise ValueError('exec_interval must be >= 0')
     self._exec_interval = int(value)
+    return self
+  
+  @property
+  def priority(self):
+    return getattr(self, '_priority', 0)
+  @priority.setter
+  def priority(self, value):
+    self._priority = int(value)
+    return self
+  
+  @property
+  def expected_duration(self):
+    return getattr(self, '_expected_duration', None)
+  @expected_duration.setter
+  def expected_duration(self, value):
+    if value is not None and float(value) < 0:
+      raise ValueError('expected_duration must be >= 0')
+    self._expected_duration = float(value) if value is not None else None
+    return self
+  
+  @property
+  def cpus(self):
+    return getattr(self, '_cpus', 0)
+  @cpus.setter
+  def cpus(self, value):
+    if float(value) < 0:
+      raise ValueError('cpus must be >= 0')
+    self._cpus = float(value) if float(value) % 1 else int(float(value))
+    return self
+  
+  @property
+  def mem_mb(self):
+    return getattr(self, '_mem_mb', 0)
+  @mem_mb.setter
+  def mem_mb(self, value):
+    if int(value) < 0:
+      raise ValueError('mem_mb must be >= 0')
+    self._mem_mb = int(value)
+    return self
+  
+  @property
+  def pool(self):
+    return getattr(self, '_pool', None)
+  @pool.setter
+  def pool(self, value):
+    self._validate_string('pool', value)
+    self._pool = str(value).strip()
+    return self
+  
+  @property
+  def executor(self):
+    return getattr(self, '_executor', None)
+  @executor.setter
+  def executor(self, value):
+    self._validate_string('executor', value)
+    self._executor = str(value).strip().lower()
+    return self
+  
+  @property
+  def cache(self):
+    return getattr(self, '_cache', False)
+  @cache.setter
+  def cache(self, value):
+    self._cache = str(value).strip().lower() in ['true', '1', 'yes'] if isinstance(value, str) else bool(value)
+    return self
+  
+  @property
+  def cache_keys(self):
+    return getattr(self, '_cache_keys', None)
+  @cache_keys.setter
+  def cache_keys(self, value):
+    self._cache_keys = self._to_list(value)
+    return self
+  
+  @property
+  def inputs(self):
+    return getattr(self, '_inputs', None)
+  @inputs.setter
+  def inputs(self, value):
+    self._inputs = self._to_list(value)
+    return self
+  
+  @property
+  def outputs(self):
+    return getattr(self, '_outputs', None)
+  @outputs.setter
+  def outputs(self, value):
+    self._outputs = self._to_list(value)
+    return self
+  
+  def _to_list(self, value):
+    # Lists may be given as comma-separated strings, e.g. in .lst files
+    if isinstance(value, str):
+      value = value.split(',')
+    return [ str(x).strip() for x in value if str(x).strip() ] or None
+  
+  @property
+  def subdag(self):
+    return getattr(self, '_subdag', None)
+  @subdag.setter
+  def subdag(self, value):
+    self._validate_string('subdag', value)
+    self._subdag = str(value).strip() or None
+    return self
+  
+  @property
+  def speculative(self):
+    return getattr(self, '_speculative', False)
+  @speculative.setter
+  def speculative(self, value):
+    self._speculative = str(value).strip().lower() in ['true', '1', 'yes'] if isinstance(value, str) else bool(value)
+    return self
+  
+  @property
+  def winning_attempt(self):
+    return getattr(self, '_winning_attempt', None)
+  @winning_attempt.setter
+  def winning_attempt(self, value):
+    self._winning_attempt = int(value) if value is not None else None
+    return self
+  
+  @property
+  def critical(self):
+    return getattr(self, '_critical', False)
+  @critical.setter
+  def critical(self, value):
+    self._critical = str(value).strip().lower() in ['true', '1', 'yes'] if isinstance(value, str) else bool(value)
     return self
\ No newline at end of file
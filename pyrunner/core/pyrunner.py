@@ -21,13 +21,17 @@ import zipfile
 import getopt
 
 import pyrunner.serde as serde
+import pyrunner.scheduling as scheduling
 import pyrunner.notification as notification
 import pyrunner.autodoc.introspection as intro
 import pyrunner.core.constants as constants
 
 from pyrunner.core.engine import ExecutionEngine
+from pyrunner.core.context import ContextJournal
 from pyrunner.core.config import Config
 from pyrunner.core.register import NodeRegister
+from pyrunner.core.history import RuntimeHistory
+from pyrunner.core.incremental import BuildState
 from pyrunner.core.signal import SignalHandler, SIG_ABORT, SIG_REVIVE, SIG_PULSE
 from pyrunner.version import __version__
 
@@ -48,6 +52,8 @@ class PyRunner:
     self.serde_obj = serde.ListSerDe()
     self.register = NodeRegister()
     self.engine = ExecutionEngine()
+    self._saved_version = None
+    self._state_log = None
     
     self.config['config_file'] = kwargs.get('config_file')
     self.config['proc_file'] = kwargs.get('proc_file')
@@ -135,6 +141,9 @@ class PyRunner:
     if not isinstance(obj, serde.SerDe): raise Exception('SerDe plugin must implement the SerDe interface')
     self.serde_obj = obj
   
+  def plugin_scheduling_policy(self, obj):
+    self.engine.plugin_scheduling_policy(obj)
+  
   def plugin_notification(self, obj):
     if not isinstance(obj, notification.Notification): raise Exception('Notification plugin must implement the Notification interface')
     self.notification = obj
@@ -194,9 +203,15 @@ class PyRunner:
     self.engine.config = self.config
     self.engine.register = self.register
     self.engine.save_state_func = self.save_state
+    if not self.config['test_mode']:
+      self.engine.history = RuntimeHistory(self.config.history_file)
+    if self.config['incremental']:
+      self.engine.build_state = BuildState(None if self.config['test_mode'] else self.config.build_state_file, self.config['incremental_check'])
     
     # Short circuit for a dryrun
     if self.config['dryrun']:
+      if self.config['incremental']:
+        self.print_build_plan()
       self.print_documentation()
       return 0
     
@@ -204,6 +219,11 @@ class PyRunner:
     print('Executing PyRunner App: {}'.format(self.config['app_name']))
     retcode = self.engine.initiate()
     
+    if not self.config['test_mode']:
+      self.engine.history.save()
+      if self.engine.build_state:
+        self.engine.build_state.save()
+    
     emit_notification = True
     
     if retcode == 0:
@@ -228,18 +248,24 @@ class PyRunner:
     
     return retcode
   
+  def print_build_plan(self):
+    """
+    Prints which tasks incremental mode would execute and why, and marks the
+    others as completed.
+    """
+    reasons = self.engine.build_state.mark_up_to_date(self.register)
+    print('Incremental Build Plan:\n')
+    for node in sorted(reasons):
+      print('  {:<10} {} - {}'.format('EXECUTE' if reasons[node] else 'SKIP', node.name, reasons[node] or 'up to date'))
+    print('')
+  
   def print_documentation(self):
-    while self.register.pending_nodes:
-      for node in self.register.pending_nodes.copy():
-        runnable = True
-        for p in node.parent_nodes:
-          if p.id >= 0 and p not in self.register.completed_nodes.union(self.register.norun_nodes):
-            runnable = False
-            break
-        if runnable:
-          self.register.pending_nodes.remove(node)
-          intro.print_context_usage(node)
-          self.register.completed_nodes.add(node)
+    self.register.build_ready_queue()
+    node = self.register.pop_ready()
+    while node:
+      intro.print_context_usage(node)
+      self.register.set_completed(node)
+      node = self.register.pop_ready()
   
   def cleanup_log_files(self):
     if self.config['log_retention'] < 0:
@@ -304,24 +330,49 @@ class PyRunner:
     if not suppress_output:
       print('Saving Execution Graph File to: {}'.format(self.config.ctllog_file))
     
-    self.serde_obj.save_to_file(self.config.ctllog_file, self.register)
+    # Only status changes are logged during execution. The final save writes
+    # the whole .ctllog file, which is attached to notifications
+    if self._state_log is None or self._state_log.path != self.config.ctllog_file:
+      self._state_log = serde.StateLog(self.serde_obj, self.config.ctllog_file, self.config['wal_sync_interval'], self.config['wal_max_records'])
+    self._state_log.save(self.register, compact=not suppress_output)
     if only_ctllog: return
     
+    context = self.engine.context
+    journal = context.journal
+    # A Context kept by its backend, such as 'sqlite', is not saved along.
+    # Otherwise it is only saved again once it has changed, and with a journal,
+    # once the journal has grown enough to be worth compacting
+    persistent = self.engine.context_backend is not None and self.engine.context_backend.persistent
+    if self._saved_version is not None:
+      if persistent or context.version is None or context.version.value == self._saved_version:
+        return
+      if journal is not None and journal.size() < self.config['journal_max_mb'] * 1024 * 1024:
+        return
+    
     try:
       
-      state_obj = {
-        'config'       : self.config.items(),
-        'shared_dict'  : self.engine._shared_dict.copy()
-      }
-      
       if not suppress_output:
         print('Saving Context Object to File: {}'.format(self.config.ctx_file))
       tmp  = self.config.ctx_file+'.tmp'
       perm = self.config.ctx_file
-      pickle.dump(state_obj, open(tmp, 'wb'))
-      if os.path.isfile(perm):
-        os.unlink(perm)
-      os.rename(tmp, perm)
+      # The version is held back until the journal is truncated, so that every
+      # write journaled afterwards has a higher version than the snapshot, which
+      # holds every write with a version up to its own
+      with context.write_lock():
+        version = context.version.value if context.version is not None else 0
+        state_obj = {
+          'config'       : self.config.items(),
+          'shared_dict'  : {} if persistent else context.shared_dict.copy(),
+          'version'      : version
+        }
+        pickle.dump(state_obj, open(tmp, 'wb'))
+        if os.path.isfile(perm):
+          os.unlink(perm)
+        os.rename(tmp, perm)
+        if journal is not None:
+          journal.truncate()
+        if context.version is not None:
+          self._saved_version = version
       
     except Exception:
       print("Failure in save_context()")
@@ -345,13 +396,30 @@ class PyRunner:
     for k,v in state_obj['shared_dict'].items():
       self.engine._shared_dict[k] = v
     
+    # Writes older than the snapshot may be journaled after it was taken
+    self.engine._initial_version = state_obj.get('version', 0)
+    if self.config.ctx_journal_file and os.path.isfile(self.config.ctx_journal_file):
+      journal = ContextJournal(self.config.ctx_journal_file)
+      count = journal.replay(self.engine._shared_dict, self.engine._initial_version)
+      self.engine._initial_version = journal.last_seq
+      print('Replayed {} Context writes from {}'.format(count, self.config.ctx_journal_file))
+    
     return True
   
   def delete_state(self):
-    if os.path.isfile(self.config.ctllog_file):
-      os.remove(self.config.ctllog_file)
+    if self._state_log is not None:
+      self._state_log.close()
+    for path in [self.config.ctllog_file, self.config.ctllog_file+serde.StateLog.SUFFIX]:
+      if os.path.isfile(path):
+        os.remove(path)
     if os.path.isfile(self.config.ctx_file):
       os.remove(self.config.ctx_file)
+    if self.config.ctx_journal_file and os.path.isfile(self.config.ctx_journal_file):
+      os.remove(self.config.ctx_journal_file)
+    if self.config.ctx_db_file:
+      for path in [self.config.ctx_db_file, self.config.ctx_db_file+'-wal', self.config.ctx_db_file+'-shm']:
+        if os.path.isfile(path):
+          os.remove(path)
   
   def is_restartable(self):
     if not os.path.isfile(self.config.ctllog_file):
@@ -374,7 +442,14 @@ class PyRunner:
       'norun=', 'exec-only=', 'exec-proc-name=',
       'max-procs=', 'serde=', 'exec-loop-interval=',
       'notify-on-fail=', 'notify-on-success=', 'as-service',
-      'service-exec-interval=', 'revive'
+      'service-exec-interval=', 'revive', 'event-driven',
+      'scheduler=', 'max-cpus=', 'max-mem-mb=', 'pools=',
+      'launch-rate=', 'launch-burst=', 'pool-rates=',
+      'adaptive', 'min-procs=', 'target-load=', 'min-mem-pct=',
+      'speculative-multiplier=', 'fail-fast', 'fail-fast-grace=',
+      'context-backend=', 'context-cache',
+      'executor=', 'start-method=', 'agents=',
+      'incremental', 'incremental-check='
     ]
     
     if run_getopts:
@@ -394,6 +469,46 @@ class PyRunner:
           self.config['debug'] = True
         elif opt in ['-n', '--max-procs']:
           self.config['max_procs'] = int(arg)
+        elif opt == '--adaptive':
+          self.config['adaptive'] = True
+        elif opt == '--min-procs':
+          self.config['min_procs'] = int(arg)
+        elif opt == '--target-load':
+          self.config['target_load'] = float(arg)
+        elif opt == '--min-mem-pct':
+          self.config['min_mem_pct'] = float(arg)
+        elif opt == '--speculative-multiplier':
+          self.config['speculative_multiplier'] = float(arg)
+        elif opt == '--fail-fast':
+          self.config['fail_fast'] = True
+        elif opt == '--fail-fast-grace':
+          self.config['fail_fast_grace'] = int(arg)
+        elif opt == '--context-backend':
+          self.config['context_backend'] = arg
+        elif opt == '--context-cache':
+          self.config['context_cache'] = True
+        elif opt == '--max-cpus':
+          self.config['max_cpus'] = float(arg)
+        elif opt == '--max-mem-mb':
+          self.config['max_mem_mb'] = int(arg)
+        elif opt == '--executor':
+          self.config['executor'] = arg.lower()
+        elif opt == '--incremental':
+          self.config['incremental'] = True
+        elif opt == '--incremental-check':
+          self.config['incremental_check'] = arg.lower()
+        elif opt == '--agents':
+          self.config['agents'] = arg
+        elif opt == '--start-method':
+          self.config['start_method'] = arg.lower()
+        elif opt == '--pools':
+          self.config['pools'] = arg
+        elif opt == '--launch-rate':
+          self.config['launch_rate'] = float(arg)
+        elif opt == '--launch-burst':
+          self.config['launch_burst'] = int(arg)
+        elif opt == '--pool-rates':
+          self.config['pool_rates'] = arg
         elif opt in ['-r', '--restart']:
           self.config['restart'] = True
         elif opt in ['-x', '--exec-only']:
@@ -430,6 +545,8 @@ class PyRunner:
           self.engine.context.interactive = True
         elif opt in ['-t', '--tickrate']:
           self.config['tickrate'] = int(arg)
+        elif opt == '--event-driven':
+          self.config['event_driven'] = True
         elif opt in ['--time-between-tasks']:
           self.config['time_between_tasks'] = int(arg)
         elif opt in ['--preserve-context']:
@@ -451,6 +568,17 @@ class PyRunner:
         elif opt in ['--serde']:
           if arg.lower() == 'json':
             self.plugin_serde(serde.JsonSerDe())
+        elif opt == '--scheduler':
+          if arg.lower() == 'fifo':
+            self.plugin_scheduling_policy(scheduling.FifoPolicy())
+          elif arg.lower() == 'priority':
+            self.plugin_scheduling_policy(scheduling.PriorityPolicy())
+          elif arg.lower() in ['sjf', 'shortest-job-first']:
+            self.plugin_scheduling_policy(scheduling.ShortestJobFirstPolicy())
+          elif arg.lower() == 'critical-path':
+            self.plugin_scheduling_policy(scheduling.CriticalPathPolicy())
+          else:
+            raise ValueError('Unknown scheduling policy: {}'.format(arg))
         elif opt == '--setup':
           pass
         elif opt in ('-h', '--help'):
@@ -488,6 +616,26 @@ class PyRunner:
     print("   -l <path>                                 Path to process list filename.")
     print("   -r,  --restart                            Start from last known point-of-failure, if any.")
     print("   -n,  --max_procs <num>                    Maximum number of concurrent processes.")
+    print("        --adaptive                           Adjust the number of concurrent processes, up to --max-procs, to the load and memory pressure of the host.")
+    print("        --min-procs <num>                    Minimum number of concurrent processes with --adaptive. Default is 1.")
+    print("        --target-load <num>                  Load average per CPU above which --adaptive lowers concurrency. Default is 1.0.")
+    print("        --min-mem-pct <num>                  Percentage of available memory below which --adaptive lowers concurrency. Default is 10.")
+    print("        --speculative-multiplier <num>       Multiple of its median runtime after which a speculative process gets a second attempt. Default is 2.0.")
+    print("        --fail-fast                          Stop launching processes, terminate running ones and mark the rest NORUN as soon as any process fails.")
+    print("        --fail-fast-grace <seconds>          Seconds running processes are given to finish after a failure stops the job. Default is 0.")
+    print("        --context-backend <name>             One of manager, shm or sqlite. Store the Context in a Manager process (default), in shared memory, for small values read without IPC, or in a SQLite database kept for a restart.")
+    print("        --context-cache                      Have processes read the Context from a local copy, fetched again only after the Context changes.")
+    print("        --max-cpus <num>                     Total CPUs that running processes may request. Default is the number of CPUs on the host.")
+    print("        --max-mem-mb <num>                   Total memory (MB) that running processes may request. Default is the memory of the host.")
+    print("        --executor <name>                    One of process, pool, thread, async or remote. Run each process in a freshly forked process (default), in a pool of reusable pre-forked processes, in a thread of the engine process, (AsyncWorkers) as a coroutine of a single event loop, or on a remote agent.")
+    print("        --agents <host:port:slots,...>       Comma separated list of pyrunner-agent processes used by the remote executor.")
+    print("        --start-method <method>              One of fork (default), forkserver or spawn. How processes are started; forkserver preloads all worker modules.")
+    print("        --pools <name:limit,...>             Comma separated list of named pools, each limiting how many of its processes may run at once.")
+    print("        --launch-rate <num>                  Maximum number of processes launched per second, sustained. Default is no limit.")
+    print("        --launch-burst <num>                 Number of processes that may be launched at once before --launch-rate applies. Default is 1.")
+    print("        --pool-rates <name:rate[:burst],...> Comma separated list of launch rates (and bursts) for named pools.")
+    print("        --incremental                        Skip processes whose declared outputs are up to date with their declared inputs.")
+    print("        --incremental-check <mtime|checksum> Compare input and output modification times (default) or input checksums recorded by the last run.")
     print("        --exec-proc-name <proc name>         Execute only a single process/task with the given name.")
     print("   -x,  --exec-only <comma seperated nums>   Comma separated list of process ID's to execute. All other processes will be set to NORUN.")
     print("   -N,  --norun <comma separated nums>       Comma separated list of process ID's to NOT execute (set to NORUN).")
@@ -503,8 +651,10 @@ class PyRunner:
     print("        --nozip                              Disable behavior which zips up all log files after job exit.")
     print("        --dump-logs                          Enable behavior which prints all failure logs, if any, to STDOUT after job exit.")
     print("   -t,  --tickrate <num>                     Number of times per second that the executon engine should poll child processes/launch new processes. Default is 1.")
-    print("        --time-between-tasks <seconds>       Number of seconds, at minimum, that the execution engine should wait after launching a process before launching another.")
+    print("        --event-driven                       Sleep until a process exits or a timed event is due, instead of polling at the tickrate.")
+    print("        --time-between-tasks <seconds>       Number of seconds, at minimum, that the execution engine should wait after launching a process before launching another. Same as --launch-rate 1/<seconds>.")
     print("        --serde <serializer/deserializer>    Specify the process list serializer/deserializer. Default is LST.")
+    print("        --scheduler <policy>                 Order in which ready processes are launched: fifo, priority, sjf, or critical-path. Default is fifo.")
     print("        --preserve-context                   Disables behavior which deletes the job's context file after successful job exit.")
     print("        --allow-duplicate-jobs               Enables running more than 1 instance of a unique job (based on APP_NAME).")
     print("        --abort                              Aborts running instance of a job (based on APP_NAME), if any.")
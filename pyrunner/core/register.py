@@ -14,9 +14,12 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
-import os
+import os, re
+import time
+import heapq
 import pyrunner.core.constants as constants
 from pyrunner.core.node import ExecutionNode
+from pyrunner.scheduling import FifoPolicy
 
 class NodeRegister:
   """
@@ -38,6 +41,33 @@ class NodeRegister:
       constants.STATUS_NORUN     : set(),
       constants.STATUS_ABORTED   : set()
     }
+    
+    # Concurrency pool limits declared by the process file, if any
+    self.pools = dict()
+    
+    # Expanded sub-DAG nodes mapped to the nodes of their sub-DAG
+    self.subdags = dict()
+    
+    # Registered nodes by name and ID, and the ID given to the next node added
+    # at runtime - see add_node_object()
+    self._nodes_by_name = { self._root.name: self._root }
+    self._nodes_by_id = { self._root.id: self._root }
+    self._next_id = 1
+    
+    # Number of running nodes, other than expanded sub-DAG nodes, which run a
+    # Worker of their own - kept up to date by the set_* methods
+    self.running_workers = 0
+    
+    # Pending nodes marked NORUN by fail-fast - see halt_pending()
+    self.halted_nodes = set()
+    
+    # Nodes mapped to the (key, path) pairs of the Context buffers they put
+    self.buffers = dict()
+    
+    # Scheduler state - see build_ready_queue()
+    self._unmet = dict()
+    self._ready = FifoPolicy()
+    self._delayed = []
     return
   
   @property
@@ -99,11 +129,34 @@ class NodeRegister:
   def all_nodes_dict(self):
     return { n.id:n for n in self.all_nodes }
   
+  def sorted_nodes(self):
+    """
+    Returns all nodes ordered by ID, except that every node comes after all of
+    its parents, as SerDe implementations require when reading nodes back in.
+    Only tasks spawned at runtime may depend on nodes with a higher ID.
+    """
+    nodes = self.all_nodes
+    unmet = { n: len([ p for p in n.parent_nodes if p in nodes ]) for n in nodes }
+    heap = [ (n.id, n) for n in nodes if not unmet[n] ]
+    heapq.heapify(heap)
+    ordered = []
+    
+    while heap:
+      node = heapq.heappop(heap)[1]
+      ordered.append(node)
+      for c in node.child_nodes:
+        if c in unmet:
+          unmet[c] -= 1
+          if not unmet[c]:
+            heapq.heappush(heap, (c.id, c))
+    
+    return ordered
+  
   def find_node(self, **kwargs):
     if kwargs.get('id'):
-      return self._root.get_node_by_id(kwargs.get('id'))
+      return self._nodes_by_id.get(kwargs.get('id'))
     elif kwargs.get('name'):
-      return self._root.get_node_by_name(kwargs.get('name'))
+      return self._nodes_by_name.get(kwargs.get('name'))
     else:
       return None
   
@@ -130,6 +183,320 @@ class NodeRegister:
     
     return
   
+  # ########################## SCHEDULING ########################## #
+  
+  def build_ready_queue(self, policy=None):
+    """
+    Initializes the unmet dependency count of every pending node and queues
+    those with no unmet dependencies.
+    
+    Once built, the status transition methods below keep the counts current,
+    so that finding the next node to execute never requires a scan of the
+    pending nodes.
+    
+    Args:
+      policy (SchedulingPolicy, optional): Determines the order in which ready
+        nodes are returned by pop_ready(). Default: FifoPolicy
+    """
+    self._unmet = dict()
+    self._ready = policy if policy is not None else FifoPolicy()
+    self._ready.clear()
+    self._delayed = []
+    
+    for node in sorted(self.pending_nodes):
+      self._count_unmet(node)
+    
+    return
+  
+  def _count_unmet(self, node):
+    self._unmet[node] = len([ p for p in node.parent_nodes if p.id >= 0 and p not in self.completed_nodes and p not in self.norun_nodes ])
+    if not self._unmet[node]:
+      self._enqueue(node)
+  
+  def _enqueue(self, node):
+    if node.wait_until > time.time():
+      heapq.heappush(self._delayed, (node.wait_until, node.id, node))
+    else:
+      self._ready.push(node)
+  
+  def _release_children(self, node):
+    for c in node.child_nodes:
+      if c in self._unmet:
+        self._unmet[c] -= 1
+        if not self._unmet[c] and c in self.pending_nodes:
+          self._enqueue(c)
+  
+  def _promote_delayed(self):
+    now = time.time()
+    while self._delayed and self._delayed[0][0] <= now:
+      self._ready.push(heapq.heappop(self._delayed)[2])
+  
+  def has_ready(self):
+    """
+    Returns True if at least one pending node may be executed right now.
+    """
+    self._promote_delayed()
+    while self._ready and self._ready.peek() not in self.pending_nodes:
+      self._ready.pop()
+    return bool(self._ready)
+  
+  def pop_ready(self):
+    """
+    Removes and returns the next pending node whose dependencies are all met,
+    or None if there is no such node right now.
+    """
+    return self._ready.pop() if self.has_ready() else None
+  
+  def requeue_ready(self, node):
+    """
+    Returns a node obtained from pop_ready() which could not be executed yet
+    to the front of its place in the ready queue.
+    """
+    self._ready.requeue(node)
+  
+  def next_ready_time(self):
+    """
+    Returns the epoch time at which the next node currently waiting to retry
+    becomes ready, or None if no node is waiting.
+    """
+    while self._delayed and self._delayed[0][2] not in self.pending_nodes:
+      heapq.heappop(self._delayed)
+    return self._delayed[0][0] if self._delayed else None
+  
+  def set_running(self, node):
+    self.pending_nodes.discard(node)
+    if node not in self.running_nodes and not node.subdag:
+      self.running_workers += 1
+    self.running_nodes.add(node)
+  
+  def _discard_running(self, node):
+    if node in self.running_nodes and not node.subdag:
+      self.running_workers -= 1
+    self.running_nodes.discard(node)
+  
+  def set_completed(self, node):
+    self._discard_running(node)
+    self.pending_nodes.discard(node)
+    self.completed_nodes.add(node)
+    self._release_children(node)
+  
+  def set_failed(self, node):
+    self._discard_running(node)
+    self.failed_nodes.add(node)
+    self.set_children_defaulted(node)
+  
+  def set_aborted(self, node):
+    self._discard_running(node)
+    self.aborted_nodes.add(node)
+    self.set_children_defaulted(node)
+  
+  def set_norun(self, node):
+    self.pending_nodes.discard(node)
+    self.norun_nodes.add(node)
+    self._release_children(node)
+  
+  def halt_pending(self):
+    """
+    Marks all pending nodes NORUN, as when the run can no longer succeed. They
+    are remembered as halted, and persisted as pending by SerDe implementations,
+    so that a restart executes them.
+    """
+    halted = set(self.pending_nodes)
+    self.pending_nodes.difference_update(halted)
+    self.norun_nodes.update(halted)
+    self.halted_nodes.update(halted)
+    return halted
+  
+  def set_retry(self, node):
+    """
+    Returns a running node to pending, to be executed again once its retry
+    wait time has elapsed.
+    """
+    self._discard_running(node)
+    self.pending_nodes.add(node)
+    self._enqueue(node)
+  
+  def revive_failed(self):
+    """
+    Returns all failed and defaulted nodes to pending.
+    """
+    revived = self.failed_nodes.union(self.defaulted_nodes)
+    for node in self.failed_nodes:
+      node.revive()
+    self.failed_nodes.clear()
+    self.defaulted_nodes.clear()
+    self.pending_nodes.update(revived)
+    
+    for node in sorted(revived):
+      self._count_unmet(node)
+    
+    return
+  
+  def spawn_nodes(self, parent, tasks, join=None):
+    """
+    Adds nodes to the DAG while it is executing, as children of the given node
+    (normally, the running node whose Worker requested them).
+    
+    Tasks whose name is already registered are skipped, so that a restarted
+    parent does not add them twice.
+    
+    Args:
+      parent (ExecutionNode): The node the tasks depend on.
+      tasks (list): Dicts of add_node() arguments. 'module' and 'worker' are
+        required. 'logfile' defaults to <name>.log next to the parent's logfile,
+        and 'dependencies' may name further nodes to depend on.
+      join (dict, optional): add_node() arguments of a node which depends on
+        all of the tasks. Pending children of the parent then also wait for
+        the join node.
+    
+    Returns:
+      List of the nodes added.
+    """
+    children = [ c for c in parent.child_nodes if c in self.pending_nodes ]
+    added = []
+    for task in tasks:
+      node = self._spawn_node(parent, task, [ parent.name ])
+      if node: added.append(node)
+    
+    if join:
+      join_deps = [ t['name'] for t in tasks ] or [ parent.name ]
+      join_node = self._spawn_node(parent, join, join_deps)
+      if join_node:
+        added.append(join_node)
+        for c in children:
+          if self._unmet.get(c):
+            join_node.add_child_node(c, [ join_node.name ], True)
+            self._unmet[c] += 1
+    
+    return added
+  
+  def _spawn_node(self, parent, task, dependencies):
+    if not task.get('name') or not task.get('module') or not task.get('worker'):
+      raise ValueError('Spawned tasks require a name, module and worker - received: {}'.format(task))
+    if self.find_node(name=task['name']):
+      return None
+    
+    dependencies = list(dict.fromkeys(dependencies + list(task.get('dependencies', []))))
+    for d in dependencies:
+      if not self.find_node(name=d):
+        raise ValueError('Task "{}" depends on unknown task "{}"'.format(task['name'], d))
+    
+    kwargs = dict(task)
+    kwargs.pop('status', None)
+    kwargs['id'] = self._next_id
+    kwargs['dependencies'] = dependencies
+    if 'logfile' not in kwargs:
+      kwargs['logfile'] = os.path.join(os.path.dirname(parent.logfile), '{}.log'.format(task['name'].replace(' ', '_').lower())) if parent.logfile else None
+    
+    self.add_node(**kwargs)
+    node = self.find_node(id=kwargs['id'])
+    self._count_unmet(node)
+    return node
+  
+  def expand_subdag(self, node, sub_register):
+    """
+    Adds the nodes of a sub-DAG to the DAG while it is executing, in place of
+    the given sub-DAG node. Node names are prefixed with '<sub-DAG name>/' and
+    new IDs are assigned. Nodes at the top of the sub-DAG depend on the parents
+    of the sub-DAG node, which remains running until all of them have finished
+    (see poll_subdag()), so that its children wait for the whole sub-DAG.
+    
+    Nodes whose name is already registered are kept, so that a restarted or
+    revived sub-DAG is not added twice.
+    
+    Args:
+      node (ExecutionNode): The sub-DAG node being expanded.
+      sub_register (NodeRegister): The nodes of the sub-DAG.
+    
+    Returns:
+      List of the nodes added.
+    """
+    prefix = '{}/'.format(node.name)
+    top_deps = [ p.name for p in node.parent_nodes if p.id >= 0 ] or [ constants.ROOT_NODE_NAME ]
+    members, added = [], []
+    
+    for sub in sub_register.sorted_nodes():
+      name = prefix + sub.name
+      member = self.find_node(name=name)
+      if not member:
+        kwargs = dict(sub.get_optional_attributes())
+        kwargs.update({
+          'id'              : self._next_id,
+          'name'            : name,
+          'module'          : sub.module,
+          'worker'          : sub.worker,
+          'arguments'       : sub.arguments,
+          'max_attempts'    : sub.max_attempts,
+          'retry_wait_time' : sub.retry_wait_time,
+          'logfile'         : sub.logfile or (os.path.join(os.path.dirname(node.logfile), '{}.log'.format(re.sub(r'[\s/]', '_', name).lower())) if node.logfile else None),
+          'dependencies'    : [ prefix + p.name for p in sub.parent_nodes if p.id >= 0 ] or top_deps
+        })
+        if sub.timeout != float('inf'):
+          kwargs['timeout'] = sub.timeout
+        self.add_node(**kwargs)
+        member = self.find_node(id=kwargs['id'])
+        self._count_unmet(member)
+        added.append(member)
+      members.append(member)
+    
+    self.subdags[node] = members
+    return added
+  
+  def poll_subdag(self, node):
+    """
+    Returns the return code of an expanded sub-DAG node: None while any of its
+    nodes is pending or running, 1 if any of them failed, and 0 otherwise.
+    """
+    members = self.subdags.get(node)
+    if members is None:
+      return 905
+    if any(m in self.pending_nodes or m in self.running_nodes for m in members):
+      return None
+    if any(m in self.failed_nodes or m in self.defaulted_nodes or m in self.aborted_nodes for m in members):
+      return 1
+    return 0
+  
+  def subdag_counts(self, node):
+    """
+    Returns the number of nodes of an expanded sub-DAG in each status.
+    """
+    status = { m:grp for grp in self.register for m in self.register[grp] }
+    counts = dict()
+    for m in self.subdags.get(node, []):
+      counts[status[m]] = counts.get(status[m], 0) + 1
+    return counts
+  
+  def track_buffers(self, node, buffers):
+    """
+    Records the (key, path) pairs of the Context buffers put by the given node.
+    """
+    if buffers:
+      self.buffers.setdefault(node, []).extend(buffers)
+  
+  def release_buffers(self):
+    """
+    Stops tracking and returns the (key, path) pairs of the buffers whose nodes
+    have descendants, all of which have completed or will not run. Buffers are
+    readable by any descendant, not only by children, and buffers of nodes
+    without children are kept to the end of the run.
+    """
+    released = []
+    for node in list(self.buffers):
+      descendants = self._descendants(node)
+      if descendants and all(d in self.completed_nodes or (d in self.norun_nodes and d not in self.halted_nodes) for d in descendants):
+        released.extend(self.buffers.pop(node))
+    return released
+  
+  def _descendants(self, node):
+    seen = set()
+    stack = list(node.child_nodes)
+    while stack:
+      n = stack.pop()
+      if n not in seen:
+        seen.add(n)
+        stack.extend(n.child_nodes)
+    return seen
+  
   def set_all_norun(self):
     self.register = {
       constants.STATUS_COMPLETED : set(),
@@ -140,6 +507,7 @@ class NodeRegister:
       constants.STATUS_NORUN     : self.all_nodes,
       constants.STATUS_ABORTED   : set()
     }
+    self.running_workers = 0
     return
   
   def exec_only(self, id_list):
@@ -215,11 +583,14 @@ class NodeRegister:
     if len(node.parent_nodes) != len(dependencies):
       return False
     self.register[status].add(node)
+    self._nodes_by_name.setdefault(node.name, node)
+    self._nodes_by_id.setdefault(node.id, node)
+    self._next_id = max(self._next_id, node.id + 1)
     return True
   
   def add_node(self, **kwargs):
     '''Add ExecutionNode object to the internal register.'''
-    req_keys = ['name', 'logfile', 'module', 'worker']
+    req_keys = ['name', 'logfile'] if kwargs.get('subdag') else ['name', 'logfile', 'module', 'worker']
     if not all(k in kwargs for k in req_keys):
       print('Missing Required Keys:\n{}'.format([ k for k in req_keys if k not in kwargs ]))
       return False
@@ -227,8 +598,8 @@ class NodeRegister:
     self._cur_node_id += 1
     node = ExecutionNode(kwargs.get('id', self._cur_node_id))
     node.name = kwargs.get('name')
-    node.module = kwargs.get('module')
-    node.worker = kwargs.get('worker')
+    node.module = kwargs.get('module', '-')
+    node.worker = kwargs.get('worker', '-')
     
     if kwargs.get('logfile'):
       node.logfile = kwargs.get('logfile')
@@ -244,5 +615,8 @@ class NodeRegister:
       node.retry_wait_time = kwargs.get('retry_wait_time')
     if kwargs.get('timeout'):
       node.timeout = kwargs.get('timeout')
+    for k in ExecutionNode.OPTIONAL_ATTRIBUTES:
+      if kwargs.get(k) is not None:
+        setattr(node, k, kwargs.get(k))
     
     return self.add_node_object(node, kwargs.get('status', constants.STATUS_PENDING), kwargs.get('dependencies', ['PyRunnerRootNode']), kwargs.get('named_deps', True))
\ No newline at end of file
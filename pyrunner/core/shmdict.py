@@ -0,0 +1,288 @@
+# Copyright 2019 Comcast Cable Communications Management, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import struct
+import pickle
+import tempfile
+import zlib
+from contextlib import contextmanager
+
+from pyrunner.core.filelock import FileLock
+
+try:
+  from multiprocessing import shared_memory
+except ImportError:
+  shared_memory = None
+
+# Slot states
+EMPTY, USED, DELETED = 0, 1, 2
+
+# Value types
+T_NONE, T_BOOL, T_INT, T_FLOAT, T_STR, T_BYTES, T_PICKLE = range(7)
+
+# seq (uint32), state (uint8), type (uint8), key length (uint16), value length (uint32)
+SLOT_HEADER = struct.Struct('<IBBHI')
+
+# Index + 1 of the slot being written, 0 if none, padded to 8 bytes
+TABLE_HEADER = struct.Struct('<Ixxxx')
+
+# Number of times a reader retries a slot being written before it waits for the
+# writer, through the lock
+MAX_SPINS = 1000
+
+class SharedMemoryDict:
+  """
+  Dict-like store in a fixed-size hash table of shared memory, for Contexts
+  shared by Workers in other processes without a round trip to the Manager
+  process.
+  
+  Keys are strings. Scalars, strings and bytes are stored as such, other
+  values are pickled. A key and its value must fit in a slot.
+  
+  Writers are serialized by a lock on a file next to the table, which the OS
+  releases if its holder dies. Readers take no lock: each slot has a sequence
+  number which is odd while the slot is written, and a read is retried if the
+  number is odd or changed while it was reading. A slot left half written by a
+  writer which died is dropped by the next process to take the lock, which
+  readers take once they have retried for too long.
+  
+  Args:
+    slots (int, optional): Number of entries the table holds.
+    slot_size (int, optional): Bytes per entry, header included.
+    name (str, optional): Name of an existing table to attach to. A new table
+      is created if not given.
+  """
+  
+  def __init__(self, slots=4096, slot_size=256, name=None):
+    if shared_memory is None:
+      raise RuntimeError('The shared-memory Context requires Python 3.8 or later')
+    if slot_size <= SLOT_HEADER.size:
+      raise ValueError('slot_size must be greater than {}'.format(SLOT_HEADER.size))
+    self.slots = int(slots)
+    self.slot_size = int(slot_size)
+    self._owner = name is None
+    size = TABLE_HEADER.size + self.slots * self.slot_size
+    if name:
+      self._shm = shared_memory.SharedMemory(name)
+    else:
+      self._shm = shared_memory.SharedMemory(create=True, size=size)
+      self._shm.buf[:size] = bytes(size)
+    self._buf = self._shm.buf
+    self._lock = FileLock(os.path.join(tempfile.gettempdir(), '{}.lock'.format(self.name.lstrip('/'))))
+  
+  @property
+  def name(self):
+    return self._shm.name
+  
+  def __getstate__(self):
+    # Processes started with spawn/forkserver attach to the same table
+    return { 'slots': self.slots, 'slot_size': self.slot_size, 'name': self.name }
+  
+  def __setstate__(self, state):
+    self.__init__(**state)
+  
+  def close(self):
+    """
+    Detaches from the table, and removes it if it was created by this object.
+    """
+    if self._shm is None:
+      return
+    self._buf.release()
+    self._buf = None
+    self._shm.close()
+    self._lock.close(remove=self._owner)
+    if self._owner:
+      self._shm.unlink()
+    self._shm = None
+  
+  # Locking
+  def _acquire(self):
+    self._lock.acquire()
+    pending = TABLE_HEADER.unpack_from(self._buf, 0)[0]
+    if pending:
+      self._drop_slot(pending - 1)
+  
+  @contextmanager
+  def _locked(self):
+    self._acquire()
+    try:
+      yield
+    finally:
+      self._lock.release()
+  
+  def _drop_slot(self, index):
+    """
+    Marks a slot left half written by a writer which died as deleted.
+    """
+    offset = TABLE_HEADER.size + index * self.slot_size
+    seq = SLOT_HEADER.unpack_from(self._buf, offset)[0]
+    SLOT_HEADER.pack_into(self._buf, offset, (seq + (seq & 1) + 2) & 0xFFFFFFFF, DELETED, T_NONE, 0, 0)
+    TABLE_HEADER.pack_into(self._buf, 0, 0)
+  
+  # Encoding
+  def _encode(self, value):
+    if value is None:
+      return T_NONE, b''
+    elif isinstance(value, bool):
+      return T_BOOL, b'\x01' if value else b'\x00'
+    elif type(value) is int and -2**63 <= value < 2**63:
+      return T_INT, struct.pack('<q', value)
+    elif type(value) is float:
+      return T_FLOAT, struct.pack('<d', value)
+    elif type(value) is str:
+      return T_STR, value.encode('utf-8')
+    elif type(value) is bytes:
+      return T_BYTES, value
+    return T_PICKLE, pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+  
+  def _decode(self, vtype, data):
+    if vtype == T_NONE:
+      return None
+    elif vtype == T_BOOL:
+      return data != b'\x00'
+    elif vtype == T_INT:
+      return struct.unpack('<q', data)[0]
+    elif vtype == T_FLOAT:
+      return struct.unpack('<d', data)[0]
+    elif vtype == T_STR:
+      return data.decode('utf-8')
+    elif vtype == T_BYTES:
+      return data
+    return pickle.loads(data)
+  
+  # Slot access
+  def _read_slot(self, index):
+    """
+    Returns a consistent (state, key, type, value bytes) snapshot of a slot.
+    """
+    offset = TABLE_HEADER.size + index * self.slot_size
+    spins = 0
+    while True:
+      seq, state, vtype, klen, vlen = SLOT_HEADER.unpack_from(self._buf, offset)
+      if seq & 1:
+        spins += 1
+        if spins >= MAX_SPINS:
+          # Waits for the writer, or drops the slot if the writer died
+          with self._locked():
+            pass
+          spins = 0
+        continue
+      start = offset + SLOT_HEADER.size
+      key = bytes(self._buf[start:start + klen]) if state == USED else None
+      data = bytes(self._buf[start + klen:start + klen + vlen]) if state == USED else None
+      if SLOT_HEADER.unpack_from(self._buf, offset)[0] == seq:
+        return state, key, vtype, data
+  
+  def _write_slot(self, index, state, key=b'', vtype=T_NONE, data=b''):
+    offset = TABLE_HEADER.size + index * self.slot_size
+    seq = SLOT_HEADER.unpack_from(self._buf, offset)[0]
+    TABLE_HEADER.pack_into(self._buf, 0, index + 1)
+    struct.pack_into('<I', self._buf, offset, (seq + 1) & 0xFFFFFFFF)
+    start = offset + SLOT_HEADER.size
+    self._buf[start:start + len(key) + len(data)] = key + data
+    SLOT_HEADER.pack_into(self._buf, offset, (seq + 2) & 0xFFFFFFFF, state, vtype, len(key), len(data))
+    TABLE_HEADER.pack_into(self._buf, 0, 0)
+  
+  def _probe(self, key):
+    home = zlib.crc32(key) % self.slots
+    for i in range(self.slots):
+      yield (home + i) % self.slots
+  
+  def _find(self, key):
+    """
+    Returns the slot index and snapshot of the given key, or None.
+    """
+    for index in self._probe(key):
+      state, skey, vtype, data = self._read_slot(index)
+      if state == EMPTY:
+        return None
+      if state == USED and skey == key:
+        return index, vtype, data
+    return None
+  
+  def _key(self, key):
+    if not isinstance(key, str):
+      raise TypeError('Shared-memory Context keys must be strings, not {}'.format(type(key).__name__))
+    return key.encode('utf-8')
+  
+  # Dictionary emulation methods
+  def __getitem__(self, key):
+    found = self._find(self._key(key))
+    if found is None:
+      raise KeyError(key)
+    return self._decode(found[1], found[2])
+  
+  def __setitem__(self, key, value):
+    bkey = self._key(key)
+    vtype, data = self._encode(value)
+    if SLOT_HEADER.size + len(bkey) + len(data) > self.slot_size:
+      raise ValueError('Context value for "{}" does not fit in a shared-memory slot of {} bytes'.format(key, self.slot_size))
+    with self._locked():
+      free = None
+      for index in self._probe(bkey):
+        state, skey, _, _ = self._read_slot(index)
+        if state == USED and skey == bkey:
+          free = index
+          break
+        if state != USED and free is None:
+          free = index
+        if state == EMPTY:
+          break
+      if free is None:
+        raise RuntimeError('Shared-memory Context is full ({} keys)'.format(self.slots))
+      self._write_slot(free, USED, bkey, vtype, data)
+  
+  def __delitem__(self, key):
+    with self._locked():
+      found = self._find(self._key(key))
+      if found is None:
+        raise KeyError(key)
+      self._write_slot(found[0], DELETED)
+  
+  def __contains__(self, key):
+    return self._find(self._key(key)) is not None
+  
+  def __len__(self):
+    return len(self.keys())
+  
+  def get(self, key, default=None):
+    found = self._find(self._key(key))
+    return default if found is None else self._decode(found[1], found[2])
+  
+  def get_many(self, keys, default=None):
+    return { k:self.get(k, default) for k in keys }
+  
+  def items(self):
+    items = []
+    for index in range(self.slots):
+      state, key, vtype, data = self._read_slot(index)
+      if state == USED:
+        items.append((key.decode('utf-8'), self._decode(vtype, data)))
+    return items
+  
+  def keys(self):
+    return [ k for k,_ in self.items() ]
+  
+  def values(self):
+    return [ v for _,v in self.items() ]
+  
+  def copy(self):
+    return dict(self.items())
+  
+  def update(self, other):
+    for k,v in dict(other).items():
+      self[k] = v
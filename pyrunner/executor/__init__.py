@@ -0,0 +1,6 @@
+from .process import ProcessExecutor
+from .pool import PoolExecutor
+from .thread import ThreadExecutor
+from .coroutine import AsyncExecutor
+from .remote import RemoteExecutor, parse_agents
+from .abstract import Executor, ExecutionHandle
@@ -0,0 +1,97 @@
+# Copyright 2019 Comcast Cable Communications Management, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+from abc import ABCMeta, abstractmethod
+
+class Executor:
+  """
+  Implementations of this abstract class run the Worker of an ExecutionNode
+  somewhere other than the engine's main thread, and return an ExecutionHandle
+  through which the node tracks the Worker's progress.
+  """
+  
+  __metaclass__ = ABCMeta
+  
+  def start(self):
+    """
+    Acquires any resources the executor needs before the first submit().
+    """
+    return self
+  
+  @abstractmethod
+  def submit(self, node):
+    """
+    Begins execution of the Worker of the given node and returns an
+    ExecutionHandle for it.
+    """
+    pass
+  
+  def fits(self, node):
+    """
+    Returns False if the executor cannot take the given node right now, in
+    which case the engine tries again later.
+    """
+    return True
+  
+  def shutdown(self):
+    """
+    Releases all resources held by the executor. Called once execution of
+    the NodeRegister has ended.
+    """
+    pass
+
+class ExecutionHandle:
+  """
+  Tracks a single Worker submitted to an Executor. Mirrors the parts of the
+  multiprocessing.Process interface used by ExecutionNode.
+  """
+  
+  __metaclass__ = ABCMeta
+  
+  @property
+  @abstractmethod
+  def sentinel(self):
+    """
+    Object which becomes ready for multiprocessing.connection.wait() once the
+    Worker has finished, or None if not supported.
+    """
+    pass
+  
+  @property
+  @abstractmethod
+  def retcode(self):
+    """
+    Return code of the finished Worker.
+    """
+    pass
+  
+  @abstractmethod
+  def is_alive(self):
+    pass
+  
+  @abstractmethod
+  def join(self):
+    """
+    Blocks until the Worker has finished.
+    """
+    pass
+  
+  @abstractmethod
+  def terminate(self):
+    """
+    Stops the Worker immediately.
+    """
+    pass
@@ -0,0 +1,228 @@
+# Copyright 2019 Comcast Cable Communications Management, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import sys
+import queue
+import getopt
+import tempfile
+import importlib
+import threading
+import traceback
+import multiprocessing
+from multiprocessing.connection import Listener, wait
+
+import pyrunner.logger.file as lg
+from pyrunner.core.context import Context
+
+def _run_task(desc, snapshot, logfile, conn):
+  """
+  Runs a single Worker in a child process of the agent and sends back its
+  return code, along with the Context keys it added or changed and any
+  messages it queued for the engine, such as spawned tasks.
+  """
+  context = Context(dict(snapshot), queue.SimpleQueue())
+  try:
+    worker_class = getattr(importlib.import_module(desc['module']), desc['worker'])
+    worker = worker_class(context, logfile, desc['argv'], desc['as_service'])
+    worker.node_id = desc['id']
+    worker.protected_run()
+    retcode = worker.retcode
+  except Exception as e:
+    logger = lg.FileLogger(logfile)
+    logger.open(False)
+    logger.error(str(e))
+    logger.error(traceback.format_exc())
+    logger.close(False)
+    retcode = 901
+  
+  updates = { k:v for k, v in context.items() if k not in snapshot or snapshot[k] != v }
+  messages = []
+  while not context.shared_queue.empty():
+    messages.append(context.shared_queue.get())
+  conn.send((retcode, updates, messages))
+  conn.close()
+
+class Agent:
+  """
+  Runs Workers on behalf of a remote ExecutionEngine using the 'remote'
+  executor. Each accepted connection carries one node descriptor, along with a
+  snapshot of the Context. The Worker runs in a child process, while its log
+  output is streamed back as it is written. The return code and Context
+  updates are sent once it exits.
+  
+  Worker modules are imported from worker_dir, which must hold the same code as
+  the engine's APP_WORKER_DIR.
+  
+  Args:
+    address (tuple): (host, port) to listen on. Port 0 picks a free port.
+    slots (int): Maximum number of Workers to run at once.
+    authkey (bytes): Shared secret which engines must present.
+    worker_dir (str, optional): Directory to import Worker modules from.
+  """
+  
+  # Seconds between reads of a running Worker's log file
+  STREAM_INTERVAL = 0.2
+  
+  def __init__(self, address, slots, authkey, worker_dir=None):
+    if not authkey:
+      raise ValueError('An authkey is required to run an agent')
+    self.address = address
+    self.slots = max(1, slots)
+    self.authkey = authkey
+    self.worker_dir = worker_dir
+    self.running = 0
+    self._lock = threading.Lock()
+    self._listener = None
+    self._thread = None
+  
+  def start(self):
+    if self.worker_dir and self.worker_dir not in sys.path:
+      sys.path.append(self.worker_dir)
+    self._listener = Listener(self.address, authkey=self.authkey)
+    self.address = self._listener.address
+    self._thread = threading.Thread(target=self._accept_loop, name='pyrunner-agent', daemon=True)
+    self._thread.start()
+    return self
+  
+  def serve_forever(self):
+    if not self._listener: self.start()
+    self._thread.join()
+  
+  def shutdown(self):
+    if self._listener:
+      self._listener.close()
+      self._listener = None
+  
+  def _accept_loop(self):
+    while self._listener:
+      try:
+        conn = self._listener.accept()
+      except multiprocessing.AuthenticationError:
+        continue
+      except (OSError, EOFError):
+        if not self._listener: break
+        continue
+      threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+  
+  def _serve(self, conn):
+    try:
+      desc, snapshot = conn.recv()
+    except (EOFError, OSError):
+      conn.close()
+      return
+    
+    with self._lock:
+      full = self.running >= self.slots
+      if not full: self.running += 1
+    
+    if full:
+      conn.send(('log', 'ERROR - Agent {}:{} has no free slot\n'.format(*self.address)))
+      conn.send(('exit', 909, {}, []))
+      conn.close()
+      return
+    
+    fd, logfile = tempfile.mkstemp(prefix='pyrunner_agent_', suffix='.log')
+    os.close(fd)
+    try:
+      self._stream(conn, desc, snapshot, logfile)
+    finally:
+      with self._lock:
+        self.running -= 1
+      os.remove(logfile)
+      conn.close()
+  
+  def _stream(self, conn, desc, snapshot, logfile):
+    reader, writer = multiprocessing.Pipe(duplex=False)
+    proc = multiprocessing.Process(target=_run_task, args=(desc, snapshot, logfile, writer), daemon=False)
+    proc.start()
+    writer.close()
+    
+    with open(logfile, 'r') as log:
+      while True:
+        ready = wait([reader, conn], self.STREAM_INTERVAL)
+        chunk = log.read()
+        if chunk:
+          conn.send(('log', chunk))
+        
+        if conn in ready:
+          # Either the engine asked to terminate, or it went away
+          proc.terminate()
+          proc.join()
+          return
+        
+        if reader in ready:
+          try:
+            retcode, updates, messages = reader.recv()
+          except EOFError:
+            retcode, updates, messages = 908, {}, []
+          proc.join()
+          chunk = log.read()
+          if chunk:
+            conn.send(('log', chunk))
+          conn.send(('exit', retcode, updates, messages))
+          return
+
+def show_help():
+  print("Usage: pyrunner-agent --port <port> --authkey <key> [options]")
+  print("Options:")
+  print("        --host <host>                        Interface to listen on. Default: 0.0.0.0")
+  print("        --port <port>                        TCP port to listen on.")
+  print("        --slots <num>                        Maximum number of concurrent processes. Default: number of CPUs")
+  print("        --authkey <key>                      Shared secret engines must present. Default: $APP_AGENT_AUTHKEY")
+  print("        --worker-dir <path>                  Directory to import workers from. Default: $APP_WORKER_DIR")
+  print("   -h,  --help                               Show help (you're reading it right now).")
+
+def main():
+  host, port = '0.0.0.0', None
+  slots = os.cpu_count() or 1
+  authkey = os.environ.get('APP_AGENT_AUTHKEY')
+  worker_dir = os.environ.get('APP_WORKER_DIR')
+  
+  try:
+    opts, _ = getopt.getopt(sys.argv[1:], 'h', ['host=', 'port=', 'slots=', 'authkey=', 'worker-dir=', 'help'])
+  except getopt.GetoptError as e:
+    print(str(e))
+    show_help()
+    sys.exit(1)
+  
+  for opt, arg in opts:
+    if opt == '--host':
+      host = arg
+    elif opt == '--port':
+      port = int(arg)
+    elif opt == '--slots':
+      slots = int(arg)
+    elif opt == '--authkey':
+      authkey = arg
+    elif opt == '--worker-dir':
+      worker_dir = arg
+    elif opt in ['-h', '--help']:
+      show_help()
+      sys.exit(0)
+  
+  if port is None or not authkey:
+    show_help()
+    sys.exit(1)
+  
+  agent = Agent((host, port), slots, authkey.encode(), worker_dir)
+  print('Listening on {}:{} with {} slots'.format(host, port, agent.slots))
+  try:
+    agent.serve_forever()
+  except KeyboardInterrupt:
+    agent.shutdown()
+  
+  sys.exit(0)
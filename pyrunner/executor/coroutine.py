@@ -0,0 +1,90 @@
+# Copyright 2019 Comcast Cable Communications Management, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import asyncio
+import threading
+import multiprocessing
+
+import pyrunner.logger.file as lg
+
+from pyrunner.executor.abstract import Executor
+from pyrunner.executor.thread import ThreadHandle
+from pyrunner.worker.asyncworker import AsyncWorker
+
+class AsyncExecutor(Executor):
+  """
+  Runs AsyncWorkers concurrently as coroutines of a single event loop, which
+  runs in a thread of the engine process. Timeouts are enforced with
+  asyncio.wait_for(). Regular Workers submitted to this executor are run in
+  the loop's default thread pool, as with the 'thread' executor.
+  """
+  
+  def __init__(self):
+    self._loop = None
+    self._thread = None
+  
+  def start(self):
+    self._loop = asyncio.new_event_loop()
+    self._thread = threading.Thread(target=self._loop.run_forever, name='pyrunner-asyncio', daemon=True)
+    self._thread.start()
+    return self
+  
+  def submit(self, node):
+    if not self._loop: self.start()
+    worker = node.create_worker()
+    worker._cancel_event = threading.Event()
+    timeout = node.timeout if node.timeout != float('inf') else None
+    reader, writer = multiprocessing.Pipe(duplex=False)
+    future = asyncio.run_coroutine_threadsafe(self._run(worker, timeout), self._loop)
+    handle = AsyncHandle(future, worker, reader)
+    future.add_done_callback(lambda f: self._notify(writer))
+    return handle
+  
+  def _notify(self, writer):
+    # Makes the handle's sentinel readable, so the engine wakes up.
+    try:
+      writer.send(True)
+    except OSError:
+      # The handle was terminated, and its reader closed, before the coroutine returned
+      pass
+    finally:
+      writer.close()
+  
+  async def _run(self, worker, timeout):
+    if not isinstance(worker, AsyncWorker):
+      return await self._loop.run_in_executor(None, worker.protected_run)
+    try:
+      await asyncio.wait_for(worker.protected_run_async(), timeout)
+    except asyncio.TimeoutError:
+      worker.retcode = 907
+      logger = lg.FileLogger(worker.logfile)
+      logger.open(False)
+      logger._system_('Worker runtime has exceeded the set maximum/timeout of {} seconds.'.format(timeout))
+      logger.close()
+  
+  def shutdown(self):
+    if self._loop:
+      self._loop.call_soon_threadsafe(self._loop.stop)
+      self._thread.join()
+      self._loop.close()
+      self._loop = None
+      self._thread = None
+
+class AsyncHandle(ThreadHandle):
+  
+  def terminate(self):
+    self._future.cancel()
+    super().terminate()
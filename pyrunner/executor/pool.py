@@ -0,0 +1,187 @@
+# Copyright 2019 Comcast Cable Communications Management, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import sys
+import importlib
+import traceback
+
+import pyrunner.logger.file as lg
+from pyrunner.executor.abstract import Executor, ExecutionHandle
+from pyrunner.executor.process import get_mp_context
+
+def _serve(conn, context, max_tasks):
+  """
+  Main loop of a pooled worker process. Receives task descriptors over the
+  given connection, runs each Worker in place and sends back its return code,
+  along with a flag indicating whether this process is about to exit.
+  """
+  stdout, stderr = sys.stdout, sys.stderr
+  completed = 0
+  
+  while True:
+    try:
+      desc = conn.recv()
+    except EOFError:
+      break
+    if desc is None:
+      break
+    
+    try:
+      worker_class = getattr(importlib.import_module(desc['module']), desc['worker'])
+      worker = worker_class(context, desc['logfile'], desc['argv'], desc['as_service'])
+      worker.node_id = desc['id']
+      worker.protected_run()
+      retcode = worker.retcode
+    except Exception as e:
+      logger = lg.FileLogger(desc['logfile'])
+      logger.open(False)
+      logger.error(str(e))
+      logger.error(traceback.format_exc())
+      logger.close(False)
+      retcode = 901
+    finally:
+      sys.stdout, sys.stderr = stdout, stderr
+    
+    completed += 1
+    recycle = max_tasks > 0 and completed >= max_tasks
+    conn.send((retcode, recycle))
+    if recycle:
+      break
+  
+  conn.close()
+
+class _Slot:
+  
+  def __init__(self, mp, context, max_tasks):
+    self.conn, child_conn = mp.Pipe()
+    self.proc = mp.Process(target=_serve, args=(child_conn, context, max_tasks), daemon=False)
+    self.proc.start()
+    child_conn.close()
+  
+  def stop(self, kill=False):
+    if kill and self.proc.is_alive():
+      self.proc.terminate()
+    else:
+      try:
+        self.conn.send(None)
+      except (OSError, ValueError):
+        pass
+    self.proc.join()
+    self.conn.close()
+
+class PoolExecutor(Executor):
+  """
+  Runs Workers in a set of long-lived, pre-forked processes, sparing each task
+  the cost of forking a process and importing its module.
+  
+  Each process runs one Worker at a time, and the pool never grows beyond its
+  size: while every process is busy, the pool does not fit further Workers.
+  
+  Args:
+    context (Context): The Context shared with every Worker.
+    size (int, optional): Number of processes, started up front. Default: 1
+    max_tasks (int, optional): Number of Workers each process runs before it
+      is replaced with a fresh process. 0 to never replace. Default: 0
+    start_method (str, optional): 'fork', 'forkserver' or 'spawn'. Default: the
+      platform's default
+    preload (list, optional): Modules for the fork server to import up front.
+  """
+  
+  def __init__(self, context, size=1, max_tasks=0, start_method=None, preload=None):
+    self.context = context
+    self.size = max(1, size)
+    self.max_tasks = max_tasks
+    self.start_method = start_method
+    self.preload = preload
+    self._mp = None
+    self._idle = []
+    self._busy = set()
+  
+  def _new_slot(self):
+    if not self._mp:
+      self._mp = get_mp_context(self.start_method, self.preload)
+    return _Slot(self._mp, self.context, self.max_tasks)
+  
+  def start(self):
+    while len(self._idle) + len(self._busy) < self.size:
+      self._idle.append(self._new_slot())
+    return self
+  
+  def fits(self, node):
+    return bool(self._idle) or len(self._busy) < self.size
+  
+  def submit(self, node):
+    if not self.fits(node):
+      raise RuntimeError('Every pooled process is busy')
+    slot = self._idle.pop() if self._idle else self._new_slot()
+    self._busy.add(slot)
+    slot.conn.send(node.get_descriptor())
+    return PoolHandle(self, slot)
+  
+  def _release(self, slot, recycle=False, kill=False):
+    self._busy.discard(slot)
+    if recycle or kill or len(self._idle) + len(self._busy) >= self.size:
+      slot.stop(kill)
+      if len(self._idle) + len(self._busy) < self.size:
+        self._idle.append(self._new_slot())
+    else:
+      self._idle.append(slot)
+  
+  def shutdown(self):
+    for slot in self._idle:
+      slot.stop()
+    for slot in self._busy:
+      slot.stop(True)
+    self._idle = []
+    self._busy = set()
+
+class PoolHandle(ExecutionHandle):
+  
+  def __init__(self, executor, slot):
+    self._executor = executor
+    self._slot = slot
+    self._retcode = None
+  
+  def _receive(self):
+    try:
+      retcode, recycle = self._slot.conn.recv()
+    except EOFError:
+      # The pooled process died before reporting back
+      retcode, recycle = 908, True
+    self._retcode = retcode
+    self._executor._release(self._slot, recycle)
+  
+  @property
+  def sentinel(self):
+    return self._slot.conn if self._retcode is None else None
+  
+  @property
+  def retcode(self):
+    return self._retcode
+  
+  def is_alive(self):
+    if self._retcode is None and self._slot.conn.poll():
+      self._receive()
+    return self._retcode is None
+  
+  def join(self):
+    if self._retcode is None:
+      self._receive()
+  
+  def terminate(self):
+    if self._retcode is None:
+      self._retcode = 907
+      self._executor._release(self._slot, kill=True)
@@ -0,0 +1,94 @@
+# Copyright 2019 Comcast Cable Communications Management, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import sys
+import multiprocessing
+import multiprocessing.forkserver
+from pyrunner.executor.abstract import Executor, ExecutionHandle
+
+def get_mp_context(start_method=None, preload=None):
+  """
+  Returns the multiprocessing context for the given start method ('fork',
+  'forkserver' or 'spawn'). For 'forkserver', the given module names are
+  imported by the fork server before it forks any Worker process, provided it
+  has not been started already.
+  """
+  mp = multiprocessing.get_context(start_method)
+  if mp.get_start_method() == 'forkserver' and preload:
+    mp.set_forkserver_preload(sorted(set(preload)))
+    # The fork server is a fresh interpreter which does not get our sys.path,
+    # so modules under worker_dir would silently fail to preload. It does
+    # inherit the environment, hence PYTHONPATH is set while it starts up.
+    pythonpath = os.environ.get('PYTHONPATH')
+    os.environ['PYTHONPATH'] = os.pathsep.join([ p for p in sys.path if p ])
+    try:
+      multiprocessing.forkserver.ensure_running()
+    finally:
+      if pythonpath is None:
+        del os.environ['PYTHONPATH']
+      else:
+        os.environ['PYTHONPATH'] = pythonpath
+  return mp
+
+class ProcessExecutor(Executor):
+  """
+  Starts a new process for every Worker. This is the default executor.
+  
+  Args:
+    start_method (str, optional): 'fork', 'forkserver' or 'spawn'. Default: the
+      platform's default
+    preload (list, optional): Modules for the fork server to import up front.
+  """
+  
+  def __init__(self, start_method=None, preload=None):
+    self.start_method = start_method
+    self.preload = preload
+    self._mp = None
+  
+  def start(self):
+    self._mp = get_mp_context(self.start_method, self.preload)
+    return self
+  
+  def submit(self, node):
+    if not self._mp: self.start()
+    worker = node.create_worker()
+    proc = self._mp.Process(target=worker.protected_run, daemon=False)
+    proc.start()
+    return ProcessHandle(proc, worker)
+
+class ProcessHandle(ExecutionHandle):
+  
+  def __init__(self, proc, worker):
+    self._proc = proc
+    self._worker = worker
+  
+  @property
+  def sentinel(self):
+    return self._proc.sentinel
+  
+  @property
+  def retcode(self):
+    return self._worker.retcode
+  
+  def is_alive(self):
+    return self._proc.is_alive()
+  
+  def join(self):
+    self._proc.join()
+  
+  def terminate(self):
+    self._proc.terminate()
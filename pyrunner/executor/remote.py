@@ -0,0 +1,138 @@
+# Copyright 2019 Comcast Cable Communications Management, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+from multiprocessing.connection import Client
+from pyrunner.executor.abstract import Executor, ExecutionHandle
+
+def parse_agents(text):
+  """
+  Parses a comma-separated list of host:port:slots triples, e.g.
+  'batch01:7100:8,batch02:7100:8'. Slots default to 1 if omitted.
+  """
+  agents = []
+  for item in (text or '').split(','):
+    if not item.strip(): continue
+    parts = item.strip().split(':')
+    if len(parts) not in [2, 3]:
+      raise ValueError('Agent must be given as host:port:slots - received: {}'.format(item))
+    agents.append((parts[0], int(parts[1]), int(parts[2]) if len(parts) == 3 else 1))
+  return agents
+
+class _RemoteAgent:
+  
+  def __init__(self, host, port, slots):
+    self.address = (host, port)
+    self.slots = slots
+    self.running = 0
+
+class RemoteExecutor(Executor):
+  """
+  Dispatches Workers to pyrunner-agent processes, possibly on other hosts, so
+  that a single job may use the cores of several machines. Each Worker goes to
+  the agent with the most free slots. Log output is streamed back into the
+  node's logfile as it is written.
+  
+  Workers get a snapshot of the Context taken upon submission, and keys they
+  add or change are copied back into the Context once they exit, as are tasks
+  they spawn. Keys deleted by remote Workers are not propagated.
+  
+  Args:
+    context (Context): The Context shared with every Worker.
+    agents (list): (host, port, slots) triples, e.g. from parse_agents().
+    authkey (bytes): Shared secret the agents were started with.
+  """
+  
+  def __init__(self, context, agents, authkey):
+    if not agents:
+      raise ValueError('The remote executor requires at least one agent (APP_AGENTS)')
+    if not authkey:
+      raise ValueError('The remote executor requires an agent authkey (APP_AGENT_AUTHKEY)')
+    self.context = context
+    self.agents = [ _RemoteAgent(*a) for a in agents ]
+    self.authkey = authkey
+  
+  def fits(self, node):
+    return any([ a.running < a.slots for a in self.agents ])
+  
+  def submit(self, node):
+    agent = max(self.agents, key=lambda a: a.slots - a.running)
+    if agent.running >= agent.slots:
+      raise RuntimeError('No remote agent has a free slot')
+    
+    conn = Client(agent.address, authkey=self.authkey)
+    snapshot = dict(self.context.items()) if self.context is not None else dict()
+    conn.send((node.get_descriptor(), snapshot))
+    agent.running += 1
+    return RemoteHandle(self, agent, conn, node.logfile)
+  
+  def _release(self, agent):
+    agent.running -= 1
+
+class RemoteHandle(ExecutionHandle):
+  
+  def __init__(self, executor, agent, conn, logfile):
+    self._executor = executor
+    self._agent = agent
+    self._conn = conn
+    self._logfile = logfile or os.devnull
+    self._retcode = None
+  
+  def _receive(self, block=False):
+    try:
+      while self._retcode is None and (block or self._conn.poll()):
+        msg = self._conn.recv()
+        if msg[0] == 'log':
+          with open(self._logfile, 'a') as f:
+            f.write(msg[1])
+        elif msg[0] == 'exit':
+          self._finish(msg[1], msg[2], msg[3])
+    except (EOFError, OSError):
+      # The agent went away before reporting back
+      self._finish(908, dict(), list())
+  
+  def _finish(self, retcode, updates, messages):
+    self._retcode = retcode
+    if self._executor.context is not None:
+      for k, v in updates.items():
+        self._executor.context[k] = v
+      for m in messages:
+        self._executor.context.shared_queue.put(m)
+    self._conn.close()
+    self._executor._release(self._agent)
+  
+  @property
+  def sentinel(self):
+    return self._conn if self._retcode is None else None
+  
+  @property
+  def retcode(self):
+    return self._retcode
+  
+  def is_alive(self):
+    self._receive()
+    return self._retcode is None
+  
+  def join(self):
+    self._receive(True)
+  
+  def terminate(self):
+    if self._retcode is None:
+      try:
+        self._conn.send(('terminate',))
+      except OSError:
+        pass
+      self._finish(907, dict(), list())
@@ -0,0 +1,106 @@
+# Copyright 2019 Comcast Cable Communications Management, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import threading
+import multiprocessing
+import concurrent.futures
+from pyrunner.executor.abstract import Executor, ExecutionHandle
+
+class ThreadExecutor(Executor):
+  """
+  Runs Workers in a pool of threads within the engine process, for I/O-bound
+  Workers which gain little from a process of their own. Output written by each
+  Worker still goes to its own logfile. Threads cannot be killed, so timed out
+  Workers are asked to stop via Worker.cancelled instead, and keep their thread
+  busy until they do.
+  """
+  
+  def __init__(self, size=None):
+    self.size = size
+    self._slots = None
+    self._pool = None
+    self._running = 0
+    self._lock = threading.Lock()
+  
+  def start(self):
+    # Same default as ThreadPoolExecutor on Python 3.8 and later
+    self._slots = self.size or min(32, (os.cpu_count() or 1) + 4)
+    self._pool = concurrent.futures.ThreadPoolExecutor(self._slots, thread_name_prefix='pyrunner-worker')
+    return self
+  
+  def fits(self, node):
+    # Terminated Workers which have not returned yet still hold their thread
+    with self._lock:
+      return self._pool is None or self._running < self._slots
+  
+  def submit(self, node):
+    if not self._pool: self.start()
+    worker = node.create_worker()
+    worker._cancel_event = threading.Event()
+    reader, writer = multiprocessing.Pipe(duplex=False)
+    with self._lock:
+      self._running += 1
+    future = self._pool.submit(worker.protected_run)
+    handle = ThreadHandle(future, worker, reader)
+    future.add_done_callback(lambda f: self._notify(writer))
+    return handle
+  
+  def _notify(self, writer):
+    # Makes the handle's sentinel readable, so the engine wakes up.
+    with self._lock:
+      self._running -= 1
+    try:
+      writer.send(True)
+    except OSError:
+      # The handle was terminated, and its reader closed, before the thread exited
+      pass
+    finally:
+      writer.close()
+  
+  def shutdown(self):
+    if self._pool:
+      self._pool.shutdown(wait=False)
+      self._pool = None
+
+class ThreadHandle(ExecutionHandle):
+  
+  def __init__(self, future, worker, reader):
+    self._future = future
+    self._worker = worker
+    self._reader = reader
+    self._terminated = False
+  
+  @property
+  def sentinel(self):
+    return self._reader if not self._reader.closed else None
+  
+  @property
+  def retcode(self):
+    return 907 if self._terminated else self._worker.retcode
+  
+  def is_alive(self):
+    return not self._terminated and not self._future.done()
+  
+  def join(self):
+    if not self._terminated:
+      self._future.result()
+    self._reader.close()
+  
+  def terminate(self):
+    self._worker._cancel_event.set()
+    self._terminated = True
+    self._reader.close()
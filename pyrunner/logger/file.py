@@ -62,6 +62,18 @@ class FileLogger(Logger):
     self.logfile_handle.flush()
     return
   
+  def append_log(self, filename, title):
+    """
+    Append the contents of another log file, under the given section title.
+    """
+    self.logfile_handle.write("\n############################################################################\n")
+    self.logfile_handle.write("# {} - {}\n".format(title, datetime.now()))
+    self.logfile_handle.write("############################################################################\n\n")
+    with open(filename, 'r') as f:
+      shutil.copyfileobj(f, self.logfile_handle)
+    self.logfile_handle.flush()
+    return
+  
   def close(self, close_message=True):
     """
     Close stream for target log file.
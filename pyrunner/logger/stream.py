@@ -0,0 +1,71 @@
+# Copyright 2019 Comcast Cable Communications Management, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import sys
+import threading
+import contextvars
+
+_route = contextvars.ContextVar('pyrunner_stream_route', default=None)
+_install_lock = threading.Lock()
+
+class RoutedStream:
+  """
+  Stand-in for sys.stdout/sys.stderr which writes to the stream routed for the
+  calling thread or asyncio task via redirect(), or to the original stream
+  otherwise. This allows Workers running in threads or coroutines of the same
+  process to each capture their own output.
+  """
+  
+  def __init__(self, default):
+    self._default = default
+  
+  @property
+  def target(self):
+    return _route.get() or self._default
+  
+  def write(self, text):
+    return self.target.write(text)
+  
+  def flush(self):
+    return self.target.flush()
+  
+  def __getattr__(self, name):
+    return getattr(self.target, name)
+
+def install():
+  """
+  Replaces sys.stdout and sys.stderr with RoutedStreams, if not already done.
+  """
+  with _install_lock:
+    if not isinstance(sys.stdout, RoutedStream):
+      sys.stdout = RoutedStream(sys.stdout)
+    if not isinstance(sys.stderr, RoutedStream):
+      sys.stderr = RoutedStream(sys.stderr)
+
+def redirect(handle):
+  """
+  Routes everything the calling thread or asyncio task writes to
+  sys.stdout/sys.stderr to the given file handle.
+  """
+  install()
+  _route.set(handle)
+
+def restore():
+  """
+  Routes the calling thread's or asyncio task's sys.stdout/sys.stderr writes
+  back to the original streams.
+  """
+  _route.set(None)
@@ -0,0 +1,5 @@
+from .fifo import FifoPolicy
+from .priority import PriorityPolicy
+from .shortest_job import ShortestJobFirstPolicy
+from .critical_path import CriticalPathPolicy
+from .abstract import SchedulingPolicy, RankedPolicy
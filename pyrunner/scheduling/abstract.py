@@ -0,0 +1,125 @@
+# Copyright 2019 Comcast Cable Communications Management, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import heapq
+import itertools
+from abc import ABCMeta, abstractmethod
+
+class SchedulingPolicy:
+  """
+  Implementations of this abstract class decide the order in which nodes whose
+  dependencies have all been met are executed. The NodeRegister pushes nodes
+  into the policy as they become ready and the ExecutionEngine pops them for
+  as long as it has capacity to execute more Workers.
+  """
+  
+  __metaclass__ = ABCMeta
+  
+  def prepare(self, register, history=None):
+    """
+    Called once before the execution loop begins, with the NodeRegister about
+    to be executed and the RuntimeHistory of prior executions, if any.
+    Implementations that need to inspect the full graph should do so here.
+    """
+    self.history = history
+    self.clear()
+  
+  def estimate(self, node):
+    """
+    Returns the expected duration of the given node in seconds, preferring the
+    declared expected_duration over the median of historical durations.
+    None if neither is known.
+    """
+    if node.expected_duration is not None:
+      return node.expected_duration
+    if getattr(self, 'history', None):
+      return self.history.median(node.name)
+    return None
+  
+  @abstractmethod
+  def clear(self):
+    """
+    Removes all queued nodes.
+    """
+    pass
+  
+  @abstractmethod
+  def push(self, node):
+    """
+    Queues a node which is ready to execute.
+    """
+    pass
+  
+  def requeue(self, node):
+    """
+    Returns a popped node which could not be executed yet to the queue, ahead
+    of nodes that would otherwise execute in the same order.
+    """
+    self.push(node)
+  
+  @abstractmethod
+  def peek(self):
+    """
+    Returns the node which should execute next without removing it, or None.
+    """
+    pass
+  
+  @abstractmethod
+  def pop(self):
+    """
+    Removes and returns the node which should execute next, or None.
+    """
+    pass
+  
+  @abstractmethod
+  def __len__(self):
+    pass
+
+class RankedPolicy(SchedulingPolicy):
+  """
+  Base class for policies that execute ready nodes in ascending order of a
+  numeric rank. Nodes of equal rank execute in the order they became ready.
+  """
+  
+  def __init__(self):
+    self.clear()
+  
+  @abstractmethod
+  def rank(self, node):
+    """
+    Returns the sort key of the given node. Lower ranks execute first.
+    """
+    pass
+  
+  def clear(self):
+    self._heap = []
+    self._counter = itertools.count()
+    self._requeue_counter = itertools.count(-1, -1)
+  
+  def push(self, node):
+    heapq.heappush(self._heap, (self.rank(node), next(self._counter), node))
+  
+  def requeue(self, node):
+    heapq.heappush(self._heap, (self.rank(node), next(self._requeue_counter), node))
+  
+  def peek(self):
+    return self._heap[0][2] if self._heap else None
+  
+  def pop(self):
+    return heapq.heappop(self._heap)[2] if self._heap else None
+  
+  def __len__(self):
+    return len(self._heap)
@@ -0,0 +1,68 @@
+# Copyright 2019 Comcast Cable Communications Management, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+from pyrunner.scheduling.abstract import RankedPolicy
+
+class CriticalPathPolicy(RankedPolicy):
+  """
+  Executes nodes heading the longest remaining chain of work first.
+  
+  A node's path length is its own expected duration plus the longest path
+  length among its children. Nodes without a declared or historical duration
+  are weighted with default_duration.
+  
+  Args:
+    default_duration (float, optional): Weight in seconds of nodes with no
+      known duration. Default: 1
+  """
+  
+  def __init__(self, default_duration=1):
+    self.default_duration = default_duration
+    self._lengths = dict()
+    super().__init__()
+  
+  def prepare(self, register, history=None):
+    super().prepare(register, history)
+    self._lengths = dict()
+    for node in register.pending_nodes:
+      self.path_length(node)
+  
+  def rank(self, node):
+    return -self.path_length(node)
+  
+  def path_length(self, node):
+    """
+    Returns the weighted length of the longest path from the given node to
+    any of its descendant leaf nodes, inclusive of the node itself.
+    """
+    stack = [ node ]
+    
+    while stack:
+      cur_node = stack[-1]
+      if cur_node in self._lengths:
+        stack.pop()
+        continue
+      
+      unknown = [ c for c in cur_node.child_nodes if c not in self._lengths ]
+      if unknown:
+        stack.extend(unknown)
+      else:
+        stack.pop()
+        estimate = self.estimate(cur_node)
+        weight = estimate if estimate is not None else self.default_duration
+        self._lengths[cur_node] = weight + max([ self._lengths[c] for c in cur_node.child_nodes ] or [0])
+    
+    return self._lengths[node]
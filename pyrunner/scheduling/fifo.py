@@ -0,0 +1,45 @@
+# Copyright 2019 Comcast Cable Communications Management, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+from collections import deque
+from pyrunner.scheduling.abstract import SchedulingPolicy
+
+class FifoPolicy(SchedulingPolicy):
+  """
+  Executes nodes in the order in which they became ready. This is the default
+  scheduling policy.
+  """
+  
+  def __init__(self):
+    self.clear()
+  
+  def clear(self):
+    self._queue = deque()
+  
+  def push(self, node):
+    self._queue.append(node)
+  
+  def requeue(self, node):
+    self._queue.appendleft(node)
+  
+  def peek(self):
+    return self._queue[0] if self._queue else None
+  
+  def pop(self):
+    return self._queue.popleft() if self._queue else None
+  
+  def __len__(self):
+    return len(self._queue)
@@ -0,0 +1,27 @@
+# Copyright 2019 Comcast Cable Communications Management, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+from pyrunner.scheduling.abstract import RankedPolicy
+
+class ShortestJobFirstPolicy(RankedPolicy):
+  """
+  Executes nodes with the shortest expected duration first. Nodes without a
+  declared or historical duration execute after all others.
+  """
+  
+  def rank(self, node):
+    estimate = self.estimate(node)
+    return estimate if estimate is not None else float('inf')
@@ -1,3 +1,4 @@
 from .list import ListSerDe
 from .json import JsonSerDe
-from .abstract import SerDe
\ No newline at end of file
+from .abstract import SerDe
+from .statelog import StateLog
\ No newline at end of file
@@ -15,6 +15,7 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import os
+import pyrunner.core.constants as constants
 from abc import ABCMeta, abstractmethod
 
 class SerDe:
@@ -42,6 +43,24 @@ class SerDe:
     """
     pass
   
+  def node_status(self, node_register):
+    """
+    Returns the status each node of the given NodeRegister is persisted with.
+    Nodes halted by fail-fast are persisted as pending, so that a restart
+    executes them.
+    """
+    status = { node:grp for grp in node_register.register for node in node_register.register[grp] }
+    status.update({ node:constants.STATUS_PENDING for node in node_register.halted_nodes })
+    return status
+  
+  def node_record(self, node, status):
+    """
+    Returns the record a StateLog appends for the given node when it changes,
+    a single line starting with '<id>|'. Implementations which read the log
+    back on restart should record every persisted field of the node.
+    """
+    return '{}|{}'.format(node.id, status)
+  
   def save_to_file(self, filepath, node_register):
     tmp  = filepath+'.tmp'
     perm = filepath
@@ -29,6 +29,9 @@ class JsonSerDe(SerDe):
     value is an inner object keyed on the Task Name. Each Task Name is additionally
     an inner object with at minimum the 'module' and 'worker' attributes.
     
+    An optional 'pools' attribute maps concurrency pool names to the maximum
+    number of tasks in each pool which may run at once.
+    
     See <URL here> for JSON file specifications.
     
     Args:
@@ -50,6 +53,9 @@ class JsonSerDe(SerDe):
       proc_obj = json.load(f)
     used_names = set()
     
+    for name,limit in proc_obj.get('pools', {}).items():
+      register.pools[name] = int(limit)
+    
     for name,details in proc_obj['tasks'].items():
       if name in used_names:
         raise RuntimeError('Task name {} has already been registered'.format(name))
@@ -59,26 +65,33 @@ class JsonSerDe(SerDe):
       # Substitute $ENV{...} vars with environment vars.
       sub_details = dict()
       for k,v in details.items():
-        if "$ENV{" in str(v):
-          subbed = []
-          disect = re.split(r"\$ENV|}", v)
-          for x in disect:
-            if x[:1] == '{':
-              val = os.environ[x[1:]]
-              subbed.append(val)
-            else:
-              subbed.append(x)
-          sub_details[k] = ''.join(subbed)
+        if isinstance(v, list):
+          sub_details[k] = [ self._substitute_env(x) for x in v ]
         else:
-          sub_details[k] = v
+          sub_details[k] = self._substitute_env(v)
       
       register.add_node(name = name, **sub_details)
       
     return register
   
+  def _substitute_env(self, value):
+    if "$ENV{" not in str(value):
+      return value
+    subbed = []
+    disect = re.split(r"\$ENV|}", value)
+    for x in disect:
+      if x[:1] == '{':
+        val = os.environ[x[1:]]
+        subbed.append(val)
+      else:
+        subbed.append(x)
+    return ''.join(subbed)
+  
   def serialize(self, register):
     obj = { 'tasks' : dict() }
-    for node in sorted(register.all_nodes, key = (lambda n : n.id)):
+    if register.pools:
+      obj['pools'] = dict(register.pools)
+    for node in register.sorted_nodes():
       obj['tasks'][node.name] = {
         'module'  : node.module,
         'worker'  : node.worker,
@@ -93,5 +106,6 @@ class JsonSerDe(SerDe):
         obj['tasks'][node.name]['arguments'] = node.arguments
       if node.timeout != float('inf'):
         obj['tasks'][node.name]['timeout'] = node.timeout
+      obj['tasks'][node.name].update(node.get_optional_attributes())
     
     return json.dumps(obj, indent=4)
\ No newline at end of file
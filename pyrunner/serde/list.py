@@ -17,6 +17,7 @@
 import os, re
 import pyrunner.core.constants as constants
 from pyrunner.serde.abstract import SerDe
+from pyrunner.serde.statelog import StateLog
 from pyrunner.core.register import NodeRegister
 
 class ListSerDe(SerDe):
@@ -27,7 +28,9 @@ class ListSerDe(SerDe):
       raise FileNotFoundError('Process file {} does not exist.'.format(proc_file))
     
     register = NodeRegister()
-    pipe_pattern  = re.compile(r'''((?:[^|"']|"[^"]*"|'[^']*')+)''')
+    # Pipes are split on outside of double quotes only, as an apostrophe in a
+    # name or path is not an opening quote
+    pipe_pattern  = re.compile(r'''\|(?=(?:[^"]|"[^"]*")*$)''')
     comma_pattern = re.compile(r'''((?:[^,"']|"[^"]*"|'[^']*')+)''')
     
     with open(proc_file) as f:
@@ -35,6 +38,9 @@ class ListSerDe(SerDe):
     
     if not proc_list: raise ValueError('No information read from process list file')
     
+    # Records of the nodes changed since the restart file was written
+    logged = StateLog.read(proc_file + StateLog.SUFFIX) if restart else dict()
+    
     used_ids = set()
     
     for proc in proc_list:
@@ -44,7 +50,13 @@ class ListSerDe(SerDe):
       if not proc or proc[0] == '#':
         continue
       
-      details = [ x.strip(' |') for x in pipe_pattern.split(proc)[1:-1] if x != '|' ]
+      # The last record logged for a node replaces its line
+      if logged:
+        proc = logged.get(int(proc.partition('|')[0]), proc)
+      
+      # Empty fields are kept, so every column stays at its position, and the
+      # optional ATTRIBUTES column is always the last one
+      details = [ x.strip() for x in pipe_pattern.split(proc) ]
       sub_details = []
       
       # Substitute $ENV{...} vars with environment vars.
@@ -71,18 +83,20 @@ class ListSerDe(SerDe):
       dependencies = [ int(x) for x in sub_details[1].split(',') ]
       
       if restart:
+        status = sub_details[4]
         register.add_node(
           id = id,
           dependencies = dependencies,
           max_attempts = sub_details[2],
           retry_wait_time = sub_details[3],
-          status = sub_details[4] if sub_details[4] in [ constants.STATUS_COMPLETED, constants.STATUS_NORUN ] else constants.STATUS_PENDING,
+          status = status if status in [ constants.STATUS_COMPLETED, constants.STATUS_NORUN ] else constants.STATUS_PENDING,
           name = sub_details[6],
           module = sub_details[7],
           worker = sub_details[8],
           arguments = [ s.strip('"') if s.strip().startswith('"') and s.strip().endswith('"') else s.strip() for s in comma_pattern.split(sub_details[9])[1::2] ] if len(sub_details) > 9 else None,
           logfile = sub_details[10] if len(sub_details) > 10 else None,
-          named_deps = False
+          named_deps = False,
+          **self.parse_attributes(sub_details[11] if len(sub_details) > 11 else '')
         )
       else:
         register.add_node(
@@ -95,20 +109,52 @@ class ListSerDe(SerDe):
           worker = sub_details[6],
           arguments = [ s.strip('"') if s.strip().startswith('"') and s.strip().endswith('"') else s.strip() for s in comma_pattern.split(sub_details[7])[1::2] ] if len(sub_details) > 7 else None,
           logfile = sub_details[8] if len(sub_details) > 8 else None,
-          named_deps = False
+          named_deps = False,
+          **self.parse_attributes(sub_details[9] if len(sub_details) > 9 else '')
         )
     
     return register
   
-  def get_ctllog_line(self, node, status):
+  def parse_attributes(self, attr_str):
+    """
+    Returns a dict of the optional node attributes in the given string, which is
+    expected to be a semicolon-separated list of key=value pairs.
+    
+    e.g. 'priority=10;expected_duration=300'
+    """
+    attributes = dict()
+    for pair in [ x.strip() for x in attr_str.split(';') if x.strip() ]:
+      key, sep, value = pair.partition('=')
+      if not sep:
+        raise ValueError('Invalid attribute (expected key=value): {}'.format(pair))
+      attributes[key.strip()] = value.strip()
+    return attributes
+  
+  def format_attributes(self, node):
+    pairs = []
+    for k,v in node.get_optional_attributes().items():
+      if isinstance(v, bool):
+        v = str(v).lower()
+      elif isinstance(v, (list, tuple)):
+        v = ','.join([ str(x) for x in v ])
+      pairs.append('{}={}'.format(k, v))
+    return ';'.join(pairs)
+  
+  def node_record(self, node, status):
+    # The elapsed time of running nodes, which changes on every save and is not
+    # read back, is left out so that they are only logged on status changes
+    return self.get_ctllog_line(node, status, status != constants.STATUS_RUNNING)
+  
+  def get_ctllog_line(self, node, status, elapsed=True):
       parent_id_list = [ str(x.id) for x in node.parent_nodes ]
       parent_id_str = ','.join(parent_id_list) if parent_id_list else '-1'
-      return "|".join([ str(node.id), parent_id_str, str(node.max_attempts), str(node.retry_wait_time), status, node.get_elapsed_time(), node.name, node.module, node.worker, ','.join(node.arguments), node.logfile ])
+      fields = [ str(node.id), parent_id_str, str(node.max_attempts), str(node.retry_wait_time), status, node.get_elapsed_time() if elapsed else '', node.name, node.module, node.worker, ','.join(node.arguments), node.logfile ]
+      attr_str = self.format_attributes(node)
+      if attr_str:
+        fields.append(attr_str)
+      return "|".join(fields)
       
   def serialize(self, register):
-    node_list = []
-    for grp in register.register:
-      for node in register.register[grp]:
-        node_list.append((node, grp))
-    node_list.sort(key = (lambda n : n[0].id))
+    status = self.node_status(register)
+    node_list = [ (node, status[node]) for node in register.sorted_nodes() ]
     return '{}\n\n'.format(constants.HEADER_PYTHON) + '\n'.join([ self.get_ctllog_line(node, status) for node,status in node_list ])
\ No newline at end of file
@@ -0,0 +1,150 @@
+# Copyright 2019 Comcast Cable Communications Management, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import time
+
+class StateLog:
+  """
+  Persists a NodeRegister as a snapshot written by a SerDe, plus a write-ahead
+  log of the nodes changed since, so that saving the state of a large register
+  only writes the nodes which changed.
+  
+  Each record of the log is the full record of a node, as returned by
+  SerDe.node_record(), so that changes of its attributes are kept along with
+  those of its status. Records are only appended for nodes which changed since
+  the last save, and nothing is written if none did. The log is compacted into
+  a new snapshot once it holds more than max_records records, or when nodes
+  were added to the register, e.g. spawned at runtime.
+  
+  Args:
+    serde: SerDe which writes the snapshot, and reads it back along with the
+      log on restart.
+    path (str): Path of the snapshot. The log is kept next to it, at
+      path + StateLog.SUFFIX.
+    sync_interval (float, optional): Minimum number of seconds between fsyncs
+      of the log. 0 syncs every batch of appended records, -1 leaves flushing
+      to the OS.
+    max_records (int, optional): Number of records beyond which the log is
+      compacted. 0 rewrites the snapshot on every change.
+  """
+  
+  SUFFIX = '.wal'
+  
+  def __init__(self, serde, path, sync_interval=0, max_records=10000):
+    self.serde = serde
+    self.path = path
+    self.log_path = path + self.SUFFIX
+    self.sync_interval = sync_interval
+    self.max_records = max_records
+    self.records = 0
+    self.compactions = 0
+    self._saved = None
+    self._fd = None
+    self._last_sync = 0
+    self._unsynced = False
+  
+  @classmethod
+  def read(cls, log_path):
+    """
+    Returns the last record logged for each node id in the given log. A record
+    cut short by a crash is ignored.
+    """
+    records = dict()
+    if not os.path.isfile(log_path):
+      return records
+    with open(log_path) as f:
+      for line in f:
+        if not line.endswith('\n'):
+          break
+        id, sep, value = line.strip().partition('|')
+        if sep and value:
+          records[int(id)] = line.strip()
+    return records
+  
+  def save(self, register, compact=False):
+    """
+    Persists the given register, and returns the number of records appended,
+    or None if it was compacted into a new snapshot.
+    """
+    current = self._records(register)
+    if compact or self._saved is None or current.keys() != self._saved.keys():
+      return self.compact(register, current)
+    
+    changed = sorted([ (id, record) for id,record in current.items() if self._saved[id] != record ])
+    if changed and self.records + len(changed) > self.max_records:
+      return self.compact(register, current)
+    
+    if changed:
+      os.write(self._open(), ''.join([ '{}\n'.format(record) for _,record in changed ]).encode('utf-8'))
+      self.records += len(changed)
+      self._saved = current
+      self._unsynced = True
+    self._sync()
+    return len(changed)
+  
+  def compact(self, register, current=None):
+    """
+    Writes a new snapshot of the given register, and empties the log.
+    """
+    if current is None:
+      current = self._records(register)
+    tmp = self.path+'.tmp'
+    with open(tmp, 'w') as file:
+      file.write(self.serde.serialize(register))
+      file.flush()
+      os.fsync(file.fileno())
+    # The log is emptied once the new snapshot is durably in place. A crash in
+    # between replays the log over the new snapshot, which is harmless as the
+    # last record of each node matches the node in the snapshot
+    os.replace(tmp, self.path)
+    self._sync_dir()
+    os.truncate(self._open(), 0)
+    self.records = 0
+    self.compactions += 1
+    self._saved = current
+    self._unsynced = False
+    return None
+  
+  def _records(self, register):
+    return { node.id:self.serde.node_record(node, status) for node,status in self.serde.node_status(register).items() }
+  
+  def _sync_dir(self):
+    fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+    try:
+      os.fsync(fd)
+    finally:
+      os.close(fd)
+  
+  def _open(self):
+    if self._fd is None:
+      self._fd = os.open(self.log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    return self._fd
+  
+  def _sync(self):
+    if not self._unsynced or self.sync_interval < 0:
+      return
+    if time.time() - self._last_sync >= self.sync_interval:
+      os.fsync(self._fd)
+      self._last_sync = time.time()
+      self._unsynced = False
+  
+  def close(self):
+    if self._fd is not None:
+      if self._unsynced and self.sync_interval >= 0:
+        os.fsync(self._fd)
+      os.close(self._fd)
+    self._fd = None
@@ -1,2 +1,3 @@
 from .shellworker import ShellWorker
-from .abstract import Worker
\ No newline at end of file
+from .abstract import Worker
+from .asyncworker import AsyncWorker
\ No newline at end of file
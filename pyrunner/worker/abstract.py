@@ -18,6 +18,8 @@ import traceback, sys, time
 import multiprocessing.sharedctypes
 
 import pyrunner.logger.file as lg
+import pyrunner.logger.stream as stream
+from pyrunner.core.context import Context
 
 from abc import ABC, abstractmethod
 
@@ -34,19 +36,52 @@ class Worker(ABC):
   """
   
   def __init__(self, context, logfile, argv, as_service, service_exec_interval=1):
-    self.context = context
-    self._retcode = multiprocessing.sharedctypes.Value('i', 0)
+    self.context = context.tracked() if isinstance(context, Context) else context
+    self._retcode = multiprocessing.sharedctypes.RawValue('i', 0)
     self.logfile = logfile
     self.logger = None
     self.argv = argv
     self._as_service = as_service
     self._service_exec_interval = service_exec_interval
+    self._cancel_event = None
+    self.node_id = None
     
     return
   
   def cleanup(self):
     self._retcode = None
   
+  @property
+  def cancelled(self):
+    """
+    True once the engine has asked this Worker to stop, e.g. upon timeout. Only
+    Workers running in threads are asked rather than terminated, and long
+    running implementations of run() should check this periodically.
+    """
+    return bool(self._cancel_event and self._cancel_event.is_set())
+  
+  def spawn_tasks(self, tasks, join=None):
+    """
+    Adds tasks to the running job, which execute once this task completes.
+    See NodeRegister.spawn_nodes() for the format of tasks and join, e.g.:
+    
+      self.spawn_tasks(
+        [ { 'name': 'Load {}'.format(p), 'module': 'ingest', 'worker': 'Load', 'argv': [p] } for p in partitions ],
+        join={ 'name': 'Load Complete', 'module': 'ingest', 'worker': 'Summarize' }
+      )
+    
+    Spawned tasks are saved to the ctllog like any other, so a restart only
+    runs those which have not completed.
+    """
+    if self.node_id is None or self.context is None or self.context.shared_queue is None:
+      raise RuntimeError('spawn_tasks() is only available to Workers launched by the ExecutionEngine')
+    self.context.shared_queue.put(('spawn', self.node_id, [ dict(t) for t in tasks ], dict(join) if join else None))
+  
+  def _report_written(self):
+    # Lets the engine know which Context keys this task set, e.g. to cache them.
+    if self.node_id is not None and self.context is not None and self.context.written and self.context.shared_queue is not None:
+      self.context.shared_queue.put(('written', self.node_id, sorted(self.context.written)))
+  
   # The _retcode is handled by multiprocessing.Manager and requires special handling.
   @property
   def retcode(self):
@@ -65,8 +100,7 @@ class Worker(ABC):
     """
     
     self.logger = lg.FileLogger(self.logfile).open()
-    sys.stdout = self.logger.logfile_handle
-    sys.stderr = self.logger.logfile_handle
+    stream.redirect(self.logger.logfile_handle)
     
     # ON START
     try:
@@ -83,8 +117,11 @@ class Worker(ABC):
     try:
       while True:
         self.retcode = self.run() or self.retcode
-        if not self._as_service: break
-        time.sleep(self._service_exec_interval)
+        if not self._as_service or self.cancelled: break
+        if self._cancel_event:
+          self._cancel_event.wait(self._service_exec_interval)
+        else:
+          time.sleep(self._service_exec_interval)
     except Exception as e:
       self.logger.error("Uncaught Exception from Worker Thread (RUN)")
       self.logger.error(str(e))
@@ -125,6 +162,8 @@ class Worker(ABC):
       self.logger.error(traceback.format_exc())
       self.retcode = 906
     
+    self._report_written()
+    stream.restore()
     self.logger.close()
     self.logger = None
     
@@ -0,0 +1,133 @@
+# Copyright 2019 Comcast Cable Communications Management, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import asyncio
+import traceback
+
+import pyrunner.logger.file as lg
+import pyrunner.logger.stream as stream
+
+from abc import abstractmethod
+from pyrunner.worker.abstract import Worker
+from pyrunner.core.context import AsyncContext
+
+class AsyncWorker(Worker):
+  """
+  Abstract class for user-defined workers whose lifecycle methods are
+  coroutines (async def). The 'async' executor runs many AsyncWorkers
+  concurrently in a single event loop; any other executor runs each one in
+  an event loop of its own.
+  
+  Blocking calls must be avoided within the lifecycle methods, as they stall
+  every other AsyncWorker sharing the loop. Use self.async_context rather than
+  self.context to access the shared Context.
+  """
+  
+  def __init__(self, context, logfile, argv, as_service, service_exec_interval=1):
+    super().__init__(context, logfile, argv, as_service, service_exec_interval)
+    self.async_context = AsyncContext(self.context) if self.context is not None else None
+  
+  def protected_run(self):
+    asyncio.run(self.protected_run_async())
+  
+  async def protected_run_async(self):
+    """
+    Coroutine equivalent of Worker.protected_run(). The log file is closed
+    even if the coroutine is cancelled, e.g. upon timeout.
+    """
+    
+    self.logger = lg.FileLogger(self.logfile).open()
+    stream.redirect(self.logger.logfile_handle)
+    
+    try:
+      await self._protected_lifecycle()
+      self._report_written()
+    finally:
+      stream.restore()
+      self.logger.close()
+      self.logger = None
+    
+    return
+  
+  async def _protected_lifecycle(self):
+    # ON START
+    try:
+      self.retcode = await self.on_start() or self.retcode
+    except NotImplementedError:
+      pass
+    except Exception as e:
+      self._log_exception('ON_START', e)
+      self.retcode = 902
+    
+    # RUN
+    try:
+      while True:
+        self.retcode = await self.run() or self.retcode
+        if not self._as_service or self.cancelled: break
+        await asyncio.sleep(self._service_exec_interval)
+    except Exception as e:
+      self._log_exception('RUN', e)
+      self.retcode = 903
+    
+    if not self.retcode:
+      # ON SUCCESS
+      try:
+        self.retcode = await self.on_success() or self.retcode
+      except NotImplementedError:
+        pass
+      except Exception as e:
+        self._log_exception('ON_SUCCESS', e)
+        self.retcode = 904
+    else:
+      # ON FAIL
+      try:
+        await self.on_fail()
+      except NotImplementedError:
+        pass
+      except Exception as e:
+        self._log_exception('ON_FAIL', e)
+        self.retcode = 905
+    
+    # ON EXIT
+    try:
+      self.retcode = await self.on_destroy() or self.retcode
+    except NotImplementedError:
+      pass
+    except Exception as e:
+      self._log_exception('ON_DESTROY', e)
+      self.retcode = 906
+  
+  def _log_exception(self, stage, e):
+    self.logger.error('Uncaught Exception from Worker Coroutine ({})'.format(stage))
+    self.logger.error(str(e))
+    self.logger.error(traceback.format_exc())
+  
+  # To be implemented in user-defined workers.
+  async def on_start(self):
+    raise NotImplementedError('Method "on_start" is not implemented')
+  
+  @abstractmethod
+  async def run(self):
+    pass
+  
+  async def on_success(self):
+    raise NotImplementedError('Method "on_success" is not implemented')
+  
+  async def on_fail(self):
+    raise NotImplementedError('Method "on_fail" is not implemented')
+  
+  async def on_destroy(self):
+    raise NotImplementedError('Method "on_destroy" is not implemented')
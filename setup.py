@@ -25,11 +25,12 @@ setup(
   version = __version__,
   author = 'Nathaniel Lee',
   author_email = 'nathaniel_lee@comcast.com',
+  python_requires = '>=3.7',
   install_requires = [],
-  packages = ['pyrunner', 'pyrunner.core', 'pyrunner.logger', 'pyrunner.notification', 'pyrunner.serde', 'pyrunner.worker', 'pyrunner.autodoc' ],
+  packages = ['pyrunner', 'pyrunner.core', 'pyrunner.logger', 'pyrunner.notification', 'pyrunner.serde', 'pyrunner.worker', 'pyrunner.autodoc', 'pyrunner.scheduling', 'pyrunner.executor', 'pyrunner.backend' ],
   license = 'Apache 2.0',
   long_description = 'Python utility providing text-based workflow manager.',
   entry_points = {
-    'console_scripts': ['pyrunner=pyrunner.cli:main']
+    'console_scripts': ['pyrunner=pyrunner.cli:main', 'pyrunner-agent=pyrunner.executor.agent:main']
   }
 )
\ No newline at end of file
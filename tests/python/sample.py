@@ -1,5 +1,10 @@
 import time
-from pyrunner import Worker
+import asyncio
+import threading
+from pyrunner import Worker, AsyncWorker
+
+# Set by tests to let BlockUntilReleased return
+released = threading.Event()
 
 class SayHello(Worker):
   def run(self):
@@ -8,4 +13,76 @@ class SayHello(Worker):
 
 class FailMe(Worker):
   def run(self):
-    return 1
\ No newline at end of file
+    return 1
+
+class ThrowError(Worker):
+  def run(self):
+    raise ValueError('Raised from worker')
+
+class PrintArgs(Worker):
+  def run(self):
+    print('Printed by {}'.format(self.argv[0]))
+    return
+
+class RunUntilCancelled(Worker):
+  def run(self):
+    return 1 if self.cancelled else 0
+
+
+class BlockUntilReleased(Worker):
+  def run(self):
+    # Ignores Worker.cancelled, like a thread stuck in a blocking call
+    released.wait(30)
+
+class AsyncSleep(AsyncWorker):
+  async def run(self):
+    await asyncio.sleep(float(self.argv[0]) if self.argv else 0.1)
+    print('Slept in {}'.format(self.logfile))
+    return
+
+class AsyncSetContext(AsyncWorker):
+  async def run(self):
+    await self.async_context.set(self.argv[0], await self.async_context.get('seed', 0) + 1)
+
+class AsyncFailMe(AsyncWorker):
+  async def run(self):
+    return 1
+
+class SetContext(Worker):
+  def run(self):
+    self.context.set(self.argv[0], self.context.get('seed', 0) + 1)
+    return
+
+class SpawnPartitions(Worker):
+  def run(self):
+    self.spawn_tasks(
+      [ { 'name': 'Partition {}'.format(i), 'module': 'sample', 'worker': 'SayHello' } for i in range(int(self.argv[0])) ],
+      join={ 'name': 'Partitions Joined', 'module': 'sample', 'worker': 'SayHello' }
+    )
+    return
+
+class HangOnce(Worker):
+  def run(self):
+    # Hangs on the first attempt only, which leaves the given marker file behind
+    try:
+      open(self.argv[0], 'x').close()
+    except FileExistsError:
+      print('Finished without hanging')
+      return
+    time.sleep(30)
+
+class PutBuffer(Worker):
+  def run(self):
+    self.context.put_buffer(self.argv[0], self.argv[1].encode())
+
+class ReadBuffer(Worker):
+  def run(self):
+    self.context.set('{}_value'.format(self.argv[0]), bytes(self.context.get_buffer(self.argv[0])).decode())
+
+class CheckGone(Worker):
+  def run(self):
+    self.context.set('gone', self.argv[0] not in self.context)
+
+class WaitFor(Worker):
+  def run(self):
+    self.context.set('waited', self.context.wait_for(self.argv[0], 30))
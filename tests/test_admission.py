@@ -0,0 +1,140 @@
+# Copyright 2019 Comcast Cable Communications Management, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import pytest
+
+from pyrunner.core.admission import ResourceBudget, ConcurrencyPools, LaunchRates, TokenBucket, AdaptiveConcurrency, parse_limits, parse_rates
+from pyrunner.core.node import ExecutionNode
+
+def make_node(id, cpus=0, mem_mb=0, pool=None):
+  node = ExecutionNode(id)
+  node.cpus = cpus
+  node.mem_mb = mem_mb
+  if pool:
+    node.pool = pool
+  return node
+
+def test_budget_fits_until_full():
+  budget = ResourceBudget(4, 1024)
+  big, small, tiny = make_node(1, 3, 512), make_node(2, 2, 128), make_node(3, 1, 128)
+  budget.acquire(big)
+  assert not budget.fits(small) and budget.fits(tiny)
+
+def test_budget_memory():
+  budget = ResourceBudget(64, 1000)
+  budget.acquire(make_node(1, 1, 800))
+  assert not budget.fits(make_node(2, 1, 300)) and budget.fits(make_node(3, 1, 200))
+
+def test_budget_release():
+  budget = ResourceBudget(2, 1000)
+  node = make_node(1, 2)
+  budget.acquire(node)
+  budget.release(node)
+  assert budget.fits(make_node(2, 2)) and budget.used_cpus == 0
+
+def test_budget_oversized_runs_alone():
+  budget = ResourceBudget(2, 1000)
+  assert budget.fits(make_node(1, 8))
+  budget.acquire(make_node(2, 1))
+  assert not budget.fits(make_node(3, 8))
+
+def test_budget_no_request_always_fits():
+  budget = ResourceBudget(1, 100)
+  budget.acquire(make_node(1, 1, 100))
+  assert budget.fits(make_node(2))
+
+
+@pytest.mark.parametrize('limit_str, expected', [
+  ('db:4,api:8', {'db': 4, 'api': 8}),
+  (' db : 2 ', {'db': 2}),
+  ('', {}),
+  (None, {})
+])
+def test_parse_limits(limit_str, expected):
+  assert parse_limits(limit_str) == expected
+
+def test_parse_limits_invalid():
+  with pytest.raises(ValueError):
+    parse_limits('db')
+
+def test_pools_limit():
+  pools = ConcurrencyPools({'db': 2})
+  first, second, third = make_node(1, pool='db'), make_node(2, pool='db'), make_node(3, pool='db')
+  for n in (first, second):
+    assert pools.fits(n)
+    pools.acquire(n)
+  assert not pools.fits(third) and pools.queued('db') == 1
+  pools.release(first)
+  assert pools.fits(third)
+  pools.acquire(third)
+  assert pools.queued('db') == 0 and pools.waited['db'] == 1 and pools.running['db'] == 2
+
+def test_pools_discard_settled():
+  pools = ConcurrencyPools({'db': 1})
+  first, second, third = make_node(1, pool='db'), make_node(2, pool='db'), make_node(3, pool='db')
+  pools.acquire(first)
+  assert not pools.fits(second) and not pools.fits(third) and pools.queued('db') == 2
+  # The second node was e.g. defaulted while waiting for a slot
+  pools.discard_settled({ third })
+  assert pools.queued('db') == 1 and pools.waited['db'] == 0
+
+def test_pools_unlimited():
+  pools = ConcurrencyPools({'db': 1})
+  pools.acquire(make_node(1, pool='db'))
+  assert pools.fits(make_node(2)) and pools.fits(make_node(3, pool='api'))
+
+def test_parse_rates():
+  assert parse_rates('api:2:5, db:0.5') == {'api': (2.0, 5), 'db': (0.5, 1)}
+  with pytest.raises(ValueError):
+    parse_rates('api')
+
+def test_token_bucket_burst():
+  bucket = TokenBucket(0.5, 3)
+  for _ in range(3):
+    assert bucket.available()
+    bucket.take()
+  assert not bucket.available() and 1.5 < bucket.next_time() - bucket._last <= 2.0
+
+def test_launch_rates_per_pool():
+  rates = LaunchRates(pool_rates={'api': (0.1, 1)})
+  api, other = make_node(1, pool='api'), make_node(2)
+  assert rates.has_capacity() and rates.fits(api)
+  rates.acquire(api)
+  assert not rates.fits(make_node(3, pool='api')) and rates.fits(other) and rates.next_time()
+
+def adaptive(samples, **kwargs):
+  controller = AdaptiveConcurrency(1, 8, interval=0, sampler=lambda: samples.pop(0), **kwargs)
+  controller.cpus, controller.limit = 4, 4
+  return controller
+
+def test_adaptive_grows_with_headroom():
+  idle = {'load': 0.4, 'mem_pct': 80.0, 'cpu_psi': 0.0, 'mem_psi': 0.0}
+  controller = adaptive([idle, idle, idle])
+  assert controller.update(4) and controller.limit == 5
+  assert controller.update(2) is None and controller.limit == 5
+  controller.update(5)
+  assert controller.limit == 6 and len(controller.adjustments) == 2
+
+def test_adaptive_backs_off():
+  controller = adaptive([{'load': 8.0, 'mem_pct': 80.0}, {'load': 1.0, 'mem_pct': 5.0}, {'load': 1.0, 'mem_pct': 5.0}])
+  assert 'load/cpu' in controller.update(4) and controller.limit == 2
+  assert 'mem available' in controller.update(2) and controller.limit == 1
+  assert controller.update(1) is None and controller.limit == 1
+
+def test_adaptive_hysteresis():
+  # Between the headroom and overload thresholds the limit does not move
+  controller = adaptive([{'load': 3.6, 'mem_pct': 80.0, 'cpu_psi': None, 'mem_psi': None}])
+  assert controller.update(4) is None and controller.limit == 4
@@ -0,0 +1,113 @@
+# Copyright 2019 Comcast Cable Communications Management, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import pytest
+
+from pyrunner.core.engine import ExecutionEngine
+from pyrunner.core.register import NodeRegister
+from pyrunner.core.node import ExecutionNode
+from pyrunner.executor import RemoteExecutor, parse_agents
+from pyrunner.executor.agent import Agent
+
+worker_dir = '{}/python'.format(os.path.dirname(os.path.realpath(__file__)))
+authkey = b'test-secret'
+
+@pytest.fixture
+def agents():
+  agents = [ Agent(('localhost', 0), slots, authkey, worker_dir).start() for slots in [1, 2] ]
+  yield agents
+  for agent in agents:
+    agent.shutdown()
+
+@pytest.fixture
+def engine(agents):
+  engine = ExecutionEngine()
+  engine.register = NodeRegister()
+  engine.config['tickrate'] = 0
+  engine.config['worker_dir'] = worker_dir
+  engine.config['executor'] = 'remote'
+  engine.config['agents'] = ','.join([ '{}:{}:{}'.format(a.address[0], a.address[1], a.slots) for a in agents ])
+  engine.config['agent_authkey'] = authkey.decode()
+  return engine
+
+def test_parse_agents():
+  assert parse_agents('a:7100:4, b:7101') == [('a', 7100, 4), ('b', 7101, 1)]
+  with pytest.raises(ValueError):
+    parse_agents('a')
+
+@pytest.mark.parametrize('worker, exp_retcode', [
+  ('SayHello', 0),
+  ('FailMe', 1),
+  ('ThrowError', 903)
+])
+def test_remote_return_code(agents, tmp_path, worker, exp_retcode):
+  node = ExecutionNode(1)
+  node.name = 'Test'
+  node.module = 'sample'
+  node.worker = worker
+  node.logfile = str(tmp_path / 'remote.log')
+  node.execute(RemoteExecutor(None, [ (a.address[0], a.address[1], a.slots) for a in agents ], authkey))
+  assert node.poll(True) == exp_retcode
+  assert 'LOG END' in (tmp_path / 'remote.log').read_text()
+
+def test_remote_bad_authkey(agents):
+  node = ExecutionNode(1)
+  node.name = 'Test'
+  node.module = 'sample'
+  node.worker = 'SayHello'
+  node.execute(RemoteExecutor(None, [ (agents[0].address[0], agents[0].address[1], 1) ], b'wrong'))
+  assert node.poll(True) == 905
+
+def test_engine_remote_executor(engine, agents, tmp_path):
+  engine.context.set('seed', 41)
+  for i in range(6):
+    engine.register.add_node(name='Hello {}'.format(i), logfile=str(tmp_path / 'hello_{}.log'.format(i)), module='sample', worker='SayHello')
+  engine.register.add_node(name='Set Context', logfile=None, module='sample', worker='SetContext', argv=['answer'], dependencies=['Hello 0'])
+  engine.register.add_node(name='Fail Me', logfile=None, module='sample', worker='FailMe')
+  assert engine.initiate(silent=True) == 1 and len(engine.register.completed_nodes) == 7
+  assert engine.context.get('answer') == 42
+  for i in range(6):
+    assert 'Hello World!' in (tmp_path / 'hello_{}.log'.format(i)).read_text()
+
+def test_engine_remote_spawn_tasks(engine, tmp_path):
+  engine.register.add_node(name='Spawner', logfile=str(tmp_path / 'spawner.log'), module='sample', worker='SpawnPartitions', argv=['3'])
+  engine.register.add_node(name='Downstream', logfile=str(tmp_path / 'downstream.log'), module='sample', worker='SayHello', dependencies=['Spawner'])
+  res = engine.initiate(silent=True)
+  join = engine.register.find_node(name='Partitions Joined')
+  downstream = engine.register.find_node(name='Downstream')
+  assert res == 0 and len(engine.register.completed_nodes) == 6
+  assert all(engine.register.find_node(name='Partition {}'.format(i))._end_time <= join._start_time for i in range(3))
+  assert join._end_time <= downstream._start_time
+
+def test_remote_timeout(agents):
+  node = ExecutionNode(1)
+  node.name = 'Test'
+  node.module = 'sample'
+  node.worker = 'RunUntilCancelled'
+  node.as_service = True
+  node.timeout = 1
+  node.execute(RemoteExecutor(None, [ (a.address[0], a.address[1], a.slots) for a in agents ], authkey))
+  retcode = None
+  while retcode is None:
+    retcode = node.poll()
+  assert retcode == 907
+
+def test_engine_remote_requires_agents(engine):
+  engine.config['agents'] = None
+  engine.register.add_node(name='Hello', logfile=None, module='sample', worker='SayHello')
+  with pytest.raises(ValueError):
+    engine.initiate(silent=True)
@@ -0,0 +1,104 @@
+# Copyright 2019 Comcast Cable Communications Management, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import sys
+import pytest
+
+from pyrunner.core.cache import ResultCache
+from pyrunner.core.engine import ExecutionEngine
+from pyrunner.core.register import NodeRegister
+from pyrunner.core.node import ExecutionNode
+
+worker_dir = '{}/python'.format(os.path.dirname(os.path.realpath(__file__)))
+if worker_dir not in sys.path:
+  sys.path.append(worker_dir)
+
+@pytest.fixture
+def node():
+  node = ExecutionNode(1)
+  node.name = 'Test'
+  node.module = 'sample'
+  node.worker = 'SayHello'
+  return node
+
+def run_engine(cache_dir, tmp_path, worker='SetContext'):
+  engine = ExecutionEngine()
+  engine.register = NodeRegister()
+  engine.config['tickrate'] = 0
+  engine.config['worker_dir'] = worker_dir
+  engine.config['cache_dir'] = str(cache_dir)
+  engine.context.set('seed', 1)
+  engine.register.add_node(name='Set Context', logfile=str(tmp_path / 'set.log'), module='sample', worker=worker, argv=['answer'], cache=True, cache_keys=['seed'])
+  engine.register.add_node(name='Say Hello', logfile=str(tmp_path / 'hello.log'), module='sample', worker='SayHello', dependencies=['Set Context'])
+  assert engine.initiate(silent=True) == 0
+  return engine
+
+def test_cache_key(node, tmp_path):
+  cache = ResultCache(str(tmp_path / 'cache'))
+  data = tmp_path / 'data.csv'
+  data.write_text('a')
+  node.inputs = str(tmp_path / '*.csv')
+  node.cache_keys = 'x'
+  
+  key = cache.key(node, { 'x': 1 })
+  assert cache.key(node, { 'x': 1 }) == key
+  assert cache.key(node, { 'x': 2 }) != key
+  data.write_text('b')
+  assert cache.key(node, { 'x': 1 }) != key
+  node.argv = ['other']
+  assert cache.key(node, { 'x': 1 }) != key
+
+def test_cache_store_lookup(tmp_path):
+  cache = ResultCache(str(tmp_path))
+  assert cache.lookup('abc') is None
+  cache.store('abc', { 'k': [1, 2] })
+  assert cache.lookup('abc') == { 'k': [1, 2] } and (cache.hits, cache.misses) == (1, 1)
+
+def test_cache_eviction(tmp_path):
+  cache = ResultCache(str(tmp_path), max_mb=1)
+  for i in range(2):
+    cache.store(str(i), { 'blob': os.urandom(400 * 1024) })
+    os.utime(os.path.join(str(tmp_path), '{}.result'.format(i)), (i, i))
+  cache.lookup('0')
+  cache.store('2', { 'blob': os.urandom(400 * 1024) })
+  assert sorted(os.listdir(str(tmp_path))) == ['0.result', '2.result']
+
+def test_engine_cache_hit(tmp_path):
+  cache_dir = tmp_path / 'cache'
+  first = run_engine(cache_dir, tmp_path)
+  assert first.context.get('answer') == 2 and (first.cache.hits, first.cache.misses) == (0, 1)
+  
+  second = run_engine(cache_dir, tmp_path)
+  assert second.context.get('answer') == 2 and (second.cache.hits, second.cache.misses) == (1, 0)
+  assert 'restored result' in (tmp_path / 'set.log').read_text()
+  assert len(second.register.completed_nodes) == 2
+
+def test_engine_cache_hit_async(tmp_path):
+  cache_dir = tmp_path / 'cache'
+  first = run_engine(cache_dir, tmp_path, 'AsyncSetContext')
+  assert first.context.get('answer') == 2 and (first.cache.hits, first.cache.misses) == (0, 1)
+  
+  # The cached result holds the key set through async_context
+  second = run_engine(cache_dir, tmp_path, 'AsyncSetContext')
+  assert second.context.get('answer') == 2 and (second.cache.hits, second.cache.misses) == (1, 0)
+
+def test_async_worker_tracks_written():
+  import sample
+  from pyrunner.core.context import Context
+  worker = sample.AsyncSetContext(Context(dict(), None), None, ['answer'], False)
+  worker.protected_run()
+  assert worker.context.written == { 'answer' } and worker.context.get('answer') == 1
@@ -16,18 +16,32 @@
 
 import pytest
 import os
+import threading
 
-from pyrunner.core.context import Context
-from multiprocessing import Manager
+from pyrunner.core.context import Context, ContextJournal
+from pyrunner.core.shmdict import SharedMemoryDict, shared_memory
+from pyrunner.core.filelock import FileLock
+from pyrunner.backend import ContextManager, SqliteBackend, SqliteDict
+from multiprocessing import get_context
 from datetime import datetime
 
 abs_dir_path = os.path.dirname(os.path.realpath(__file__))
 
-@pytest.fixture
-def ctx():
+requires_shm = pytest.mark.skipif(shared_memory is None, reason='The shared-memory Context requires Python 3.8 or later')
+
+@pytest.fixture(params=['manager', pytest.param('shm', marks=requires_shm), 'sqlite'])
+def ctx(request, tmp_path):
   '''Returns an empty Context object with loaded profile'''
-  manager = Manager()
-  return Context(manager.dict(), manager.Queue())
+  manager = ContextManager()
+  manager.start()
+  request.addfinalizer(manager.shutdown)
+  if request.param == 'manager':
+    return Context(manager.ContextDict(), manager.Queue())
+  if request.param == 'sqlite':
+    return Context(SqliteDict(str(tmp_path / 'ctx.db')), manager.Queue())
+  store = SharedMemoryDict(64, 256)
+  request.addfinalizer(store.close)
+  return Context(store, manager.Queue())
 
 @pytest.mark.parametrize('key, value', [
   ('A', 1),
@@ -77,4 +91,207 @@ def test_emulate_delitem(ctx):
 
 def test_emulate_delitem_keyerror(ctx):
   with pytest.raises(KeyError):
-    del ctx['myvar']
\ No newline at end of file
+    del ctx['myvar']
+
+def set_in_child(store, key, value):
+  store[key] = value
+
+@pytest.fixture
+def shm():
+  store = SharedMemoryDict(16, 64)
+  yield store
+  store.close()
+
+@requires_shm
+def test_shm_types(shm):
+  values = { 'none': None, 'bool': False, 'int': -42, 'big': 2**70, 'float': 1.5, 'str': 'héllo', 'bytes': b'\x00\x01', 'list': [1, 'a'] }
+  shm.update(values)
+  assert shm.copy() == values and all(type(shm[k]) is type(v) for k,v in values.items())
+
+@requires_shm
+def test_shm_delete_and_reuse(shm):
+  for i in range(16):
+    shm['key{}'.format(i)] = i
+  with pytest.raises(RuntimeError):
+    shm['one too many'] = 1
+  del shm['key3']
+  shm['one too many'] = 1
+  assert len(shm) == 16 and 'key3' not in shm and shm['key15'] == 15
+
+@requires_shm
+def test_shm_value_too_large(shm):
+  with pytest.raises(ValueError):
+    shm['big'] = 'x' * 64
+
+@requires_shm
+@pytest.mark.parametrize('method', ['fork', 'spawn'])
+def test_shm_shared_with_processes(shm, method):
+  proc = get_context(method).Process(target=set_in_child, args=(shm, 'from_child', method))
+  proc.start()
+  proc.join()
+  assert proc.exitcode == 0 and shm.get('from_child') == method
+
+@pytest.mark.parametrize('method', ['fork', 'spawn'])
+def test_sqlite_shared_with_processes(tmp_path, method):
+  store = SqliteDict(str(tmp_path / 'ctx.db'))
+  store['parent'] = [1, 2]
+  proc = get_context(method).Process(target=set_in_child, args=(store, 'from_child', method))
+  proc.start()
+  proc.join()
+  assert proc.exitcode == 0 and store.copy() == { 'parent': [1, 2], 'from_child': method }
+
+def test_sqlite_backend_persists(tmp_path):
+  path = str(tmp_path / 'ctx.db')
+  backend = SqliteBackend(path).start()
+  backend.store.update({ 'a': 1, 'b': 2 })
+  del backend.store['b']
+  backend.close()
+  assert SqliteBackend(path).start().store.copy() == { 'a': 1 }
+  assert len(SqliteBackend(path, reset=True).start().store) == 0
+
+def die_writing(store, key, value):
+  import os
+  import pyrunner.core.shmdict as shmdict
+  # Dies between marking the slot as being written and marking it as written
+  class DyingHeader:
+    size = shmdict.SLOT_HEADER.size
+    unpack_from = shmdict.SLOT_HEADER.unpack_from
+    def pack_into(self, *args):
+      os._exit(1)
+  shmdict.SLOT_HEADER = DyingHeader()
+  store[key] = value
+
+@requires_shm
+def test_shm_writer_dies(shm):
+  shm['kept'] = 1
+  shm['torn'] = 'old'
+  proc = get_context('spawn').Process(target=die_writing, args=(shm, 'torn', 'new'))
+  proc.start()
+  proc.join()
+  assert proc.exitcode == 1
+  # The half-written key is dropped, and the lock left by the writer released
+  assert shm.get('torn') is None and shm.copy() == { 'kept': 1 }
+  shm['torn'] = 'again'
+  assert shm['torn'] == 'again'
+
+def test_get_many_set_many_snapshot(ctx):
+  ctx.set_many({ 'a': 1, 'b': 'two' })
+  assert ctx.get_many(['a', 'b', 'c'], 0) == { 'a': 1, 'b': 'two', 'c': 0 }
+  assert ctx.snapshot() == { 'a': 1, 'b': 'two' }
+
+def test_get_many_fetches_only_keys(ctx, monkeypatch):
+  ctx.set_many({ 'a': 1, 'b': 2, 'c': 3 })
+  def copy(self):
+    raise AssertionError('get_many copied the whole Context')
+  monkeypatch.setattr(type(ctx.shared_dict), 'copy', copy)
+  assert ctx.get_many(['a', 'c', 'd']) == { 'a': 1, 'c': 3, 'd': None }
+
+def set_through_context(context, key, value):
+  context.set(key, value)
+
+def test_read_cache(ctx):
+  ctx.version = get_context('spawn').Value('Q', 0)
+  ctx.read_cache = True
+  ctx.set('a', 1)
+  assert ctx.get('a') == 1
+  # Changes which do not go through a Context leave the version, and cache, as is
+  ctx.shared_dict['a'] = 2
+  assert ctx.get('a') == 1 and ctx['a'] == 1
+  proc = get_context('spawn').Process(target=set_through_context, args=(ctx, 'b', 3))
+  proc.start()
+  proc.join()
+  assert ctx.version.value == 2 and ctx.get_many(['a', 'b']) == { 'a': 2, 'b': 3 }
+  # A stale cache is not refreshed by get_many, which only fetches its keys
+  assert ctx._cache_version == 1
+
+def test_buffers(ctx, tmp_path):
+  import array
+  ctx.buffer_dir = str(tmp_path)
+  ctx.put_buffer('floats', array.array('d', [1.0, 2.5]))
+  ctx.put_buffer('empty', b'')
+  view = ctx.get_buffer('floats')
+  assert view.readonly and view.tolist() == [1.0, 2.5] and ctx.get_buffer('empty').nbytes == 0
+  with pytest.raises(KeyError):
+    ctx.get_buffer('missing')
+
+def set_later(context, key, value, delay):
+  import time
+  time.sleep(delay)
+  context.set(key, value)
+
+@pytest.fixture
+def notifying(ctx, tmp_path):
+  ctx.version, ctx.lock = get_context('spawn').RawValue('Q', 0), FileLock(str(tmp_path / 'ctx.lock'))
+  return ctx
+
+def test_wait_for(notifying):
+  proc = get_context('spawn').Process(target=set_later, args=(notifying, 'ready', 'yes', 0.2))
+  proc.start()
+  assert notifying.wait_for('ready', 30) == 'yes'
+  proc.join()
+  with pytest.raises(TimeoutError):
+    notifying.wait_for('never', 0.1)
+
+def test_wait_for_without_version(ctx):
+  import time
+  ctx.set('ready', 1)
+  assert ctx.wait_for('ready', 0) == 1
+  with pytest.raises(TimeoutError):
+    ctx.wait_for('never', 0.2)
+  # Without a version, the key is still polled every 50 ms at most
+  thread = threading.Thread(target=set_later, args=(ctx, 'later', 2, 0.2))
+  start = time.time()
+  thread.start()
+  assert ctx.wait_for('later', 30) == 2 and time.time() - start < 0.2 + 0.15
+  thread.join()
+
+def test_watch(notifying):
+  notifying.set('part.1', 'a')
+  notifying.set('other', 'x')
+  proc = get_context('spawn').Process(target=set_later, args=(notifying, 'part.2', 'b', 0.2))
+  proc.start()
+  assert list(notifying.watch('part.', timeout=1)) == [('part.1', 'a'), ('part.2', 'b')]
+  proc.join()
+
+def test_journal(notifying, tmp_path):
+  ctx = notifying
+  ctx.journal = ContextJournal(str(tmp_path / 'app.journal'))
+  ctx.set('a', 1)
+  ctx.set_many({ 'b': [2], 'c': 3 })
+  del ctx['c']
+  ctx['a'] = 4
+  restored = {}
+  assert ctx.journal.replay(restored) == 4 and ctx.journal.last_seq == 4
+  assert restored == { 'a': 4, 'b': [2] }
+  # Records are applied in sequence order, after that of a snapshot
+  ctx.journal.append(2, 'set', 'a', 'late')
+  restored = {}
+  assert ctx.journal.replay(restored, 1) == 4 and restored == { 'a': 4, 'b': [2] }
+  # A record cut short by a crash is ignored
+  with open(ctx.journal.path, 'ab') as f:
+    f.write(ContextJournal.HEADER.pack(100) + b'\x80')
+  assert ctx.journal.replay({}) == 5
+  ctx.journal.truncate()
+  assert ctx.journal.size() == 0
+  assert ctx.journal.replay({}) == 0
+
+def set_forever(context, key):
+  i = 0
+  while True:
+    context.set(key, i)
+    i += 1
+
+def test_terminated_writer(notifying, tmp_path):
+  notifying.journal = ContextJournal(str(tmp_path / 'app.journal'))
+  for _ in range(5):
+    proc = get_context('spawn').Process(target=set_forever, args=(notifying, 'busy'))
+    proc.start()
+    notifying.wait_for('busy', 30)
+    proc.terminate()
+    proc.join()
+    # Writes go on after a writer is terminated mid-write
+    writer = threading.Thread(target=notifying.set, args=('after', 1), daemon=True)
+    writer.start()
+    writer.join(10)
+    assert not writer.is_alive()
+  assert notifying.get('after') == 1
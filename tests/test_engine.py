@@ -18,8 +18,11 @@ import os
 import pytest
 
 from pyrunner.core.engine import ExecutionEngine
+from pyrunner.core.admission import AdaptiveConcurrency
 from pyrunner.core.register import NodeRegister
 from pyrunner.serde import ListSerDe
+from pyrunner.backend import SqliteDict
+from pyrunner.core.shmdict import shared_memory
 
 @pytest.fixture
 def engine():
@@ -42,4 +45,177 @@ def test_engine_failure(engine):
   engine.register.add_node(name='Fail Me 2', logfile=None, module='sample', worker='FailMe', dependencies=['Say Hello'])
   engine.register.add_node(name='Fail Me 3', logfile=None, module='sample', worker='FailMe', dependencies=['Fail Me 2'])
   res = engine.initiate(silent=True)
-  assert res == 2
\ No newline at end of file
+  assert res == 2
+
+def test_engine_event_driven(engine):
+  engine.config['event_driven'] = True
+  engine.register.add_node(name='Say Hello 1', logfile=None, module='sample', worker='SayHello')
+  engine.register.add_node(name='Say Hello 2', logfile=None, module='sample', worker='SayHello', dependencies=['Say Hello 1'])
+  engine.register.add_node(name='Fail Me 1', logfile=None, module='sample', worker='FailMe', dependencies=['Say Hello 2'])
+  res = engine.initiate(silent=True)
+  assert res == 1 and len(engine.register.completed_nodes) == 2
+
+def test_engine_resource_budget(engine):
+  engine.config['max_cpus'] = 2
+  engine.register.add_node(name='Big 1', logfile=None, module='sample', worker='SayHello', cpus=2)
+  engine.register.add_node(name='Big 2', logfile=None, module='sample', worker='SayHello', cpus=2)
+  engine.register.add_node(name='Big 3', logfile=None, module='sample', worker='SayHello', cpus=2)
+  res = engine.initiate(silent=True)
+  nodes = sorted(engine.register.completed_nodes, key=lambda n: n._start_time)
+  assert res == 0 and all(a._end_time <= b._start_time for a,b in zip(nodes, nodes[1:]))
+
+def test_engine_pools(engine):
+  engine.config['pools'] = 'db:1'
+  for i in range(3):
+    engine.register.add_node(name='DB {}'.format(i), logfile=None, module='sample', worker='SayHello', pool='db')
+  engine.register.add_node(name='Other', logfile=None, module='sample', worker='SayHello')
+  res = engine.initiate(silent=True)
+  nodes = sorted([ n for n in engine.register.completed_nodes if n.pool == 'db' ], key=lambda n: n._start_time)
+  assert res == 0 and engine.pools.waited['db'] == 2 and all(a._end_time <= b._start_time for a,b in zip(nodes, nodes[1:]))
+
+def test_engine_launch_rate(engine):
+  engine.config['launch_rate'] = 5
+  engine.config['launch_burst'] = 2
+  for i in range(4):
+    engine.register.add_node(name='Task {}'.format(i), logfile=None, module='sample', worker='SayHello')
+  res = engine.initiate(silent=True)
+  starts = sorted([ n._start_time for n in engine.register.completed_nodes ])
+  assert res == 0 and starts[1] - starts[0] < 0.1 and starts[3] - starts[0] >= 0.35
+
+def test_engine_adaptive(engine):
+  engine.config['adaptive'] = True
+  engine.config['max_procs'] = 2
+  for i in range(3):
+    engine.register.add_node(name='Task {}'.format(i), logfile=None, module='sample', worker='SayHello')
+  res = engine.initiate(silent=True)
+  assert res == 0 and 1 <= engine.adaptive.limit <= 2
+
+def test_engine_adaptive_silent(engine, capsys, monkeypatch):
+  monkeypatch.setattr(AdaptiveConcurrency, 'update', lambda self, running: 'Concurrency limit adjusted')
+  engine.config['adaptive'] = True
+  engine.register.add_node(name='Task', logfile=None, module='sample', worker='SayHello')
+  assert engine.initiate(silent=True) == 0 and 'adjusted' not in capsys.readouterr().out
+
+def test_engine_subdag(engine):
+  subdag = '{}/config/subdag.lst'.format(os.path.dirname(os.path.realpath(__file__)))
+  engine.config['max_procs'] = 1
+  engine.register.add_node(name='Before', logfile=None, module='sample', worker='SayHello')
+  engine.register.add_node(name='Pipeline', logfile=None, subdag=subdag, dependencies=['Before'])
+  engine.register.add_node(name='After', logfile=None, module='sample', worker='SayHello', dependencies=['Pipeline'])
+  res = engine.initiate(silent=True)
+  nodes = { n.name:n for n in engine.register.completed_nodes }
+  assert res == 0 and len(nodes) == 6
+  assert nodes['Before']._end_time <= nodes['Pipeline/Extract']._start_time
+  assert nodes['Pipeline/Load A']._end_time <= nodes['After']._start_time
+  assert nodes['Pipeline/Load B']._end_time <= nodes['After']._start_time
+
+def test_engine_subdag_failure(engine, tmp_path):
+  subdag = tmp_path / 'failing.lst'
+  subdag.write_text('#PYTHON\n\n1|-1|1|0|Fail|sample|FailMe||\n')
+  engine.register.add_node(name='Pipeline', logfile=str(tmp_path / 'pipeline.log'), subdag=str(subdag))
+  engine.register.add_node(name='After', logfile=None, module='sample', worker='SayHello', dependencies=['Pipeline'])
+  res = engine.initiate(silent=True)
+  assert res == 2 and sorted([ n.name for n in engine.register.failed_nodes ]) == ['Pipeline', 'Pipeline/Fail']
+  assert [ n.name for n in engine.register.defaulted_nodes ] == ['After']
+
+def test_engine_speculative(engine, tmp_path):
+  logfile = str(tmp_path / 'straggler.log')
+  engine.config['event_driven'] = True
+  engine.register.add_node(name='Straggler', logfile=logfile, module='sample', worker='HangOnce', argv=[str(tmp_path / 'marker')], speculative=True)
+  for _ in range(3):
+    engine.history.record('Straggler', 0.2)
+  res = engine.initiate(silent=True)
+  node = engine.register.find_node(name='Straggler')
+  assert res == 0 and node.winning_attempt == 2 and node.get_elapsed_seconds() < 10
+  with open(logfile) as f:
+    log = f.read()
+  assert 'SPECULATIVE ATTEMPT 2 (WINNER)' in log and 'Finished without hanging' in log
+  assert not os.path.exists(logfile + '.attempt2')
+
+def test_engine_speculative_no_free_slot(engine, tmp_path):
+  logfile = str(tmp_path / 'straggler.log')
+  engine.config['executor'] = 'pool'
+  engine.config['pool_size'] = 1
+  engine.register.add_node(name='Straggler', logfile=logfile, module='sample', worker='HangOnce', argv=[str(tmp_path / 'marker')], speculative=True, timeout=1)
+  for _ in range(3):
+    engine.history.record('Straggler', 0.2)
+  res = engine.initiate(silent=True)
+  # With the only pooled process busy, no second attempt is launched
+  assert res == 1 and engine.register.find_node(name='Straggler').winning_attempt is None
+  assert not os.path.exists(logfile + '.attempt2')
+
+def test_engine_fail_fast(engine, tmp_path):
+  engine.register.add_node(name='Critical', logfile=str(tmp_path / 'critical.log'), module='sample', worker='FailMe', critical=True)
+  engine.register.add_node(name='Slow', logfile=str(tmp_path / 'slow.log'), module='sample', worker='HangOnce', argv=[str(tmp_path / 'marker')])
+  engine.register.add_node(name='After Slow', logfile=str(tmp_path / 'after_slow.log'), module='sample', worker='SayHello', dependencies=['Slow'])
+  res = engine.initiate(silent=True)
+  assert res == 1 and engine.register.find_node(name='Slow') in engine.register.aborted_nodes
+  assert [ n.name for n in engine.register.halted_nodes ] == ['After Slow']
+  assert ListSerDe().serialize(engine.register).splitlines()[-1].split('|')[4] == 'P'
+
+@pytest.mark.skipif(shared_memory is None, reason='The shared-memory Context requires Python 3.8 or later')
+@pytest.mark.parametrize('executor, start_method', [('process', 'fork'), ('process', 'spawn'), ('pool', 'forkserver'), ('thread', 'fork')])
+def test_engine_shm_context(engine, executor, start_method):
+  engine.config['context_backend'] = 'shm'
+  engine.config['executor'] = executor
+  engine.config['start_method'] = start_method
+  engine.context.set('seed', 41)
+  engine.register.add_node(name='Set', logfile=None, module='sample', worker='SetContext', argv=['answer'])
+  res = engine.initiate(silent=True)
+  assert res == 0 and engine.context.get('answer') == 42 and engine._shared_dict.get('answer') == 42
+
+@pytest.mark.parametrize('executor, start_method', [('process', 'fork'), ('process', 'spawn'), ('thread', 'fork')])
+def test_engine_sqlite_context(engine, tmp_path, executor, start_method):
+  engine.config['temp_dir'] = str(tmp_path)
+  engine.config['app_name'] = 'sqlite'
+  engine.config['context_backend'] = 'sqlite'
+  engine.config['executor'] = executor
+  engine.config['start_method'] = start_method
+  engine.context.set('seed', 41)
+  engine.register.add_node(name='Set', logfile=None, module='sample', worker='SetContext', argv=['answer'])
+  res = engine.initiate(silent=True)
+  assert res == 0 and engine.context.get('answer') == 42 and 'answer' not in engine._shared_dict
+  assert SqliteDict(engine.config.ctx_db_file).copy() == { 'seed': 41, 'answer': 42 }
+
+def test_engine_buffers(engine, tmp_path):
+  engine.config['temp_dir'] = str(tmp_path)
+  engine.config['app_name'] = 'buffers'
+  engine.register.add_node(name='Put', logfile=None, module='sample', worker='PutBuffer', argv=['blob', 'hello'])
+  engine.register.add_node(name='Read', logfile=None, module='sample', worker='ReadBuffer', argv=['blob'], dependencies=['Put'])
+  engine.register.add_node(name='Check', logfile=None, module='sample', worker='CheckGone', argv=['blob'], dependencies=['Read'])
+  res = engine.initiate(silent=True)
+  # The buffer stays readable to the last descendant of its producer
+  assert res == 0 and engine.context.get('blob_value') == 'hello' and engine.context.get('gone') is False
+  assert not (tmp_path / 'buffers.buffers').exists()
+
+def test_engine_buffers_grandchild(engine, tmp_path):
+  engine.config['temp_dir'] = str(tmp_path)
+  engine.config['app_name'] = 'buffers'
+  engine.register.add_node(name='Put', logfile=None, module='sample', worker='PutBuffer', argv=['blob', 'hello'])
+  engine.register.add_node(name='Hello', logfile=None, module='sample', worker='SayHello', dependencies=['Put'])
+  engine.register.add_node(name='Read', logfile=None, module='sample', worker='ReadBuffer', argv=['blob'], dependencies=['Hello'])
+  res = engine.initiate(silent=True)
+  assert res == 0 and engine.context.get('blob_value') == 'hello'
+  assert not (tmp_path / 'buffers.buffers').exists()
+
+def test_engine_wait_for_sibling(engine):
+  engine.register.add_node(name='Wait', logfile=None, module='sample', worker='WaitFor', argv=['answer'])
+  engine.register.add_node(name='Set', logfile=None, module='sample', worker='SetContext', argv=['answer'])
+  res = engine.initiate(silent=True)
+  assert res == 0 and engine.context.get('waited') == 1
+
+def test_engine_spawn_tasks(engine, tmp_path):
+  engine.register.add_node(name='Spawner', logfile=str(tmp_path / 'spawner.log'), module='sample', worker='SpawnPartitions', argv=['3'])
+  engine.register.add_node(name='Downstream', logfile=str(tmp_path / 'downstream.log'), module='sample', worker='SayHello', dependencies=['Spawner'])
+  res = engine.initiate(silent=True)
+  join = engine.register.find_node(name='Partitions Joined')
+  downstream = engine.register.find_node(name='Downstream')
+  assert res == 0 and len(engine.register.completed_nodes) == 6
+  assert all(engine.register.find_node(name='Partition {}'.format(i))._end_time <= join._start_time for i in range(3))
+  assert join._end_time <= downstream._start_time
+  assert 'Hello World!' in (tmp_path / 'partition_0.log').read_text()
+  
+  ctllog = tmp_path / 'spawn.ctllog'
+  ListSerDe().save_to_file(str(ctllog), engine.register)
+  restored = ListSerDe().deserialize(str(ctllog), True)
+  assert set([ p.name for p in restored.find_node(name='Downstream').parent_nodes ]) == {'Spawner', 'Partitions Joined'}
@@ -0,0 +1,298 @@
+# Copyright 2019 Comcast Cable Communications Management, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import sys
+import time
+import asyncio
+import pytest
+
+from pyrunner.core.engine import ExecutionEngine
+from pyrunner.core.register import NodeRegister
+from pyrunner.core.node import ExecutionNode
+from pyrunner.core.context import Context, AsyncContext
+from pyrunner.executor import ProcessExecutor, PoolExecutor, ThreadExecutor, AsyncExecutor
+
+worker_dir = '{}/python'.format(os.path.dirname(os.path.realpath(__file__)))
+if worker_dir not in sys.path:
+  sys.path.append(worker_dir)
+
+@pytest.fixture
+def engine():
+  engine = ExecutionEngine()
+  engine.register = NodeRegister()
+  engine.config['tickrate'] = 0
+  engine.config['worker_dir'] = worker_dir
+  return engine
+
+@pytest.fixture
+def node():
+  node = ExecutionNode(1)
+  node.name = 'Test'
+  return node
+
+@pytest.mark.parametrize('module, worker, exp_retcode', [
+  ('sample', 'SayHello', 0),
+  ('sample', 'FailMe', 1),
+  ('sample', 'ThrowError', 903),
+  ('exceptions', 'ThrowValueError', 905)
+])
+def test_pool_return_code(node, module, worker, exp_retcode):
+  node.module = module
+  node.worker = worker
+  pool = PoolExecutor(None).start()
+  try:
+    node.execute(pool)
+    assert node.poll(True) == exp_retcode
+  finally:
+    pool.shutdown()
+
+def test_pool_reuses_process(node):
+  node.module = 'sample'
+  node.worker = 'SayHello'
+  pool = PoolExecutor(None).start()
+  try:
+    pids = set()
+    for _ in range(3):
+      node.execute(pool)
+      pids.add(pool._busy.copy().pop().proc.pid)
+      node.poll(True)
+    assert len(pids) == 1
+  finally:
+    pool.shutdown()
+
+def test_pool_recycles_process(node):
+  node.module = 'sample'
+  node.worker = 'SayHello'
+  pool = PoolExecutor(None, 1, 2).start()
+  try:
+    pids = []
+    for _ in range(4):
+      node.execute(pool)
+      pids.append(pool._busy.copy().pop().proc.pid)
+      node.poll(True)
+    assert pids[0] == pids[1] and pids[1] != pids[2] and pids[2] == pids[3]
+  finally:
+    pool.shutdown()
+
+def test_pool_size_is_a_cap(node, tmp_path):
+  node.module = 'sample'
+  node.worker = 'HangOnce'
+  node.argv = [str(tmp_path / 'marker')]
+  pool = PoolExecutor(None, 1).start()
+  try:
+    node.execute(pool)
+    slot = pool._busy.copy().pop()
+    assert not pool.fits(node)
+    with pytest.raises(RuntimeError):
+      pool.submit(node)
+    pool.shutdown()
+    assert not slot.proc.is_alive() and not pool._busy and not pool._idle
+  finally:
+    pool.shutdown()
+
+def test_engine_pool_executor(engine):
+  engine.config['executor'] = 'pool'
+  engine.config['pool_size'] = 2
+  engine.register.add_node(name='Say Hello 1', logfile=None, module='sample', worker='SayHello')
+  engine.register.add_node(name='Say Hello 2', logfile=None, module='sample', worker='SayHello')
+  engine.register.add_node(name='Say Hello 3', logfile=None, module='sample', worker='SayHello', dependencies=['Say Hello 1'])
+  engine.register.add_node(name='Fail Me 1', logfile=None, module='sample', worker='FailMe', dependencies=['Say Hello 2'])
+  assert engine.initiate(silent=True) == 1 and len(engine.register.completed_nodes) == 3 and not engine.executors
+
+@pytest.mark.parametrize('module, worker, exp_retcode', [
+  ('sample', 'SayHello', 0),
+  ('sample', 'FailMe', 1),
+  ('sample', 'ThrowError', 903)
+])
+def test_thread_return_code(node, module, worker, exp_retcode):
+  node.module = module
+  node.worker = worker
+  threads = ThreadExecutor().start()
+  try:
+    node.execute(threads)
+    assert node.poll(True) == exp_retcode
+  finally:
+    threads.shutdown()
+
+def test_thread_output_goes_to_own_logfile(tmp_path, capsys):
+  threads = ThreadExecutor(2).start()
+  nodes = []
+  try:
+    for i in range(2):
+      node = ExecutionNode(i + 1)
+      node.name = 'Print {}'.format(i)
+      node.module = 'sample'
+      node.worker = 'PrintArgs'
+      node.argv = ['node-{}'.format(i)]
+      node.logfile = str(tmp_path / 'node_{}.log'.format(i))
+      node.execute(threads)
+      nodes.append(node)
+    assert [ n.poll(True) for n in nodes ] == [0, 0]
+  finally:
+    threads.shutdown()
+  for i in range(2):
+    text = (tmp_path / 'node_{}.log'.format(i)).read_text()
+    assert 'Printed by node-{}'.format(i) in text and 'node-{}'.format(1 - i) not in text
+  assert 'Printed by' not in capsys.readouterr().out
+
+def test_thread_timeout_cancels_worker(node):
+  node.module = 'sample'
+  node.worker = 'RunUntilCancelled'
+  node.as_service = True
+  node.timeout = 1
+  threads = ThreadExecutor().start()
+  try:
+    node.execute(threads)
+    handle = node._proc
+    retcode = None
+    while retcode is None:
+      retcode = node.poll()
+    assert retcode == 907
+    handle._future.result(timeout=5)
+    assert handle._worker._retcode.value == 1
+  finally:
+    threads.shutdown()
+
+def test_thread_terminated_worker_holds_slot(node):
+  import sample
+  node.module = 'sample'
+  node.worker = 'BlockUntilReleased'
+  threads = ThreadExecutor(1).start()
+  try:
+    node.execute(threads)
+    handle = node._proc
+    assert not threads.fits(node)
+    node.terminate()
+    # The thread is still running, and keeps its slot until it returns
+    assert handle.retcode == 907 and handle._reader.closed and not threads.fits(node)
+    sample.released.set()
+    handle._future.result(timeout=5)
+    # Done callbacks may run just after result() returns
+    deadline = time.time() + 5
+    while not threads.fits(node) and time.time() < deadline:
+      time.sleep(0.01)
+    assert threads.fits(node)
+  finally:
+    sample.released.set()
+    threads.shutdown()
+
+def test_engine_per_node_executor(engine):
+  engine.register.add_node(name='Say Hello 1', logfile=None, module='sample', worker='SayHello', executor='thread')
+  engine.register.add_node(name='Say Hello 2', logfile=None, module='sample', worker='SayHello', dependencies=['Say Hello 1'])
+  engine.register.add_node(name='Fail Me 1', logfile=None, module='sample', worker='FailMe', executor='thread')
+  assert engine.initiate(silent=True) == 1 and len(engine.register.completed_nodes) == 2
+
+def test_engine_unknown_executor(engine):
+  engine.register.add_node(name='Say Hello 1', logfile=None, module='sample', worker='SayHello', executor='bogus')
+  with pytest.raises(ValueError):
+    engine.initiate(silent=True)
+
+@pytest.mark.parametrize('worker, exp_retcode', [
+  ('AsyncSleep', 0),
+  ('AsyncFailMe', 1),
+  ('SayHello', 0)
+])
+def test_async_return_code(node, worker, exp_retcode):
+  node.module = 'sample'
+  node.worker = worker
+  loop = AsyncExecutor().start()
+  try:
+    node.execute(loop)
+    assert node.poll(True) == exp_retcode
+  finally:
+    loop.shutdown()
+
+def test_async_worker_runs_in_process(node):
+  node.module = 'sample'
+  node.worker = 'AsyncFailMe'
+  node.execute()
+  assert node.poll(True) == 1
+
+def test_async_timeout(node, tmp_path):
+  node.module = 'sample'
+  node.worker = 'AsyncSleep'
+  node.argv = ['10']
+  node.timeout = 1
+  node.logfile = str(tmp_path / 'sleep.log')
+  loop = AsyncExecutor().start()
+  try:
+    node.execute(loop)
+    assert node.poll(True) == 907
+  finally:
+    loop.shutdown()
+  assert 'Slept' not in (tmp_path / 'sleep.log').read_text()
+
+def test_async_terminate_closes_pipe(node, tmp_path):
+  node.module = 'sample'
+  node.worker = 'AsyncSleep'
+  node.argv = ['10']
+  node.logfile = str(tmp_path / 'sleep.log')
+  loop = AsyncExecutor().start()
+  try:
+    node.execute(loop)
+    handle = node._proc
+    time.sleep(0.2)
+    handle.terminate()
+    assert handle.retcode == 907 and handle._reader.closed and handle.sentinel is None
+  finally:
+    loop.shutdown()
+
+def test_engine_async_concurrency(engine, tmp_path):
+  engine.config['executor'] = 'async'
+  for i in range(100):
+    engine.register.add_node(name='Sleep {}'.format(i), logfile=str(tmp_path / 'sleep_{}.log'.format(i)), module='sample', worker='AsyncSleep', argv=['0.5'])
+  start = time.time()
+  assert engine.initiate(silent=True) == 0
+  assert time.time() - start < 5
+  for i in range(100):
+    assert 'Slept in {}'.format(tmp_path / 'sleep_{}.log'.format(i)) in (tmp_path / 'sleep_{}.log'.format(i)).read_text()
+
+def test_async_context():
+  context = AsyncContext(Context(dict(), None))
+  async def scenario():
+    await context.set('key', 'value')
+    return await context.get('key'), await context.has_key('missing'), await context.get('missing', 1)
+  assert asyncio.run(scenario()) == ('value', False, 1)
+
+@pytest.mark.parametrize('start_method', ['fork', 'forkserver', 'spawn'])
+def test_process_start_method(node, start_method):
+  node.module = 'sample'
+  node.worker = 'FailMe'
+  node.execute(ProcessExecutor(start_method, ['sample']).start())
+  assert node.poll(True) == 1
+
+def test_pool_start_method(node):
+  node.module = 'sample'
+  node.worker = 'FailMe'
+  pool = PoolExecutor(None, 1, 0, 'spawn').start()
+  try:
+    node.execute(pool)
+    assert node.poll(True) == 1
+  finally:
+    pool.shutdown()
+
+def test_engine_forkserver(engine):
+  engine.config['start_method'] = 'forkserver'
+  engine.register.add_node(name='Say Hello 1', logfile=None, module='sample', worker='SayHello')
+  engine.register.add_node(name='Fail Me 1', logfile=None, module='sample', worker='FailMe', dependencies=['Say Hello 1'])
+  assert engine.initiate(silent=True) == 1 and len(engine.register.completed_nodes) == 1
+
+def test_engine_unknown_start_method(engine):
+  engine.config['start_method'] = 'bogus'
+  engine.register.add_node(name='Say Hello 1', logfile=None, module='sample', worker='SayHello')
+  with pytest.raises(ValueError):
+    engine.initiate(silent=True)
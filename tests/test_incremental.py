@@ -0,0 +1,75 @@
+# Copyright 2019 Comcast Cable Communications Management, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import pytest
+
+from pyrunner.core.incremental import BuildState
+from pyrunner.core.engine import ExecutionEngine
+from pyrunner.core.register import NodeRegister
+
+def add_nodes(register, d):
+  register.add_node(name='A', logfile=str(d / 'a.log'), module='sample', worker='SayHello', inputs=str(d / '*.src'), outputs=str(d / 'a.out'))
+  register.add_node(name='B', logfile=str(d / 'b.log'), module='sample', worker='SayHello', inputs=str(d / 'a.out'), outputs=str(d / 'b.out'), dependencies=['A'])
+  register.add_node(name='C', logfile=str(d / 'c.log'), module='sample', worker='SayHello', dependencies=['B'])
+  return register
+
+@pytest.fixture
+def build(tmp_path):
+  for i, name in enumerate(['x.src', 'a.out', 'b.out']):
+    (tmp_path / name).write_text(name)
+    os.utime(str(tmp_path / name), (1000 + i, 1000 + i))
+  return tmp_path
+
+def reasons_by_name(state, register):
+  return { n.name:r for n,r in state.evaluate(register).items() }
+
+def test_incremental_up_to_date(build):
+  reasons = reasons_by_name(BuildState(), add_nodes(NodeRegister(), build))
+  assert reasons['A'] is None and reasons['B'] is None and reasons['C'] == 'no outputs declared'
+
+def test_incremental_stale_propagates(build):
+  os.utime(str(build / 'x.src'), (2000, 2000))
+  reasons = reasons_by_name(BuildState(), add_nodes(NodeRegister(), build))
+  assert 'is newer' in reasons['A'] and reasons['B'] == 'upstream task "A" executes'
+
+def test_incremental_missing_output(build):
+  os.remove(str(build / 'b.out'))
+  reasons = reasons_by_name(BuildState(), add_nodes(NodeRegister(), build))
+  assert reasons['A'] is None and 'does not exist' in reasons['B']
+
+def test_incremental_checksum(build):
+  state = BuildState(str(build / 'state.json'), 'checksum')
+  register = add_nodes(NodeRegister(), build)
+  assert 'no checksums' in reasons_by_name(state, register)['A']
+  for node in register.all_nodes:
+    state.record(node)
+  state.save()
+  
+  state = BuildState(str(build / 'state.json'), 'checksum')
+  os.utime(str(build / 'x.src'), (2000, 2000))
+  assert reasons_by_name(state, register)['A'] is None
+  (build / 'x.src').write_text('changed')
+  assert 'has changed' in reasons_by_name(state, register)['A']
+
+def test_engine_incremental(build):
+  engine = ExecutionEngine()
+  engine.register = add_nodes(NodeRegister(), build)
+  engine.config['tickrate'] = 0
+  engine.config['worker_dir'] = '{}/python'.format(os.path.dirname(os.path.realpath(__file__)))
+  engine.config['incremental'] = True
+  assert engine.initiate(silent=True) == 0 and len(engine.register.completed_nodes) == 3
+  assert not (build / 'a.log').exists() and 'Hello World!' in (build / 'c.log').read_text()
@@ -17,6 +17,9 @@
 import os
 import pytest
 from pyrunner.serde.list import ListSerDe
+from pyrunner.serde.json import JsonSerDe
+from pyrunner.serde.statelog import StateLog
+from pyrunner.core.register import NodeRegister
 
 @pytest.fixture
 def proc_file():
@@ -24,4 +27,143 @@ def proc_file():
 
 @pytest.fixture
 def proc_dict():
-  return parser.load_proc_list('{}/config/tests.lst'.format(os.path.dirname(os.path.realpath(__file__))))
\ No newline at end of file
+  return parser.load_proc_list('{}/config/tests.lst'.format(os.path.dirname(os.path.realpath(__file__))))
+
+def test_list_attributes(tmp_path):
+  lst = tmp_path / 'attributes.lst'
+  lst.write_text('1|-1|1|0|Say Hello|sample|SayHello|||priority=5;expected_duration=30\n2|1|1|0|Fail Me|sample|FailMe|a,b|fail.log\n')
+  register = ListSerDe().deserialize(str(lst))
+  node = register.find_node(name='Say Hello')
+  other = register.find_node(name='Fail Me')
+  assert node.priority == 5 and node.expected_duration == 30 and node.logfile is None
+  assert other.priority == 0 and other.arguments == ['a', 'b'] and other.logfile == 'fail.log'
+
+def test_list_apostrophes(tmp_path):
+  lst = tmp_path / 'apostrophes.lst'
+  lst.write_text("1|-1|1|0|Bob's Task|sample|SayHello|a|bob's.log|priority=2\n2|1|1|0|Fail Me|sample|FailMe\n")
+  register = ListSerDe().deserialize(str(lst))
+  node = register.find_node(name="Bob's Task")
+  assert node.arguments == ['a'] and node.logfile == "bob's.log" and node.priority == 2
+  assert register.find_node(name='Fail Me') in node.child_nodes
+
+def test_list_quoted_pipe(tmp_path):
+  lst = tmp_path / 'quoted.lst'
+  lst.write_text('1|-1|1|0|Quoted|sample|SayHello|"a|b",c|quoted.log|priority=1\n')
+  node = ListSerDe().deserialize(str(lst)).find_node(name='Quoted')
+  assert node.arguments == ['a|b', 'c'] and node.logfile == 'quoted.log' and node.priority == 1
+
+def test_list_attributes_restart(tmp_path, proc_file):
+  register = ListSerDe().deserialize(proc_file)
+  register.find_node(name='Say Hello').priority = 3
+  for n in register.all_nodes:
+    n.logfile = 'task.log'
+  ctllog = tmp_path / 'tests.ctllog'
+  ListSerDe().save_to_file(str(ctllog), register)
+  restored = ListSerDe().deserialize(str(ctllog), True)
+  assert restored.find_node(name='Say Hello').priority == 3 and len(restored.all_nodes) == 4
+
+def test_state_log(tmp_path, proc_file):
+  register = ListSerDe().deserialize(proc_file)
+  for n in register.all_nodes:
+    n.logfile = 'task.log'
+  ctllog = str(tmp_path / 'tests.ctllog')
+  log = StateLog(ListSerDe(), ctllog, max_records=3)
+  assert log.save(register) is None and os.path.getsize(ctllog + StateLog.SUFFIX) == 0
+  snapshot = open(ctllog).read()
+  
+  # Unchanged registers write nothing
+  assert log.save(register) == 0 and os.path.getsize(ctllog + StateLog.SUFFIX) == 0
+  
+  hello = register.find_node(name='Say Hello')
+  register.set_running(hello)
+  register.set_completed(hello)
+  assert log.save(register) == 1 and open(ctllog).read() == snapshot
+  restored = ListSerDe().deserialize(ctllog, True)
+  assert restored.find_node(name='Say Hello') in restored.completed_nodes
+  assert len(restored.completed_nodes) == 1 and len(restored.all_nodes) == 4
+  
+  # A record cut short by a crash is ignored
+  with open(ctllog + StateLog.SUFFIX, 'a') as f:
+    f.write('{}|C'.format(max([ n.id for n in register.all_nodes ])))
+  assert len(ListSerDe().deserialize(ctllog, True).completed_nodes) == 1
+  log.close()
+  
+  # Compacted once the log grows past max_records
+  log = StateLog(ListSerDe(), ctllog, max_records=1)
+  log.save(register)
+  register.set_all_norun()
+  assert log.save(register) is None and log.compactions == 2 and os.path.getsize(ctllog + StateLog.SUFFIX) == 0
+  assert len(ListSerDe().deserialize(ctllog, True).norun_nodes) == 4
+  log.close()
+
+def test_state_log_attributes(tmp_path, proc_file):
+  register = ListSerDe().deserialize(proc_file)
+  for n in register.all_nodes:
+    n.logfile = 'task.log'
+  ctllog = str(tmp_path / 'tests.ctllog')
+  log = StateLog(ListSerDe(), ctllog)
+  log.save(register)
+  hello = register.find_node(name='Say Hello')
+  hello.winning_attempt = 2
+  hello.max_attempts = 3
+  assert log.save(register) == 1 and log.compactions == 1
+  restored = ListSerDe().deserialize(ctllog, True).find_node(name='Say Hello')
+  assert restored.winning_attempt == 2 and restored.max_attempts == 3
+  log.close()
+
+def test_state_log_compaction_syncs(tmp_path, proc_file, monkeypatch):
+  register = ListSerDe().deserialize(proc_file)
+  for n in register.all_nodes:
+    n.logfile = 'task.log'
+  ctllog = str(tmp_path / 'tests.ctllog')
+  log = StateLog(ListSerDe(), ctllog, sync_interval=-1)
+  calls = []
+  fsync, truncate = os.fsync, os.truncate
+  monkeypatch.setattr(os, 'fsync', lambda fd: calls.append('fsync') or fsync(fd))
+  monkeypatch.setattr(os, 'truncate', lambda fd, size: calls.append('truncate') or truncate(fd, size))
+  log.compact(register)
+  # The snapshot and its directory entry are synced before the log is emptied
+  assert calls == ['fsync', 'fsync', 'truncate']
+  log.close()
+
+def test_state_log_crash_in_compaction(tmp_path, proc_file, monkeypatch):
+  register = ListSerDe().deserialize(proc_file)
+  for n in register.all_nodes:
+    n.logfile = 'task.log'
+  ctllog = str(tmp_path / 'tests.ctllog')
+  log = StateLog(ListSerDe(), ctllog)
+  log.save(register)
+  hello = register.find_node(name='Say Hello')
+  register.set_running(hello)
+  register.set_completed(hello)
+  assert log.save(register) == 1
+  # Dies once the new snapshot is in place, before the log is emptied
+  def crash(*args):
+    raise KeyboardInterrupt()
+  monkeypatch.setattr(os, 'truncate', crash)
+  with pytest.raises(KeyboardInterrupt):
+    log.compact(register)
+  monkeypatch.undo()
+  restored = ListSerDe().deserialize(ctllog, True)
+  assert [ n.name for n in restored.completed_nodes ] == ['Say Hello']
+  log.close()
+
+def test_json_attributes(tmp_path):
+  register = NodeRegister()
+  register.add_node(name='Say Hello', logfile='hello.log', module='sample', worker='SayHello', expected_duration=12)
+  register.add_node(name='Fail Me', logfile='fail.log', module='sample', worker='FailMe', priority=2, dependencies=['Say Hello'])
+  proc_json = tmp_path / 'tests.json'
+  JsonSerDe().save_to_file(str(proc_json), register)
+  restored = JsonSerDe().deserialize(str(proc_json))
+  assert restored.find_node(name='Say Hello').expected_duration == 12 and restored.find_node(name='Fail Me').priority == 2
+
+def test_json_file_attributes(tmp_path, monkeypatch):
+  monkeypatch.setenv('DATA_DIR', '/data')
+  proc_json = tmp_path / 'files.json'
+  proc_json.write_text('{"tasks": {"Build": {"module": "sample", "worker": "SayHello", "logfile": "build.log", "inputs": ["$ENV{DATA_DIR}/*.csv"], "outputs": ["$ENV{DATA_DIR}/out.parquet"]}}}')
+  restored = JsonSerDe().deserialize(str(proc_json))
+  assert restored.find_node(name='Build').inputs == ['/data/*.csv'] and restored.find_node(name='Build').outputs == ['/data/out.parquet']
+  
+  ctllog = tmp_path / 'files.ctllog'
+  ListSerDe().save_to_file(str(ctllog), restored)
+  assert ListSerDe().deserialize(str(ctllog), True).find_node(name='Build').inputs == ['/data/*.csv']
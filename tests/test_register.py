@@ -16,6 +16,7 @@
 
 import pytest, sys
 from pyrunner.core.register import NodeRegister
+from pyrunner.core.node import ExecutionNode
 from pyrunner.serde.list import ListSerDe
 from collections import deque
 #from pyrunner.core.context import Context
@@ -108,6 +109,118 @@ def test_register_exec_disable(register, exec_list, expected):
   register.exec_disable(exec_list)
   assert set([ n.id for n in register.pending_nodes ]) == set(expected) and len(register.all_nodes) == 6
 
+def test_register_ready_queue(register):
+  register.build_ready_queue()
+  assert set([ register.pop_ready().id, register.pop_ready().id ]) == {1,2} and register.pop_ready() is None
+
+def test_register_ready_queue_join(register):
+  register.build_ready_queue()
+  ready = []
+  node = register.pop_ready()
+  while node:
+    ready.append(node.id)
+    register.set_running(node)
+    register.set_completed(node)
+    node = register.pop_ready()
+  assert ready.index(5) > max(ready.index(3), ready.index(4)) and ready[-1] == 6 and len(register.completed_nodes) == 6
+
+def test_register_ready_queue_norun(register):
+  register.exec_disable([1])
+  register.build_ready_queue()
+  assert set([ register.pop_ready().id for _ in range(3) ]) == {2,3,4} and register.pop_ready() is None
+
+def test_register_ready_queue_failed(register):
+  register.build_ready_queue()
+  node = register.find_node(name='Say Hello 1')
+  register.pop_ready()
+  register.set_running(node)
+  register.set_failed(node)
+  assert len(register.defaulted_nodes) == 4 and register.pop_ready().id == 2 and register.pop_ready() is None
+
+def test_register_spawn_nodes(register):
+  register.build_ready_queue()
+  parent = register.find_node(name='Say Hello 3')
+  for name in ['Say Hello 1', 'Say Hello 3']:
+    node = register.find_node(name=name)
+    register.set_running(node)
+  register.set_completed(register.find_node(name='Say Hello 1'))
+  tasks = [ { 'name': 'Part {}'.format(i), 'module': 'sample', 'worker': 'SayHello' } for i in range(2) ]
+  added = register.spawn_nodes(parent, tasks, join={ 'name': 'Join', 'module': 'sample', 'worker': 'SayHello' })
+  assert [ n.id for n in added ] == [7, 8, 9]
+  assert register.find_node(name='Join') in register.find_node(name='Say Hello 5').parent_nodes
+  assert register.spawn_nodes(parent, tasks) == []
+  
+  register.set_completed(parent)
+  ready = set([ register.pop_ready().name for _ in range(4) ])
+  assert ready == {'Say Hello 2', 'Say Hello 4', 'Part 0', 'Part 1'} and register.pop_ready() is None
+
+def test_register_spawn_nodes_indexed(register, monkeypatch):
+  parent = register.find_node(name='Say Hello 6')
+  def scan(*args):
+    raise AssertionError('Spawning scanned every node')
+  monkeypatch.setattr(NodeRegister, 'all_nodes', property(scan))
+  monkeypatch.setattr(ExecutionNode, 'get_node_by_name', scan)
+  added = register.spawn_nodes(parent, [ { 'name': 'Part {}'.format(i), 'module': 'sample', 'worker': 'SayHello' } for i in range(3) ])
+  assert [ n.id for n in added ] == [7, 8, 9] and register.find_node(name='Part 2') is added[2]
+
+def test_register_spawn_nodes_unknown_dependency(register):
+  with pytest.raises(ValueError):
+    register.spawn_nodes(register.find_node(name='Say Hello 1'), [ { 'name': 'Part', 'module': 'sample', 'worker': 'SayHello', 'dependencies': ['Missing'] } ])
+
+def test_register_expand_subdag(register):
+  sub = NodeRegister()
+  sub.add_node(name='Extract', logfile=None, module='sample', worker='SayHello')
+  sub.add_node(name='Load', logfile=None, module='sample', worker='SayHello', dependencies=['Extract'])
+  node = register.find_node(name='Say Hello 1')
+  added = register.expand_subdag(node, sub)
+  assert [ (n.id, n.name) for n in added ] == [(7, 'Say Hello 1/Extract'), (8, 'Say Hello 1/Load')]
+  assert register.find_node(name='Say Hello 1/Extract') in added[1].parent_nodes
+  assert register.expand_subdag(node, sub) == [] and len(register.subdags[node]) == 2
+  
+  register.set_running(node)
+  assert register.poll_subdag(node) is None and register.subdag_counts(node) == {'P': 2}
+  for n in added:
+    register.set_completed(n)
+  assert register.poll_subdag(node) == 0
+
+def test_register_running_workers(register):
+  first, second = [ register.find_node(name=n) for n in ['Say Hello 1', 'Say Hello 2'] ]
+  register.set_running(first)
+  register.set_running(second)
+  register.set_running(second)
+  assert register.running_workers == 2
+  register.set_retry(first)
+  register.set_completed(second)
+  register.set_completed(second)
+  assert register.running_workers == 0
+
+def test_register_release_buffers(register):
+  producer = register.find_node(name='Say Hello 1')
+  register.track_buffers(producer, [('blob', '/tmp/blob.buf')])
+  assert register.release_buffers() == []
+  for c in producer.child_nodes:
+    register.set_completed(c)
+  # Descendants further down may still read the buffer
+  assert register.release_buffers() == []
+  for name in ['Say Hello 5', 'Say Hello 6']:
+    register.set_completed(register.find_node(name=name))
+  assert register.release_buffers() == [('blob', '/tmp/blob.buf')] and not register.buffers
+
+def test_register_release_buffers_transitive():
+  register = NodeRegister()
+  register.add_node(name='Producer', logfile=None, module='sample', worker='PutBuffer')
+  register.add_node(name='A', logfile=None, module='sample', worker='SayHello', dependencies=['Producer'])
+  register.add_node(name='B', logfile=None, module='sample', worker='ReadBuffer', dependencies=['A'])
+  producer, a, b = [ register.find_node(name=n) for n in ['Producer', 'A', 'B'] ]
+  register.set_completed(producer)
+  register.track_buffers(producer, [('blob', '/tmp/blob.buf')])
+  register.set_completed(a)
+  assert register.release_buffers() == []
+  register.set_running(b)
+  assert register.release_buffers() == []
+  register.set_completed(b)
+  assert register.release_buffers() == [('blob', '/tmp/blob.buf')]
+
 #def test_register_interactive(register, ctx):
 #  ctx.interactive = True
 #  register.context = ctx
@@ -0,0 +1,64 @@
+# Copyright 2019 Comcast Cable Communications Management, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import pytest
+
+from pyrunner.core.register import NodeRegister
+from pyrunner.core.history import RuntimeHistory
+from pyrunner.scheduling import FifoPolicy, PriorityPolicy, ShortestJobFirstPolicy, CriticalPathPolicy
+
+@pytest.fixture
+def register():
+  register = NodeRegister()
+  register.add_node(name='Short', logfile=None, module='sample', worker='SayHello', expected_duration=1)
+  register.add_node(name='Long', logfile=None, module='sample', worker='SayHello', expected_duration=50, priority=1)
+  register.add_node(name='Head', logfile=None, module='sample', worker='SayHello', expected_duration=5, priority=5)
+  register.add_node(name='Tail', logfile=None, module='sample', worker='SayHello', expected_duration=100, dependencies=['Head'])
+  return register
+
+def ready_order(register, policy, history=None):
+  policy.prepare(register, history)
+  register.build_ready_queue(policy)
+  order = []
+  node = register.pop_ready()
+  while node:
+    order.append(node.name)
+    register.set_running(node)
+    register.set_completed(node)
+    node = register.pop_ready()
+  return order
+
+def test_fifo_policy(register):
+  assert ready_order(register, FifoPolicy()) == ['Short', 'Long', 'Head', 'Tail']
+
+def test_priority_policy(register):
+  assert ready_order(register, PriorityPolicy()) == ['Head', 'Long', 'Short', 'Tail']
+
+def test_shortest_job_first_policy(register):
+  assert ready_order(register, ShortestJobFirstPolicy()) == ['Short', 'Head', 'Long', 'Tail']
+
+def test_critical_path_policy(register):
+  assert ready_order(register, CriticalPathPolicy()) == ['Head', 'Tail', 'Long', 'Short']
+
+def test_critical_path_policy_history():
+  register = NodeRegister()
+  register.add_node(name='A', logfile=None, module='sample', worker='SayHello')
+  register.add_node(name='B', logfile=None, module='sample', worker='SayHello')
+  history = RuntimeHistory()
+  for duration in [10, 30, 20]:
+    history.record('B', duration)
+  policy = CriticalPathPolicy()
+  assert ready_order(register, policy, history) == ['B', 'A'] and policy.path_length(register.find_node(name='B')) == 20